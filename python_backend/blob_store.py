@@ -0,0 +1,108 @@
+"""
+Content-addressed blob store for screenshots
+
+Image bytes are stored once under `<root>/<first two hex digits>/<sha256><ext>`
+and session or application folders reference them through hard links, so
+saving the same connector screen again costs a directory entry instead of a
+second copy of the file. Placing a file is rename/link work only, never a
+data copy, unless the file system cannot hard link (the store then falls back
+to a plain copy). A blob whose link count drops back to one is no longer
+referenced by any folder and is removed by collect_garbage().
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+
+
+class BlobStore:
+    """SHA-256 keyed file store that hands out hard links"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(str(root))
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def hash_file(path, chunk_size=1024 * 1024):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def blob_path(self, digest, extension=''):
+        return os.path.join(self.root, digest[:2], digest + extension.lower())
+
+    def ingest(self, path, digest=None):
+        """Move a file into the store (dropping it if the blob already exists); returns (digest, blob path)"""
+        path = str(path)
+        digest = digest or self.hash_file(path)
+        blob = self.blob_path(digest, os.path.splitext(path)[1])
+        with self._lock:
+            if os.path.exists(blob):
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                try:
+                    os.replace(path, blob)
+                except OSError:
+                    # Different volume: fall back to a copy-based move
+                    shutil.move(path, blob)
+        return digest, blob
+
+    def link(self, blob, destination):
+        """Reference a blob from destination; returns True for a hard link, False for a copy"""
+        destination = str(destination)
+        if os.path.exists(destination):
+            if os.path.samefile(blob, destination):
+                return True
+            os.remove(destination)
+        try:
+            os.link(blob, destination)
+            return True
+        except OSError:
+            shutil.copy2(blob, destination)
+            return False
+
+    def place(self, source, destination, digest=None):
+        """Move source to destination, storing its bytes once; returns the SHA-256 digest"""
+        digest, blob = self.ingest(source, digest)
+        self.link(blob, destination)
+        return digest
+
+    def collect_garbage(self):
+        """Remove blobs that no folder links to any more; returns (removed, freed_bytes)"""
+        removed = freed = 0
+        with self._lock:
+            for shard in os.scandir(self.root):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    # DirEntry.stat() reports st_nlink as 0 on Windows, so stat the path
+                    stat = os.stat(entry.path)
+                    if stat.st_nlink <= 1:
+                        try:
+                            os.remove(entry.path)
+                            removed += 1
+                            freed += stat.st_size
+                        except OSError:
+                            pass
+        return removed, freed
+
+    def get_stats(self):
+        blobs = total = referenced = 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                stat = os.stat(entry.path)
+                blobs += 1
+                total += stat.st_size
+                referenced += max(stat.st_nlink - 1, 0)
+        return {
+            'blobs': blobs,
+            'stored_bytes': total,
+            'references': referenced
+        }
@@ -0,0 +1,158 @@
+"""
+Persistent screen capture engine
+
+mss grabbers hold OS resources (an X display connection on Linux, GDI device
+contexts and bitmaps on Windows) that belong to the thread which created them.
+Instead of opening a fresh mss.mss() context for every shot, the engine owns one
+grabber on a dedicated capture thread and serves grab requests from a queue.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from lazy_modules import lazy_import
+from metrics import LatencyCounter
+
+mss = lazy_import('mss')
+
+
+def region_to_monitor(region):
+    """Convert a {'x', 'y', 'width', 'height'} region into an mss monitor dict"""
+    return {
+        "top": int(region["y"]),
+        "left": int(region["x"]),
+        "width": int(region["width"]),
+        "height": int(region["height"])
+    }
+
+
+class CaptureEngine:
+    """Long-lived capture thread that keeps one mss grabber and its monitor table alive"""
+
+    def __init__(self, name='capture-engine'):
+        self.name = name
+        self._requests = queue.Queue()
+        self._thread = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._startup_error = None
+        self._monitors = []
+        self.queue_wait = LatencyCounter()
+        self.grab_time = LatencyCounter()
+        self.errors = 0
+
+    def start(self):
+        """Start the capture thread if it is not already running"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._startup_error = None
+            self._thread = threading.Thread(target=self._run, name=self.name)
+            self._thread.daemon = True
+            self._thread.start()
+        self._ready.wait()
+        if self._startup_error:
+            raise self._startup_error
+
+    def stop(self, timeout=5):
+        """Stop the capture thread and release the grabber"""
+        thread = self._thread
+        if thread and thread.is_alive():
+            self._requests.put(None)
+            thread.join(timeout)
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    @property
+    def monitors(self):
+        """Cached mss monitor table (index 0 is the virtual desktop, 1 the primary)"""
+        if not self.running:
+            self.start()
+        return [dict(m) for m in self._monitors]
+
+    def submit(self, region=None, monitor=1):
+        """Queue a grab and return a Future resolving to an mss ScreenShot"""
+        if not self.running:
+            self.start()
+        future = Future()
+        self._requests.put((future, 'grab', (region, monitor), time.perf_counter()))
+        return future
+
+    def grab(self, region=None, monitor=1, timeout=10):
+        """Grab a region (or a whole monitor) and wait for the result"""
+        return self.submit(region, monitor).result(timeout)
+
+    def refresh_monitors(self, timeout=10):
+        """Re-enumerate monitors, e.g. after a display was attached or removed"""
+        if not self.running:
+            self.start()
+        future = Future()
+        self._requests.put((future, 'refresh_monitors', (), time.perf_counter()))
+        return future.result(timeout)
+
+    def get_stats(self):
+        """Latency counters for the capture thread"""
+        return {
+            'running': self.running,
+            'pending_requests': self._requests.qsize(),
+            'monitor_count': max(len(self._monitors) - 1, 0),
+            'errors': self.errors,
+            'queue_wait': self.queue_wait.snapshot(),
+            'grab_time': self.grab_time.snapshot()
+        }
+
+    def _run(self):
+        try:
+            sct = mss.mss()
+            self._monitors = [dict(m) for m in sct.monitors]
+        except Exception as e:
+            self._startup_error = e
+            self._ready.set()
+            return
+
+        self._ready.set()
+        try:
+            while True:
+                item = self._requests.get()
+                if item is None:
+                    break
+
+                future, kind, args, enqueued_at = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                started = time.perf_counter()
+                self.queue_wait.record(started - enqueued_at)
+                try:
+                    if kind == 'grab':
+                        region, monitor = args
+                        if region:
+                            target = region_to_monitor(region)
+                        else:
+                            target = self._monitors[monitor]
+                        result = sct.grab(target)
+                        self.grab_time.record(time.perf_counter() - started)
+                    else:
+                        # mss caches its monitor list for the life of the instance, so enumerate
+                        # with a fresh one; the old instance stays in use if that fails
+                        fresh = mss.mss()
+                        try:
+                            monitors = [dict(m) for m in fresh.monitors]
+                        except Exception:
+                            fresh.close()
+                            raise
+                        sct.close()
+                        sct = fresh
+                        self._monitors = monitors
+                        result = [dict(m) for m in monitors]
+                    future.set_result(result)
+                except Exception as e:
+                    self.errors += 1
+                    future.set_exception(e)
+        finally:
+            sct.close()
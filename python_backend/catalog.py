@@ -0,0 +1,308 @@
+"""
+Persistent screenshot catalog
+
+A small SQLite index of every image under the screenshots folder, so listing
+screenshots does not stat every file and open every sidecar JSON on each
+request. The capture/save/remove functions keep it current through add(),
+move() and remove(); reconcile() is a cheap os.scandir pass that only reads
+files whose size or mtime changed, to pick up anything done outside the app.
+"""
+
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+SORT_COLUMNS = {
+    'created_at': 'created_ts',
+    'name': 'name',
+    'application': 'application',
+    'size': 'size'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS screenshots (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    application TEXT,
+    name TEXT,
+    description TEXT,
+    created_at TEXT,
+    created_ts REAL,
+    mtime REAL,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_screenshots_folder_created ON screenshots (folder, created_ts);
+CREATE INDEX IF NOT EXISTS idx_screenshots_application_created ON screenshots (application, created_ts);
+CREATE TABLE IF NOT EXISTS image_hashes (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    mtime REAL,
+    size INTEGER,
+    fingerprint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_image_hashes_directory ON image_hashes (directory);
+"""
+
+
+def clean_app_name(application):
+    """Folder-safe application name: 'SSMS.exe' and 'SSMS' both become 'SSMS'"""
+    clean = re.sub(r'[<>:"/\\|?*]', '_', str(application))
+    return clean.replace('.exe', '').replace(' ', '_').strip('_')
+
+
+def parse_time(value):
+    """Epoch seconds from an ISO timestamp, 'YYYY-mm-dd HH:MM:SS' string or number"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+
+def encode_cursor(sort_value, path):
+    return base64.urlsafe_b64encode(json.dumps([sort_value, path]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    sort_value, path = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    return sort_value, path
+
+
+class ScreenshotCatalog:
+    """SQLite-backed index of screenshot files and their metadata"""
+
+    def __init__(self, root, db_path=None, extensions=('.png',)):
+        self.root = os.path.abspath(str(root))
+        self.db_path = str(db_path or os.path.join(self.root, '.catalog.sqlite3'))
+        self.extensions = tuple(extensions)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+            if self._conn.execute('PRAGMA user_version').fetchone()[0] < 1:
+                # Rows from before application names were normalized to the app folder name
+                self._conn.execute("UPDATE screenshots SET application = "
+                                   "substr(folder, 1, instr(folder || '/', '/') - 1) WHERE folder != ''")
+                rows = self._conn.execute("SELECT path, application FROM screenshots WHERE folder = ''").fetchall()
+                self._conn.executemany('UPDATE screenshots SET application = ? WHERE path = ?',
+                                       [(clean_app_name(row['application'] or 'Unknown'), row['path']) for row in rows])
+                self._conn.execute('PRAGMA user_version = 1')
+            self._conn.commit()
+
+    def _describe(self, path, stat, metadata=None):
+        """Build the catalog row for an image file"""
+        path = os.path.abspath(str(path))
+        folder = os.path.relpath(os.path.dirname(path), self.root)
+        folder = '' if folder == '.' else folder.replace(os.sep, '/')
+        filename = os.path.basename(path)
+
+        if metadata is None:
+            metadata = {}
+            sidecar = os.path.splitext(path)[0] + '.json'
+            if os.path.exists(sidecar):
+                try:
+                    with open(sidecar, 'r') as f:
+                        metadata = json.load(f)
+                except Exception:
+                    metadata = {}
+
+        # Application: the app folder, or for the root folder the cleaned name from the
+        # metadata or the old filename convention - the same name get_screenshots filters on
+        parts = filename.split('_')
+        if folder:
+            application = folder.split('/')[0]
+        else:
+            application = clean_app_name(metadata.get('application')
+                                         or metadata.get('name', parts[1] if len(parts) > 1 else 'Unknown'))
+        created_at = metadata.get('created_at') or datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            created_ts = parse_time(created_at)
+        except ValueError:
+            created_ts = stat.st_mtime
+
+        return (path, folder, filename, application, metadata.get('name', ''),
+                metadata.get('description', ''), created_at, created_ts, stat.st_mtime, stat.st_size)
+
+    def _upsert(self, rows):
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO screenshots '
+                '(path, folder, filename, application, name, description, created_at, created_ts, mtime, size) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._conn.commit()
+
+    def add(self, path, metadata=None):
+        """Index (or re-index) one image file"""
+        try:
+            stat = os.stat(str(path))
+        except OSError:
+            return
+        self._upsert([self._describe(path, stat, metadata)])
+
+    def remove(self, path):
+        path = os.path.abspath(str(path))
+        with self._lock:
+            self._conn.execute('DELETE FROM screenshots WHERE path = ?', (path,))
+            self._conn.execute('DELETE FROM image_hashes WHERE path = ?', (path,))
+            self._conn.commit()
+
+    def remove_many(self, paths):
+        """Drop many entries in one transaction"""
+        rows = [(os.path.abspath(str(path)),) for path in paths]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany('DELETE FROM screenshots WHERE path = ?', rows)
+            self._conn.executemany('DELETE FROM image_hashes WHERE path = ?', rows)
+            self._conn.commit()
+
+    def move(self, old_path, new_path, metadata=None):
+        """Re-key an entry after its file was moved or renamed"""
+        self.remove(old_path)
+        self.add(new_path, metadata)
+
+    def move_many(self, pairs):
+        """Re-key many (old_path, new_path) entries in two transactions"""
+        rows = []
+        for old_path, new_path in pairs:
+            try:
+                rows.append(self._describe(new_path, os.stat(str(new_path))))
+            except OSError:
+                continue
+        self.remove_many(old_path for old_path, _ in pairs)
+        if rows:
+            self._upsert(rows)
+
+    def clear(self, folder=None):
+        """Drop every entry, or only the entries of one folder ('' is the root)"""
+        with self._lock:
+            if folder is None:
+                self._conn.execute('DELETE FROM screenshots')
+                self._conn.execute('DELETE FROM image_hashes')
+            else:
+                self._conn.execute('DELETE FROM screenshots WHERE folder = ?', (folder,))
+            self._conn.commit()
+
+    def reconcile(self):
+        """Bring the index in line with the files on disk; returns (added_or_updated, removed)"""
+        with self._lock:
+            known = {row['path']: (row['mtime'], row['size'])
+                     for row in self._conn.execute('SELECT path, mtime, size FROM screenshots')}
+
+        seen = set()
+        changed = []
+        pending = [self.root]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in self.extensions:
+                    continue
+                path = os.path.abspath(entry.path)
+                seen.add(path)
+                stat = entry.stat()
+                if known.get(path) != (stat.st_mtime, stat.st_size):
+                    changed.append(self._describe(path, stat))
+
+        removed = [path for path in known if path not in seen]
+        if changed:
+            self._upsert(changed)
+        self.remove_many(removed)
+        return len(changed), len(removed)
+
+    def query(self, folder='', application=None, since=None, until=None,
+              sort='created_at', order='desc', limit=None, cursor=None):
+        """Return (rows, next_cursor) using keyset pagination on (sort column, path)"""
+        column = SORT_COLUMNS.get(sort)
+        if column is None:
+            raise ValueError(f'Unknown sort field: {sort}')
+        descending = str(order).lower() != 'asc'
+
+        clauses, params = [], []
+        if folder is not None:
+            clauses.append('folder = ?')
+            params.append(folder)
+        if application:
+            clauses.append('application = ?')
+            params.append(clean_app_name(application))
+        if since is not None:
+            clauses.append('created_ts >= ?')
+            params.append(parse_time(since))
+        if until is not None:
+            clauses.append('created_ts <= ?')
+            params.append(parse_time(until))
+        if cursor:
+            sort_value, path = decode_cursor(cursor)
+            comparison = '<' if descending else '>'
+            clauses.append(f'({column}, path) {comparison} (?, ?)')
+            params.extend([sort_value, path])
+
+        direction = 'DESC' if descending else 'ASC'
+        sql = 'SELECT * FROM screenshots'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += f' ORDER BY {column} {direction}, path {direction}'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit) + 1)
+
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params)]
+
+        next_cursor = None
+        if limit and len(rows) > int(limit):
+            rows = rows[:int(limit)]
+            last = rows[-1]
+            next_cursor = encode_cursor(last[column], last['path'])
+        return rows, next_cursor
+
+    def get_hash(self, path):
+        """Stored (mtime, size, fingerprint) of one file, or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT mtime, size, fingerprint FROM image_hashes WHERE path = ?',
+                                     (os.path.abspath(str(path)),)).fetchone()
+        return (row['mtime'], row['size'], int(row['fingerprint'], 16)) if row else None
+
+    def get_hashes(self, directory):
+        """Stored fingerprints of every file in a directory: {path: (mtime, size, fingerprint)}"""
+        with self._lock:
+            rows = self._conn.execute('SELECT path, mtime, size, fingerprint FROM image_hashes WHERE directory = ?',
+                                      (os.path.abspath(str(directory)),)).fetchall()
+        return {row['path']: (row['mtime'], row['size'], int(row['fingerprint'], 16)) for row in rows}
+
+    def set_hash(self, path, mtime, size, fingerprint):
+        self.set_hashes([(path, mtime, size, fingerprint)])
+
+    def set_hashes(self, rows):
+        """Store fingerprints given as (path, mtime, size, fingerprint) tuples"""
+        values = []
+        for path, mtime, size, fingerprint in rows:
+            path = os.path.abspath(str(path))
+            values.append((path, os.path.dirname(path), mtime, size, format(fingerprint, '032x')))
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO image_hashes (path, directory, mtime, size, fingerprint) '
+                'VALUES (?, ?, ?, ?, ?)', values)
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM screenshots').fetchone()[0]
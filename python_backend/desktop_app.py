@@ -1,20 +1,45 @@
-from flask import Flask, request, jsonify
+import time
+from metrics import StartupTimer
+startup_timer = StartupTimer()
+
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
-import psutil
 import os
-import time
 from datetime import datetime
 import threading
-import pyautogui
-import cv2
-import mss
-from PIL import Image
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-import uuid
+import hashlib
+import itertools
 import json
 import subprocess
 import re
+from capture_engine import CaptureEngine
+from multi_monitor import MultiMonitorCapture, LAYOUTS as MONITOR_LAYOUTS
+from frame_diff import ChangeDetector, frame_to_array
+from recording_pipeline import FramePipeline, OVERFLOW_POLICIES
+from video_segments import VideoSegmentWriter
+from encoders import ImageEncoder, DEFAULT_ENCODER_SETTINGS, IMAGE_EXTENSIONS
+from frame_scheduler import FrameScheduler
+from catalog import ScreenshotCatalog, clean_app_name
+from thumbnails import ThumbnailService
+from image_hash import PerceptualIndex
+from blob_store import BlobStore
+from events import EventBus
+from serving import serve
+from launch_jobs import LaunchTracker
+from window_index import WindowIndex
+from window_tracker import WindowTracker
+from region_overlay import RegionOverlay, FrozenFrame
+from region_presets import RegionPresetStore, ANCHORS as REGION_ANCHORS
+from replay_buffer import ReplayBuffer
+from session_journal import SessionJournals
+from file_ops import BulkFileOps, scan as scan_folder
+from process_table import ProcessTable
+from lazy_modules import import_times, preload
+
+# numpy, OpenCV, Pillow and mss are imported by the modules above on first use
+startup_timer.mark('imports')
 
 app = Flask(__name__)
 CORS(app)
@@ -23,75 +48,356 @@ CORS(app)
 recording = False
 screenshots_dir = Path("screenshots")  # Point to main screenshots folder
 current_app = None
+recording_thread = None
+recording_options = {}
+recording_metadata = None
+recording_pipeline = None
+recording_video_writer = None
+recording_scheduler = None
+recording_window_tracker = None
+recording_stop = threading.Event()
+recording_lock = threading.Lock()
+
+# Recording defaults, overridable per session through start_recording options
+DEFAULT_RECORDING_OPTIONS = {
+    'mode': 'continuous',       # 'continuous' or 'change_detection'
+    'fps': 0.5,                 # Target grab rate (one frame every 2 seconds)
+    'change_threshold': 0.002,  # Fraction of sampled pixels that must change
+    'pixel_threshold': 16,      # Per-channel difference that counts as a change
+    'sample_step': 8,           # Compare every Nth pixel in both directions
+    'encoder_workers': max(1, min(4, (os.cpu_count() or 2) // 2)),
+    'queue_size': 8,            # Frames buffered between grab and encode
+    'overflow_policy': 'block', # 'block', 'drop_oldest' or 'drop_newest'
+    'output': 'png',            # 'png' (one file per frame) or 'video' (rolling segments)
+    'video_codec': 'mp4v',      # FourCC passed to cv2.VideoWriter
+    'video_fps': None,          # Defaults to the grab rate
+    'segment_seconds': 60,      # Length of each video segment
+    'monitors': None,           # None (primary), 'all', or a list of monitor indices
+    'monitor_layout': 'stitched', # 'stitched' (one virtual-desktop frame) or 'separate' (PNG output only)
+    'target': 'screen',         # 'screen' or 'window' (only the application's window, following moves)
+    'window_keywords': None,    # Window search terms for the 'window' target; defaults to the application
+    'encoder': None             # Image encoder overrides for PNG-style output
+}
+
+# Persistent capture thread shared by every capture path
+capture_engine = CaptureEngine()
+
+# One extra capture thread per monitor, for grabbing several displays at once
+multi_monitor = MultiMonitorCapture(capture_engine)
+
+# Default image encoder settings for captures (see encoders.py)
+encoder_settings = dict(DEFAULT_ENCODER_SETTINGS)
 
 # Ensure screenshots directory exists
 screenshots_dir.mkdir(exist_ok=True)
 
-# Configure pyautogui for safety
-pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.1
+# Index of screenshot files, kept current by the capture/save/remove functions
+screenshot_catalog = ScreenshotCatalog(screenshots_dir, extensions=IMAGE_EXTENSIONS)
+catalog_reconciled_at = 0
+CATALOG_RECONCILE_INTERVAL = 30  # Seconds between reconciliation scans on get_screenshots
+
+# Perceptual fingerprints of every image, indexed per folder for near-duplicate lookups
+perceptual_index = PerceptualIndex(screenshot_catalog, IMAGE_EXTENSIONS)
+DUPLICATE_MAX_DISTANCE = 4  # Differing bits (of 128) still treated as the same image
+
+# Content-addressed image bytes; app and session folders hold hard links into it
+blob_store = BlobStore(screenshots_dir / '.blobs')
+
+# Session changes per application folder, appended as JSONL and compacted into {app}.json
+session_journals = SessionJournals(compact_every=64, compact_interval=30.0)
+
+# Folder-wide removals and moves on a small pool, with progress pushed as events
+file_ops = BulkFileOps(workers=4, on_progress=lambda job: event_bus.publish(
+    'file_ops_complete' if job['finished'] else 'file_ops_progress', job))
+
+# Named capture regions per application, relative to the application window
+region_presets = RegionPresetStore(screenshots_dir / '.presets')
+
+# Encodes the crops of a batch capture in parallel (OpenCV releases the GIL while encoding)
+batch_encode_executor = ThreadPoolExecutor(max_workers=max(2, min(4, os.cpu_count() or 2)),
+                                           thread_name_prefix='batch-encode')
+
+# Capture results, recorded frames and errors pushed to the frontend
+event_bus = EventBus()
+
+# Top-level windows, enumerated once per TTL and shared by focus and launch lookups
+window_index = WindowIndex(ttl=1.0)
+
+# Running processes, kept current in the background from PID diffs (started on first use)
+process_table = ProcessTable(lambda: window_index.windows() if window_index.platform.lists_windows else [])
+
+# Launched applications waiting for their first window
+def publish_launch_result(job):
+    event_type = 'app_ready' if job.state == 'ready' else 'app_launch_failed'
+    event_bus.publish(event_type, job.to_dict())
+
+def launched_processes(pids, exe_name, since):
+    """Children of pids and same-named newcomers, from the shared process table"""
+    process_table.start()
+    return process_table.related(pids, exe_name, since)
+
+launch_tracker = LaunchTracker(lambda: list_top_level_windows(), launched_processes, on_finished=publish_launch_result)
+
+# Longest single wait_for_launch; clients wait longer by asking again
+LAUNCH_WAIT_MAX = 25.0
+
+# One fullscreen selection overlay on its own Tk thread, shown and hidden per selection
+region_overlay = RegionOverlay()
+region_selection_thread = None
+region_selection_lock = threading.Lock()
+
+# Rolling history of the last minute of screen, on its own capture thread (started after the ready signal)
+DEFAULT_REPLAY_OPTIONS = {
+    'fps': 1.0,                 # Grab rate of the history
+    'seconds': 60,              # How far back the buffer reaches
+    'max_mb': 64,               # Memory budget for the compressed frames
+    'tile': 64,                 # Edge of the change-detection tiles in pixels
+    'keyframe_seconds': 10,     # Full frame every N seconds, changed tiles in between
+    'monitor': 1
+}
+replay_engine = CaptureEngine(name='capture-replay')
+replay_buffer = None
+replay_lock = threading.Lock()
+
+# Downscaled previews for list views, cached on disk under a byte budget
+thumbnail_service = ThumbnailService(screenshots_dir / '.thumbnails')
+
+startup_timer.mark('state')
+
+@app.route('/api/thumbnail', methods=['GET'])
+def serve_thumbnail():
+    """Serve the cached preview of a screenshot as a JPEG"""
+    try:
+        filepath = request.args.get('path', '')
+        max_size = request.args.get('size', type=int)
+        if Path(filepath).suffix.lower() not in IMAGE_EXTENSIONS or not os.path.isfile(filepath):
+            return jsonify({'success': False, 'error': 'Screenshot file not found'}), 404
+        
+        return send_file(thumbnail_service.get(filepath, max_size), mimetype='image/jpeg', max_age=3600)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events stream of backend events, resumable through Last-Event-ID or ?since="""
+    since = request.args.get('since', type=int)
+    if since is None:
+        # EventSource sends the last seen id as a header when it reconnects
+        try:
+            since = int(request.headers.get('Last-Event-ID', event_bus.sequence))
+        except ValueError:
+            since = event_bus.sequence
+    types = [t for t in request.args.get('types', '').split(',') if t]
+    
+    def bounded_stream():
+        # The slot is taken once the stream starts, so a response that is never iterated holds nothing
+        if not waiting_slots.acquire(blocking=False):
+            # Every waiting slot is in use: have the EventSource come back a little later
+            yield 'retry: 5000\n\n'
+            return
+        try:
+            yield from event_bus.stream(since, types, duration=STREAM_MAX_SECONDS)
+        finally:
+            waiting_slots.release()
+    
+    return Response(stream_with_context(bounded_stream()),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Command name -> handler called with the command's data dict
+COMMAND_HANDLERS = {
+    'get_running_apps': lambda data: get_running_apps(data.get('since'), data.get('windowed_only', False)),
+    'launch_app': lambda data: launch_app(data.get('exe_path')),
+    'get_launch_status': lambda data: get_launch_status(data.get('job_id')),
+    'wait_for_launch': lambda data: wait_for_launch(data.get('job_id'), data.get('timeout', 30)),
+    'focus_window': lambda data: focus_window(data.get('title_keywords', [])),
+    'capture_screenshot': lambda data: capture_screenshot(data.get('application'), data.get('region'), data.get('encoder'),
+                                                          data.get('monitors'), data.get('layout', 'stitched')),
+    'get_monitors': lambda data: get_monitors(data.get('refresh', False)),
+    'start_region_selection': lambda data: start_region_selection(data.get('application')),
+    'capture_region_screenshot': lambda data: capture_region_screenshot(data.get('region'), data.get('encoder')),
+    'save_screenshot_with_metadata': lambda data: save_screenshot_with_metadata(data.get('filepath'), data.get('name'), data.get('description'), data.get('application_name')),
+    'get_region_presets': lambda data: get_region_presets(data.get('application')),
+    'save_region_preset': lambda data: save_region_preset(data.get('application'), data.get('name'), data.get('region'),
+                                                          data.get('description'), data.get('key'),
+                                                          data.get('anchor', 'window')),
+    'delete_region_preset': lambda data: delete_region_preset(data.get('application'), data.get('name')),
+    'batch_capture_regions': lambda data: batch_capture_regions(data.get('application'), data.get('names'),
+                                                                data.get('application_path'), data.get('encoder')),
+    'start_system_region_selection': lambda data: start_system_region_selection(data.get('application'),
+                                                                                data.get('freeze', True)),
+    'get_last_capture_result': lambda data: get_last_capture_result(),
+    'wait_for_events': lambda data: wait_for_events(data.get('since'), data.get('timeout', 25), data.get('types')),
+    'create_session_json': lambda data: create_session_json(data.get('application_name'), data.get('application_path'), data.get('screenshots')),
+    'organize_screenshots_by_app': lambda data: organize_screenshots_by_app(data.get('application_name')),
+    'remove_screenshot': lambda data: remove_screenshot(data.get('filepath'), data.get('filepaths')),
+    'start_visual_region_selection': lambda data: start_visual_region_selection(data.get('application'),
+                                                                                data.get('freeze', True)),
+    'start_replay_buffer': lambda data: start_replay_buffer(data.get('options')),
+    'stop_replay_buffer': lambda data: stop_replay_buffer(),
+    'get_replay_stats': lambda data: get_replay_stats(),
+    'dump_replay': lambda data: dump_replay(data.get('seconds'), data.get('output', 'video'), data.get('encoder')),
+    'start_recording': lambda data: start_recording(data.get('application'), data.get('options')),
+    'stop_recording': lambda data: stop_recording(),
+    'get_recording_stats': lambda data: get_recording_stats(),
+    'get_scheduler_stats': lambda data: get_scheduler_stats(),
+    'get_screenshots': lambda data: get_screenshots(data.get('application'), data.get('since'), data.get('until'),
+                                                    data.get('sort', 'created_at'), data.get('order', 'desc'),
+                                                    data.get('limit'), data.get('cursor'), data.get('folder', ''),
+                                                    data.get('refresh', False)),
+    'get_windows': lambda data: get_windows(),
+    'health_check': lambda data: health_check(),
+    'get_startup_report': lambda data: get_startup_report(),
+    'get_thumbnail': lambda data: get_thumbnail(data.get('filepath'), data.get('max_size')),
+    'get_capture_stats': lambda data: get_capture_stats(),
+    'get_region_overlay_stats': lambda data: get_region_overlay_stats(),
+    'get_encoder_settings': lambda data: get_encoder_settings(),
+    'set_encoder_settings': lambda data: set_encoder_settings(data.get('settings')),
+    'clear_all_screenshots': lambda data: clear_all_screenshots(),
+    'read_json_file': lambda data: read_json_file(data.get('filepath')),
+    'check_file_exists': lambda data: check_file_exists(data.get('filepath')),
+    'cleanup_old_json_files': lambda data: cleanup_old_json_files(data.get('application_name')),
+    'cleanup_duplicate_screenshots': lambda data: cleanup_duplicate_screenshots(data.get('application_name'), data.get('max_distance')),
+    'collect_blob_garbage': lambda data: collect_blob_garbage(),
+    'find_similar_screenshots': lambda data: find_similar_screenshots(data.get('filepath'), data.get('application_name'), data.get('max_distance')),
+    'batch': lambda data: run_batch(data.get('commands'), data.get('mode', 'sequence'), data.get('stop_on_error', False)),
+}
+
+# Upper bound on commands run at once by a parallel batch
+BATCH_MAX_WORKERS = 8
+
+# Request threads are budgeted explicitly. Slow commands (focusing windows, region
+# selection, bulk file operations, replay dumps) run on the request thread that
+# received them, but at most BLOCKING_MAX at once; long-lived requests (SSE streams,
+# wait_for_events and wait_for_launch) hold a thread while they wait, at most
+# WAITING_MAX at once. Beyond that they answer straight away, so the server pool
+# (at least MIN_SERVER_WORKERS) always keeps threads for health checks and captures.
+BLOCKING_COMMANDS = {'focus_window', 'start_region_selection',
+                     'start_system_region_selection', 'start_visual_region_selection', 'dump_replay',
+                     'clear_all_screenshots', 'organize_screenshots_by_app'}
+BLOCKING_MAX = 4
+blocking_slots = threading.BoundedSemaphore(BLOCKING_MAX)
+WAITING_MAX = 6
+waiting_slots = threading.BoundedSemaphore(WAITING_MAX)
+STREAM_MAX_SECONDS = 300  # SSE responses end after this; EventSource reconnects with Last-Event-ID
+INTERACTIVE_WORKERS = 4
+MIN_SERVER_WORKERS = BLOCKING_MAX + WAITING_MAX + INTERACTIVE_WORKERS
+
+def run_blocking_command(handler, data):
+    """Run a slow handler if fewer than BLOCKING_MAX are running, otherwise answer busy"""
+    if not blocking_slots.acquire(blocking=False):
+        return jsonify({'success': False, 'busy': True,
+                        'error': 'Too many slow operations (focus, region selection, bulk file '
+                                 'operations, replay dumps) in progress, try again shortly'})
+    try:
+        return handler(data)
+    finally:
+        blocking_slots.release()
+
+def run_command(command_type, data):
+    """Dispatch one command to its registered handler"""
+    handler = COMMAND_HANDLERS.get(command_type)
+    if handler is None:
+        return jsonify({'success': False, 'error': f'Unknown command: {command_type}'})
+    if command_type in BLOCKING_COMMANDS:
+        return run_blocking_command(handler, data or {})
+    return handler(data or {})
 
 @app.route('/api/command', methods=['POST'])
 def handle_command():
     try:
         command = request.json
-        command_type = command.get('type')
-        data = command.get('data', {})
-        
-        if command_type == 'get_running_apps':
-            return get_running_apps()
-        elif command_type == 'launch_app':
-            return launch_app(data.get('exe_path'))
-        elif command_type == 'focus_window':
-            return focus_window(data.get('title_keywords', []))
-        elif command_type == 'capture_screenshot':
-            return capture_screenshot(data.get('application'), data.get('region'))
-        elif command_type == 'start_region_selection':
-            return start_region_selection(data.get('application'))
-        elif command_type == 'capture_region_screenshot':
-            return capture_region_screenshot(data.get('region'))
-        elif command_type == 'save_screenshot_with_metadata':
-            return save_screenshot_with_metadata(data.get('filepath'), data.get('name'), data.get('description'), data.get('application_name'))
-        elif command_type == 'start_system_region_selection':
-            return start_system_region_selection(data.get('application'))
-        elif command_type == 'get_last_capture_result':
-            return get_last_capture_result()
-        elif command_type == 'create_session_json':
-            return create_session_json(data.get('application_name'), data.get('application_path'), data.get('screenshots'))
-        elif command_type == 'organize_screenshots_by_app':
-            return organize_screenshots_by_app(data.get('application_name'))
-        elif command_type == 'remove_screenshot':
-            return remove_screenshot(data.get('filepath'))
-        elif command_type == 'start_visual_region_selection':
-            return start_visual_region_selection(data.get('application'))
-        elif command_type == 'start_recording':
-            return start_recording(data.get('application'))
-        elif command_type == 'stop_recording':
-            return stop_recording()
-        elif command_type == 'get_screenshots':
-            return get_screenshots()
-        elif command_type == 'get_windows':
-            return get_windows()
-        elif command_type == 'health_check':
-            return health_check()
-        elif command_type == 'clear_all_screenshots':
-            return clear_all_screenshots()
-        elif command_type == 'read_json_file':
-            return read_json_file(data.get('filepath'))
-        elif command_type == 'check_file_exists':
-            return check_file_exists(data.get('filepath'))
-        elif command_type == 'cleanup_old_json_files':
-            return cleanup_old_json_files(data.get('application_name'))
-        elif command_type == 'cleanup_duplicate_screenshots':
-            return cleanup_duplicate_screenshots(data.get('application_name'))
-        else:
-            return jsonify({'success': False, 'error': f'Unknown command: {command_type}'})
+        return run_command(command.get('type'), command.get('data', {}))
             
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/batch', methods=['POST'])
+def handle_batch():
+    """Run several commands in one request: {"commands": [...], "mode": "sequence" | "parallel"}"""
+    try:
+        batch = request.json
+        return run_batch(batch.get('commands'), batch.get('mode', 'sequence'), batch.get('stop_on_error', False))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def run_batch_command(command):
+    """Run one batch entry and return its result with timing"""
+    started = time.perf_counter()
+    command_type = command.get('type')
+    try:
+        if command_type == 'batch':
+            raise ValueError('Batches cannot be nested')
+        # Parallel entries run on pool threads, which need their own app context for jsonify
+        with app.app_context():
+            result = run_command(command_type, command.get('data', {})).get_json()
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    
+    entry = {
+        'type': command_type,
+        'success': bool(result.get('success', False)),
+        'result': result,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+    }
+    if 'id' in command:
+        entry['id'] = command['id']
+    return entry
+
+def run_batch(commands, mode='sequence', stop_on_error=False):
+    """Run an ordered list of commands in sequence or in parallel; results keep the input order
+
+    With stop_on_error, a sequence ends at the first failed command. In parallel mode the
+    commands already running finish, and those not yet started are skipped and reported
+    with 'skipped': True.
+    """
+    try:
+        if not isinstance(commands, list):
+            raise ValueError('commands must be a list of {"type", "data"} objects')
+        if mode not in ('sequence', 'parallel'):
+            raise ValueError(f'Unknown batch mode: {mode}')
+        
+        started = time.perf_counter()
+        results = []
+        if mode == 'parallel' and len(commands) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(commands), BATCH_MAX_WORKERS),
+                                    thread_name_prefix='batch') as executor:
+                futures = [executor.submit(run_batch_command, command) for command in commands]
+                if stop_on_error:
+                    for future in as_completed(futures):
+                        if not future.result()['success']:
+                            for pending in futures:
+                                pending.cancel()
+                            break
+                for command, future in zip(commands, futures):
+                    if future.cancelled():
+                        entry = {'type': command.get('type'), 'success': False, 'skipped': True,
+                                 'result': {'success': False, 'error': 'Skipped after an earlier command failed'},
+                                 'elapsed_ms': 0.0}
+                        if 'id' in command:
+                            entry['id'] = command['id']
+                        results.append(entry)
+                    else:
+                        results.append(future.result())
+        else:
+            for command in commands:
+                entry = run_batch_command(command)
+                results.append(entry)
+                if stop_on_error and not entry['success']:
+                    break
+        
+        return jsonify({
+            'success': all(entry['success'] for entry in results) and len(results) == len(commands),
+            'mode': mode,
+            'results': results,
+            'completed': sum(1 for entry in results if not entry.get('skipped')),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 def launch_app(exe_path):
-    """Launch an application by path"""
+    """Launch an application by path; returns a job handle without waiting for the app"""
     try:
         # Clean and normalize the path - remove quotes and extra spaces
         exe_path = exe_path.strip().strip('"').strip("'")
@@ -107,23 +413,26 @@ def launch_app(exe_path):
             return jsonify({'success': False, 'error': f'Application not found: {exe_path}'})
         
         # Launch the application with proper shell handling for paths with spaces
-        if os.name == 'nt':  # Windows
-            process = subprocess.Popen([exe_path], 
-                                     stdout=subprocess.DEVNULL, 
-                                     stderr=subprocess.DEVNULL,
-                                     shell=True)
-        else:  # Unix/Linux
-            process = subprocess.Popen([exe_path], 
-                                     stdout=subprocess.DEVNULL, 
-                                     stderr=subprocess.DEVNULL)
-        
-        # Wait a bit for the app to start
-        time.sleep(2)
+        def start_process():
+            if os.name == 'nt':  # Windows
+                return subprocess.Popen([exe_path], 
+                                        stdout=subprocess.DEVNULL, 
+                                        stderr=subprocess.DEVNULL,
+                                        shell=True)
+            else:  # Unix/Linux
+                return subprocess.Popen([exe_path], 
+                                        stdout=subprocess.DEVNULL, 
+                                        stderr=subprocess.DEVNULL)
+        
+        # Readiness (a window owned by the new process) is tracked in the background
+        job = launch_tracker.launch(exe_path, start_process)
         
         return jsonify({
             'success': True,
             'message': f'Application launched: {os.path.basename(exe_path)}',
-            'pid': process.pid
+            'pid': job.pid,
+            'job_id': job.job_id,
+            'state': job.state
         })
         
     except Exception as e:
@@ -131,65 +440,51 @@ def launch_app(exe_path):
         print(error_msg)
         return jsonify({'success': False, 'error': error_msg})
 
+def get_launch_status(job_id):
+    """Current state of a launch job"""
+    job = launch_tracker.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Unknown launch job: {job_id}'})
+    return jsonify({'success': True, **job.to_dict()})
+
+def wait_for_launch(job_id, timeout=30):
+    """Wait up to timeout seconds for a launched application to show its window"""
+    try:
+        waiting = waiting_slots.acquire(blocking=False)
+        try:
+            job = launch_tracker.wait(job_id, min(float(timeout), LAUNCH_WAIT_MAX) if waiting else 0)
+        finally:
+            if waiting:
+                waiting_slots.release()
+        if job is None:
+            return jsonify({'success': False, 'error': f'Unknown launch job: {job_id}'})
+        return jsonify({'success': job.state != 'starting' and job.error is None,
+                        'timed_out': job.state == 'starting',
+                        **job.to_dict()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def list_top_level_windows():
+    """Visible top-level windows (cached for the index TTL), or None where they cannot be listed"""
+    if not window_index.platform.lists_windows:
+        return None
+    return window_index.windows()
+
 def focus_window(title_keywords):
-    """Focus a window by title keywords"""
+    """Focus the window that best matches the keywords (title, class or process name)"""
     try:
-        import win32gui
-        import win32con
-        import win32api
-        import time
+        focused, window, candidates = window_index.focus_best(title_keywords)
         
-        found_windows = []
-        
-        def enum_windows_callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd):
-                window_title = win32gui.GetWindowText(hwnd)
-                if window_title and any(keyword.lower() in window_title.lower() for keyword in title_keywords):
-                    windows.append((hwnd, window_title))
-            return True  # Continue enumeration
-        
-        win32gui.EnumWindows(enum_windows_callback, found_windows)
-        
-        if found_windows:
-            # Focus the first matching window
-            hwnd, title = found_windows[0]
-            
-            # More aggressive window focusing
-            try:
-                # 1. Restore the window if it's minimized
-                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                time.sleep(0.1)
-                
-                # 2. Set the window as foreground
-                win32gui.SetForegroundWindow(hwnd)
-                time.sleep(0.1)
-                
-                # 3. Bring window to top
-                win32gui.BringWindowToTop(hwnd)
-                time.sleep(0.1)
-                
-                # 4. Set focus to the window
-                win32gui.SetFocus(hwnd)
-                time.sleep(0.1)
-                
-                # 5. Force the window to be active
-                win32api.SendMessage(hwnd, win32con.WM_ACTIVATE, win32con.WA_ACTIVE, 0)
-                
-                # 6. Additional attempt to bring to front
-                win32gui.SetWindowPos(hwnd, win32con.HWND_TOPMOST, 0, 0, 0, 0, 
-                                    win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
-                time.sleep(0.1)
-                win32gui.SetWindowPos(hwnd, win32con.HWND_NOTOPMOST, 0, 0, 0, 0, 
-                                    win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
-                
-            except Exception as focus_error:
-                print(f"Focus error: {focus_error}")
-            
+        if window:
             return jsonify({
-                'success': True, 
-                'window_focused': True,
-                'message': f'Window focused: {title}',
-                'window_title': title
+                'success': focused, 
+                'window_focused': focused,
+                'message': f'Window focused: {window["title"]}' if focused else f'Could not focus window: {window["title"]}',
+                'window_title': window['title'],
+                'hwnd': window['hwnd'],
+                'pid': window.get('pid'),
+                'score': window['score'],
+                'candidates': candidates
             })
         else:
             return jsonify({
@@ -210,37 +505,78 @@ def health_check():
         'message': 'Backend is running'
     })
 
-def get_running_apps():
-    """Get list of running applications"""
+def get_startup_report():
+    """Durations of the startup phases and of the deferred heavy imports so far"""
+    return jsonify({'success': True, **startup_timer.report(), 'lazy_imports_ms': dict(import_times)})
+
+def get_capture_stats():
+    """Get latency counters of the persistent capture engine"""
     try:
-        apps = []
-        for proc in psutil.process_iter(['pid', 'name', 'exe']):
-            try:
-                # Get process info
-                pinfo = proc.info
-                if pinfo['name'] and pinfo['name'] != 'System Idle Process':
-                    apps.append({
-                        'name': pinfo['name'],
-                        'pid': pinfo['pid'],
-                        'windowTitle': pinfo['name'],  # Simplified - you might want to get actual window titles
-                        'path': pinfo.get('exe', '')
-                    })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        
-        # Remove duplicates and sort
-        unique_apps = []
-        seen_names = set()
-        for app in apps:
-            if app['name'] not in seen_names:
-                seen_names.add(app['name'])
-                unique_apps.append(app)
+        return jsonify({
+            'success': True,
+            'stats': capture_engine.get_stats(),
+            'multi_monitor': multi_monitor.get_stats(),
+            'session_journals': session_journals.get_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def get_monitors(refresh=False):
+    """Monitor table: index 0 is the whole virtual desktop, 1 the primary display"""
+    try:
+        monitors = capture_engine.refresh_monitors() if refresh else capture_engine.monitors
+        return jsonify({
+            'success': True,
+            'monitors': [{'monitor': index, **monitor} for index, monitor in enumerate(monitors)]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def get_encoder(overrides=None):
+    """Image encoder using the default settings plus per-call overrides"""
+    return ImageEncoder({**encoder_settings, **(overrides or {})})
+
+def get_encoder_settings():
+    """Get the default image encoder settings"""
+    return jsonify({'success': True, 'settings': encoder_settings})
+
+def set_encoder_settings(settings):
+    """Update the default image encoder settings used by captures and recordings"""
+    global encoder_settings
+    try:
+        # Validate before replacing the current settings
+        encoder = get_encoder(settings)
+        encoder_settings = encoder.settings
+        return jsonify({'success': True, 'settings': encoder_settings})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def get_running_apps(since=None, windowed_only=False):
+    """Get running applications: the full list, or only the changes since a version token"""
+    try:
+        process_table.start()
+        
+        if since:
+            changes = process_table.changes_since(since, windowed_only)
+            if changes is not None:
+                version, updated, removed = changes
+                return jsonify({
+                    'success': True,
+                    'full': False,
+                    'version': version,
+                    'updated': updated,
+                    'removed': removed
+                })
+            # Token from an older backend or beyond the change log: fall back to the full list
         
-        unique_apps.sort(key=lambda x: x['name'])
+        version, apps = process_table.snapshot(windowed_only)
+        apps.sort(key=lambda x: (x['name'].lower(), x['pid']))
         
         return jsonify({
             'success': True,
-            'apps': unique_apps[:50]  # Limit to 50 apps
+            'full': True,
+            'version': version,
+            'apps': apps
         })
         
     except Exception as e:
@@ -249,22 +585,7 @@ def get_running_apps():
 def get_windows():
     """Get list of all visible windows for debugging"""
     try:
-        import win32gui
-        
-        windows = []
-        
-        def enum_windows_callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd):
-                window_title = win32gui.GetWindowText(hwnd)
-                if window_title:  # Only include windows with titles
-                    windows.append({
-                        'hwnd': hwnd,
-                        'title': window_title,
-                        'class_name': win32gui.GetClassName(hwnd)
-                    })
-            return True
-        
-        win32gui.EnumWindows(enum_windows_callback, windows)
+        windows = window_index.windows()
         
         # Sort by title
         windows.sort(key=lambda x: x['title'].lower())
@@ -277,39 +598,104 @@ def get_windows():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-def capture_screenshot(application=None, region=None):
-    """Capture screenshot for specific application or region"""
+def screenshot_saved(filepath, metadata=None, thumbnail=True):
+    """Index a newly written screenshot and queue its preview"""
+    screenshot_catalog.add(filepath, metadata)
+    if thumbnail:
+        # Previews for high-rate recording frames are created on demand instead
+        try:
+            thumbnail_service.submit(filepath)
+        except Exception as e:
+            print(f"Error queueing thumbnail for {filepath}: {e}")
+
+def screenshot_moved(old_path, new_path, metadata=None):
+    """Update the index after a screenshot moved (previews are keyed by path)"""
+    screenshot_catalog.remove(old_path)
+    screenshot_saved(new_path, metadata)
+
+def screenshot_removed(filepath):
+    """Drop a deleted screenshot from the index; its preview ages out of the LRU cache"""
+    screenshot_catalog.remove(filepath)
+
+def get_thumbnail(filepath, max_size=None):
+    """Get the path of the cached preview of a screenshot, creating it if needed"""
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if not filepath or not os.path.isfile(filepath):
+            return jsonify({'success': False, 'error': 'Screenshot file not found'})
+        
+        return jsonify({
+            'success': True,
+            'filepath': str(Path(filepath).absolute()),
+            'thumbnail_path': thumbnail_service.get(filepath, max_size),
+            'stats': thumbnail_service.get_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def capture_monitors(application, monitors, layout, image_encoder, now=None):
+    """Capture several monitors concurrently, as one stitched image or one image per monitor"""
+    if layout not in MONITOR_LAYOUTS:
+        raise ValueError(f'Unknown monitor layout: {layout}')
+    
+    if layout == 'stitched':
+        array, origin, frames = multi_monitor.grab_stitched(monitors)
+        parts = [(f"screenshot_{application or 'screen'}", array)]
+    else:
+        frames = multi_monitor.grab(monitors)
+        origin = None
+        parts = [(f"screenshot_{application or 'screen'}_m{frame.index}", frame.array) for frame in frames]
+    
+    # One timestamp for every file of this capture; unique_path keeps captures apart
+    now = now or datetime.now()
+    files = []
+    for stem, array in parts:
+        encoded = image_encoder.encode(array)
+        filepath = unique_path(screenshots_dir, stem, image_encoder.extension, now)
+        filename = filepath.name
+        encoded.save(filepath)
+        screenshot_saved(filepath)
+        files.append({'filepath': str(filepath.absolute()), 'filename': filename, 'encoding': encoded.to_dict()})
+    
+    result = {
+        'success': True,
+        **files[0],
+        'layout': layout,
+        'monitors': [frame.to_dict() for frame in frames]
+    }
+    if origin is not None:
+        result['origin'] = origin
+    if layout == 'separate':
+        result['files'] = files
+    return jsonify(result)
+
+def capture_screenshot(application=None, region=None, encoder=None, monitors=None, layout='stitched'):
+    """Capture screenshot for specific application, region or set of monitors"""
+    try:
+        image_encoder = get_encoder(encoder)
+        
+        if monitors and not region:
+            return capture_monitors(application, monitors, layout, image_encoder)
         
         if region:
             # Capture specific region
-            filename = f"screenshot_region_{timestamp}.png"
-            filepath = screenshots_dir / filename
-            
-            with mss.mss() as sct:
-                monitor = {
-                    "top": region["y"],
-                    "left": region["x"],
-                    "width": region["width"],
-                    "height": region["height"]
-                }
-                screenshot = sct.grab(monitor)
-                mss.tools.to_png(screenshot.rgb, screenshot.size, output=str(filepath))
+            stem = "screenshot_region"
+            screenshot = capture_engine.grab(region)
         else:
             # Capture entire screen
-            filename = f"screenshot_{application or 'screen'}_{timestamp}.png"
-            filepath = screenshots_dir / filename
-            
-            with mss.mss() as sct:
-                monitor = sct.monitors[1]  # Primary monitor
-                screenshot = sct.grab(monitor)
-                mss.tools.to_png(screenshot.rgb, screenshot.size, output=str(filepath))
+            stem = f"screenshot_{application or 'screen'}"
+            screenshot = capture_engine.grab(monitor=1)  # Primary monitor
+        
+        encoded = image_encoder.encode(screenshot)
+        filepath = unique_path(screenshots_dir, stem, image_encoder.extension)
+        filename = filepath.name
+        encoded.save(filepath)
+        screenshot_saved(filepath)
         
         return jsonify({
             'success': True,
             'filepath': str(filepath.absolute()),
-            'filename': filename
+            'filename': filename,
+            'encoding': encoded.to_dict()
         })
         
     except Exception as e:
@@ -318,76 +704,21 @@ def capture_screenshot(application=None, region=None):
 def start_region_selection(application):
     """Start region selection process - focus the application first"""
     try:
+        window_focused = False
+        focused_window = None
+        
         if application:
             print(f"Attempting to focus application: {application}")
             
-            # Extract different possible window names
-            exe_name = os.path.basename(application).replace('.exe', '')
-            app_name = exe_name.replace('.exe', '')
-            
-            # Try multiple strategies to find and focus the window
-            focus_strategies = [
-                [application],  # Full path
-                [exe_name],     # Just executable name
-                [app_name],     # Without .exe
-                [exe_name.lower()],  # Lowercase
-                [app_name.lower()],  # Lowercase without .exe
-            ]
-            
-            # Add specific patterns for known applications
-            if 'SSMS' in application or 'sql' in application.lower():
-                focus_strategies.extend([
-                    ['Microsoft SQL Server Management Studio'],
-                    ['SQL Server Management Studio'],
-                    ['SSMS'],
-                    ['Management Studio']
-                ])
-            elif 'chrome' in application.lower():
-                focus_strategies.extend([
-                    ['Chrome'],
-                    ['Google Chrome'],
-                    ['chrome.exe']
-                ])
-            elif 'firefox' in application.lower():
-                focus_strategies.extend([
-                    ['Firefox'],
-                    ['Mozilla Firefox'],
-                    ['firefox.exe']
-                ])
-            
-            window_focused = False
-            focused_window = None
-            
-            for strategy in focus_strategies:
-                print(f"Trying focus strategy: {strategy}")
-                focus_result = focus_window(strategy)
-                
-                if focus_result.json.get('window_focused', False):
-                    window_focused = True
-                    focused_window = focus_result.json.get('window_title', 'Unknown')
-                    print(f"Successfully focused window: {focused_window}")
-                    break
-                else:
-                    print(f"Strategy failed: {focus_result.json.get('message', 'Unknown error')}")
-            
-            if not window_focused:
-                # Last resort: try to get all windows and find the best match
-                print("Trying to get all windows for manual matching...")
-                windows_response = get_windows()
-                if windows_response.json.get('success'):
-                    windows = windows_response.json.get('windows', [])
-                    print(f"Found {len(windows)} windows")
-                    
-                    # Look for windows that might match our application
-                    for window in windows:
-                        window_title = window.get('title', '').lower()
-                        if any(keyword.lower() in window_title for keyword in [exe_name, app_name]):
-                            print(f"Found potential match: {window.get('title')}")
-                            focus_result = focus_window([window.get('title')])
-                            if focus_result.json.get('window_focused', False):
-                                window_focused = True
-                                focused_window = window.get('title')
-                                break
+            # One ranked lookup over title, class and process name (known aliases such
+            # as SSMS -> "Microsoft SQL Server Management Studio" are added by the index)
+            focus_result = focus_window([application]).json
+            window_focused = focus_result.get('window_focused', False)
+            if window_focused:
+                focused_window = focus_result.get('window_title', 'Unknown')
+                print(f"Successfully focused window: {focused_window} (score {focus_result.get('score')})")
+            else:
+                print(f"Focus failed: {focus_result.get('message', focus_result.get('error', 'Unknown error'))}")
         
         # Return success to indicate ready for region selection
         return jsonify({
@@ -401,32 +732,30 @@ def start_region_selection(application):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-def capture_region_screenshot(region):
+def save_region_capture(region, encoder=None, frame=None):
+    """Grab (unless the pixels are given as frame), encode and save one screen region"""
+    image_encoder = get_encoder(encoder)
+    screenshot = capture_engine.grab(region) if frame is None else frame
+    encoded = image_encoder.encode(screenshot)
+    
+    # Save to main screenshots directory (not python_backend/screenshots)
+    filepath = unique_path(screenshots_dir, "region_screenshot", image_encoder.extension)
+    filename = filepath.name
+    encoded.save(filepath)
+    screenshot_saved(filepath)
+    
+    return {
+        'success': True,
+        'filepath': str(filepath.absolute()),
+        'filename': filename,
+        'region': region,
+        'encoding': encoded.to_dict()
+    }
+
+def capture_region_screenshot(region, encoder=None):
     """Capture screenshot of specific region"""
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"region_screenshot_{timestamp}.png"
-        
-        # Save to main screenshots directory (not python_backend/screenshots)
-        filepath = screenshots_dir / filename
-        
-        with mss.mss() as sct:
-            monitor = {
-                "top": region["y"],
-                "left": region["x"],
-                "width": region["width"],
-                "height": region["height"]
-            }
-            screenshot = sct.grab(monitor)
-            mss.tools.to_png(screenshot.rgb, screenshot.size, output=str(filepath))
-        
-        result = {
-            'success': True,
-            'filepath': str(filepath.absolute()),
-            'filename': filename,
-            'region': region
-        }
-        
+        result = save_region_capture(region, encoder)
         print(f"Region screenshot captured: {result}")
         return jsonify(result)
         
@@ -435,15 +764,90 @@ def capture_region_screenshot(region):
         print(error_msg)
         return jsonify({'success': False, 'error': error_msg})
 
-def check_duplicate_screenshot(app_folder, clean_name):
-    """Check if a screenshot with the same name already exists and return the existing file if found"""
+def get_app_folder(application_name):
+    """Application folder under the screenshots directory (not created)"""
+    return screenshots_dir / clean_app_name(application_name)
+
+def unique_path(folder, stem, suffix, now=None):
+    """folder/<stem>_<timestamp with milliseconds><suffix>, reserved on disk so saves never collide"""
+    stamp = (now or datetime.now()).strftime('%Y%m%d_%H%M%S_%f')[:-3]
+    for attempt in itertools.count():
+        path = Path(folder) / (f"{stem}_{stamp}{suffix}" if attempt == 0 else f"{stem}_{stamp}_{attempt}{suffix}")
+        try:
+            # Exclusive create: a concurrent save of the same name gets the next suffix
+            with open(path, 'x'):
+                return path
+        except FileExistsError:
+            continue
+
+def session_entry(name, image_path, digest, description='', timestamp=None, **extra):
+    """One screenshot of an {app}.json session"""
+    return {
+        "image_name": name,
+        "image_path": str(Path(image_path).absolute()),
+        "sha256": digest,
+        "description": description or '',
+        "timestamp": timestamp or datetime.now().isoformat(),
+        **extra
+    }
+
+# Saved screenshots are named <clean name>_<timestamp>[_<n>] by unique_path
+CAPTURE_NAME_PATTERN = re.compile(r'^(.*)_\d{8}_\d{6}(?:_\d{3})?(?:_\d+)?$')
+
+def capture_name(path):
+    """The clean name a screenshot was saved under (its stem without the timestamp)"""
+    stem = Path(path).stem
+    match = CAPTURE_NAME_PATTERN.match(stem)
+    return match.group(1) if match else stem
+
+def same_bytes(path, digest):
+    """Whether a file holds exactly the bytes with this SHA-256 digest"""
+    blob = blob_store.blob_path(digest, Path(path).suffix)
+    try:
+        # Hard links into the blob store answer this without reading the file
+        if os.path.exists(blob) and os.path.samefile(blob, path):
+            return True
+        return blob_store.hash_file(path) == digest
+    except OSError:
+        return False
+
+def find_exact_duplicate(app_folder, clean_name, digest, size, exclude=None):
+    """An existing screenshot with the same clean name and byte-identical content, or None"""
+    exclude = os.path.abspath(str(exclude)) if exclude else None
+    for path in scan_folder(app_folder, IMAGE_EXTENSIONS):
+        if os.path.abspath(path) == exclude or capture_name(path) != clean_name:
+            continue
+        try:
+            if os.path.getsize(path) != size:
+                continue
+        except OSError:
+            continue
+        if same_bytes(path, digest):
+            return Path(path)
+    return None
+
+def journal_removed_screenshots(paths):
+    """Append remove records for screenshots that left an application folder"""
+    app_root = screenshots_dir.absolute()
+    leaving = {}
+    for path in paths:
+        absolute = Path(path).absolute()
+        if absolute.parent.parent == app_root:
+            leaving.setdefault(absolute.parent, []).append(str(absolute))
+    for folder, image_paths in leaving.items():
+        journal = session_journals.get(folder)
+        journal.append(*[{'op': 'remove', 'image_path': p} for p in image_paths if journal.entry(p) is not None])
+
+def check_duplicate_screenshot(app_folder, fingerprint, exclude=None, max_distance=DUPLICATE_MAX_DISTANCE):
+    """Check if a visually similar screenshot already exists and return the existing file if found"""
     try:
         if not app_folder.exists():
             return None
         
-        # Look for existing files with the same base name
-        for file in app_folder.glob(f"{clean_name}_*.png"):
-            return file
+        # Compare image content, not file names
+        matches = perceptual_index.find(app_folder, fingerprint, max_distance, exclude=exclude)
+        if matches:
+            return Path(matches[0][1])
         
         return None
     except Exception as e:
@@ -453,13 +857,9 @@ def check_duplicate_screenshot(app_folder, clean_name):
 def save_screenshot_with_metadata(filepath, name, description, application_name=None):
     """Save screenshot with metadata (name and description) and move to app folder"""
     try:
-        import shutil
-        # Clean application name for folder creation - remove invalid characters
         app_folder = screenshots_dir
         if application_name:
-            clean_app_name = re.sub(r'[<>:"/\\|?*]', '_', application_name)
-            clean_app_name = clean_app_name.replace('.exe', '').replace(' ', '_').strip('_')
-            app_folder = screenshots_dir / clean_app_name
+            app_folder = get_app_folder(application_name)
             app_folder.mkdir(exist_ok=True)
         
         # Move the screenshot to the app folder
@@ -470,167 +870,256 @@ def save_screenshot_with_metadata(filepath, name, description, application_name=
         # Create clean filename
         clean_name = re.sub(r'[<>:"/\\|?*]', '_', name)
         
-        # Check for existing screenshot with the same name
-        existing_file = check_duplicate_screenshot(app_folder, clean_name)
+        # Only a byte-identical capture of the same named step is dropped; look-alikes
+        # (an empty UserName box and an empty Password box) are different steps
+        digest = blob_store.hash_file(original_path)
+        existing_file = find_exact_duplicate(app_folder, clean_name, digest, original_path.stat().st_size,
+                                             exclude=original_path)
         
         if existing_file:
             # If duplicate exists, remove the new file and return the existing one
             original_path.unlink()  # Remove the new screenshot
+            screenshot_removed(original_path)
+            if application_name:
+                # The step stays in the session, now pointing at the existing file
+                session_journals.get(app_folder, application_name).append(
+                    {'op': 'capture', 'entry': session_entry(name, existing_file, digest, description)})
             return jsonify({
                 'success': True,
                 'message': 'Screenshot already exists, using existing file',
                 'filepath': str(existing_file.absolute()),
+                'sha256': digest,
                 'is_duplicate': True
             })
         
+        # Visually similar screenshots are reported, never removed
+        fingerprint = perceptual_index.fingerprint(original_path)
+        similar_file = check_duplicate_screenshot(app_folder, fingerprint, exclude=original_path)
+        
         # Create new filename with timestamp
-        new_filename = f"{clean_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        new_path = app_folder / new_filename
+        new_path = unique_path(app_folder, clean_name, original_path.suffix)
+        new_filename = new_path.name
+        
+        # Move file to app folder, storing its bytes once in the blob store
+        blob_store.place(original_path, new_path, digest)
+        screenshot_moved(original_path, new_path, {
+            'name': name,
+            'description': description,
+            'application': application_name
+        })
+        # Same bytes under a new name, so the fingerprint carries over without re-decoding
+        stat = new_path.stat()
+        screenshot_catalog.set_hash(new_path, stat.st_mtime, stat.st_size, fingerprint)
         
-        # Move file to app folder
-        shutil.move(str(original_path), str(new_path))
+        if application_name:
+            # One journal line instead of rewriting the session JSON
+            session_journals.get(app_folder, application_name).append(
+                {'op': 'capture', 'entry': session_entry(name, new_path, digest, description)})
         
         return jsonify({
             'success': True,
             'message': 'Screenshot saved successfully',
             'filepath': str(new_path.absolute()),
             'filename': new_filename,
-            'is_duplicate': False
+            'sha256': digest,
+            'is_duplicate': False,
+            'similar_to': str(similar_file.absolute()) if similar_file else None
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-def start_system_region_selection(application):
-    """Start system-wide region selection using Python overlay"""
+def find_window_origin(application):
+    """Top-left screen corner of the application's best-matching visible window, or None"""
+    candidates = window_index.find([application], limit=1)
+    if not candidates:
+        return None
+    rect = window_index.platform.rect(candidates[0]['hwnd'])
+    if not isinstance(rect, dict):
+        # Minimized or closed since the window list was taken
+        return None
+    return {'x': rect['x'], 'y': rect['y']}
+
+def get_region_presets(application):
+    """Named capture regions saved for an application"""
+    try:
+        return jsonify({'success': True, 'application': application, 'presets': region_presets.get(application)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def save_region_preset(application, name, region, description=None, key=None, anchor='window'):
+    """Save a screen-coordinate region under a name, relative to the application window by default"""
     try:
-        import tkinter as tk
-        from tkinter import Canvas
-        import threading
-        
-        if application:
-            # Focus the application first
-            focus_result = focus_window([application])
-            if not focus_result.json.get('window_focused', False):
-                # Try alternative approaches
-                exe_name = os.path.basename(application).replace('.exe', '')
-                focus_result = focus_window([exe_name])
-        
-        # Create a system-wide overlay window
-        def create_overlay():
-            root = tk.Tk()
-            root.attributes('-fullscreen', True)
-            root.attributes('-alpha', 0.3)
-            root.attributes('-topmost', True)
-            root.configure(bg='black')
-            
-            canvas = Canvas(root, bg='black', highlightthickness=0)
-            canvas.pack(fill='both', expand=True)
-            
-            start_x, start_y = 0, 0
-            selection_rect = None
-            
-            def on_mouse_down(event):
-                nonlocal start_x, start_y, selection_rect
-                start_x, start_y = event.x, event.y
-                if selection_rect:
-                    canvas.delete(selection_rect)
-                selection_rect = canvas.create_rectangle(start_x, start_y, start_x, start_y, 
-                                                      outline='#ff5722', width=2, dash=(5,5))
-            
-            def on_mouse_move(event):
-                nonlocal selection_rect
-                if selection_rect:
-                    canvas.coords(selection_rect, start_x, start_y, event.x, event.y)
-            
-            def on_mouse_up(event):
-                nonlocal selection_rect
-                if selection_rect:
-                    x1, y1, x2, y2 = canvas.coords(selection_rect)
-                    x = min(x1, x2)
-                    y = min(y1, y2)
-                    width = abs(x2 - x1)
-                    height = abs(y2 - y1)
-                    
-                    if width > 10 and height > 10:
-                        # Capture the region
-                        region = {'x': int(x), 'y': int(y), 'width': int(width), 'height': int(height)}
-                        capture_result = capture_region_screenshot(region)
-                        
-                        # Store the result for the frontend to retrieve
-                        global last_capture_result
-                        last_capture_result = capture_result.json
-                    
-                root.destroy()
-            
-            def on_escape(event):
-                root.destroy()
-            
-            canvas.bind('<Button-1>', on_mouse_down)
-            canvas.bind('<B1-Motion>', on_mouse_move)
-            canvas.bind('<ButtonRelease-1>', on_mouse_up)
-            root.bind('<Escape>', on_escape)
-            
-            # Instructions
-            instruction = canvas.create_text(root.winfo_screenwidth()//2, 50, 
-                                          text="Click and drag to select a region. Press ESC to cancel.", 
-                                          fill='white', font=('Arial', 16))
-            
-            root.mainloop()
-        
-        # Run the overlay in a separate thread
-        overlay_thread = threading.Thread(target=create_overlay)
-        overlay_thread.daemon = True
-        overlay_thread.start()
+        if anchor not in REGION_ANCHORS:
+            return jsonify({'success': False, 'error': f'Unknown anchor: {anchor}'})
+        origin = None
+        if anchor == 'window':
+            origin = find_window_origin(application)
+            if origin is None:
+                return jsonify({'success': False,
+                                'error': f"No visible window found for application: {application} (use anchor 'screen')"})
+        preset = region_presets.save(application, name, region, origin, description=description, key=key)
+        return jsonify({'success': True, 'application': application, 'name': name, 'preset': preset, 'origin': origin})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def delete_region_preset(application, name):
+    """Forget a named region"""
+    try:
+        if not region_presets.delete(application, name):
+            return jsonify({'success': False, 'error': f'No region preset named {name} for {application}'})
+        return jsonify({'success': True, 'application': application, 'name': name})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def batch_capture_regions(application, names=None, application_path=None, encoder=None):
+    """Capture several named regions from one grab and write them all into the application's session"""
+    try:
+        presets = region_presets.get(application)
+        names = list(names or presets)
+        if not names:
+            return jsonify({'success': False, 'error': f'No region presets saved for application: {application}'})
+        missing = [name for name in names if name not in presets]
+        if missing:
+            return jsonify({'success': False, 'error': f'Unknown region presets: {", ".join(missing)}'})
+        
+        origin = None
+        if any(presets[name].get('anchor', 'window') == 'window' for name in names):
+            origin = find_window_origin(application)
+        regions = {name: RegionPresetStore.resolve(presets[name], origin) for name in names}
+        
+        # One grab covering every region; each crop is a view into it
+        left = min(r['x'] for r in regions.values())
+        top = min(r['y'] for r in regions.values())
+        right = max(r['x'] + r['width'] for r in regions.values())
+        bottom = max(r['y'] + r['height'] for r in regions.values())
+        started = time.perf_counter()
+        frame = frame_to_array(capture_engine.grab({'x': left, 'y': top, 'width': right - left, 'height': bottom - top}))
+        grab_seconds = time.perf_counter() - started
+        crops = {name: frame[r['y'] - top:r['y'] - top + r['height'], r['x'] - left:r['x'] - left + r['width']]
+                 for name, r in regions.items()}
+        
+        image_encoder = get_encoder(encoder)
+        started = time.perf_counter()
+        futures = {name: batch_encode_executor.submit(image_encoder.encode, crop) for name, crop in crops.items()}
+        encoded = {name: future.result() for name, future in futures.items()}
+        encode_seconds = time.perf_counter() - started
+        
+        app_folder = get_app_folder(application)
+        app_folder.mkdir(exist_ok=True)
+        journal = session_journals.get(app_folder, application)
+        now = datetime.now()
+        records, captures = [], []
+        if application_path:
+            records.append({'op': 'session', 'fields': {'application_path': application_path}})
+        # A new crop of a named field replaces the session's previous one
+        replaced = [entry['image_path'] for entry in journal.entries() if entry.get('image_name') in regions]
+        records.extend({'op': 'remove', 'image_path': image_path} for image_path in replaced)
+        for name in names:
+            image = encoded[name]
+            preset = presets[name]
+            clean_name = re.sub(r'[<>:"/\\|?*]', '_', name)
+            new_path = unique_path(app_folder, clean_name, image.extension, now)
+            image.save(new_path)
+            # Written in place, then swapped for a link to the shared blob
+            digest = blob_store.place(new_path, new_path, hashlib.sha256(image.data).hexdigest())
+            screenshot_saved(new_path, {
+                'name': name,
+                'description': preset.get('description', ''),
+                'application': application,
+                'created_at': now.isoformat()
+            })
+            extra = {"key": preset['key']} if preset.get('key') is not None else {}
+            records.append({'op': 'capture', 'entry': session_entry(name, new_path, digest, preset.get('description', ''),
+                                                                    now.isoformat(), region=regions[name], **extra)})
+            captures.append({'name': name, 'filepath': str(new_path.absolute()), 'filename': new_path.name,
+                             'region': regions[name], 'sha256': digest, 'encoding': image.to_dict()})
+        
+        journal.append(*records)
+        
+        # The replaced crops belong to no session any more, so their files go as well
+        # (with their metadata files); unlinking also drops their blob references
+        replaced = [Path(p) for p in replaced if Path(p).absolute().parent == app_folder.absolute()]
+        targets = [str(p) for p in replaced] + [str(p.with_suffix('.json')) for p in replaced
+                                                if p.with_suffix('.json').exists()]
+        removed = file_ops.remove(targets, 'batch_capture_regions').completed if targets else []
+        screenshot_catalog.remove_many(removed)
         
-        return jsonify({
+        result = {
             'success': True,
-            'message': 'System region selection started',
-            'application': application
-        })
+            'message': f'Captured {len(captures)} regions into the session',
+            'json_file': str(journal.json_file.absolute()),
+            'app_folder': str(app_folder.absolute()),
+            'origin': origin,
+            'captures': captures,
+            'replaced': [str(p.absolute()) for p in replaced if str(p) in removed],
+            'grab_ms': round(grab_seconds * 1000, 3),
+            'encode_ms': round(encode_seconds * 1000, 3)
+        }
+        event_bus.publish('capture_complete', {'source': 'batch_capture', **result})
+        return jsonify(result)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-# Global variable to store last capture result
-last_capture_result = None
+def start_system_region_selection(application, freeze=True):
+    """Start system-wide region selection on the persistent overlay"""
+    return show_region_overlay(application, 'system_region_selection', 'system', freeze)
+
+# Sequence number of the last capture result handed out by get_last_capture_result
+last_capture_result_seq = 0
 
 def get_last_capture_result():
-    """Get the result of the last system region capture"""
-    global last_capture_result
-    if last_capture_result:
-        result = last_capture_result
-        last_capture_result = None  # Clear after retrieving
-        return jsonify(result)
+    """Get the result of the last region capture (kept for clients that still poll)"""
+    global last_capture_result_seq
+    events = event_bus.since(last_capture_result_seq, ['capture_complete'])
+    if events:
+        event = events[-1]
+        last_capture_result_seq = event['seq']  # Clear after retrieving
+        return jsonify({**event['data'], 'event_seq': event['seq']})
     else:
         return jsonify({'success': False, 'error': 'No capture result available'})
 
+def wait_for_events(since=None, timeout=25, types=None):
+    """Long-poll: return events after since, waiting up to timeout seconds for the first one"""
+    try:
+        since = event_bus.sequence if since is None else int(since)
+        # Without a free waiting slot, answer with what is there instead of holding a thread
+        waiting = waiting_slots.acquire(blocking=False)
+        try:
+            events = event_bus.wait(since, min(float(timeout), 60.0) if waiting else 0, types)
+        finally:
+            if waiting:
+                waiting_slots.release()
+        return jsonify({
+            'success': True,
+            'busy': not waiting,
+            'events': events,
+            'sequence': events[-1]['seq'] if events else since,
+            # The history is bounded; tell the client when older events were dropped
+            'missed_events': since + 1 < event_bus.oldest_sequence()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 def create_session_json(application_name, application_path, screenshots_data):
-    """Create JSON file for session with organized structure"""
+    """Record the session's screenshots in the application's journal (compacted into {app}.json)
+
+    Only differences from the recorded session are written: screenshots already in the
+    application folder get an edit record if their name or description changed, new ones
+    are moved in and recorded, and recorded screenshots missing from the list are removed.
+    """
     try:
-        # Clean application name for folder creation - remove invalid characters
-        clean_app_name = re.sub(r'[<>:"/\\|?*]', '_', application_name)
-        clean_app_name = clean_app_name.replace('.exe', '').replace(' ', '_').strip('_')
-        
-        # Create application-specific folder
-        app_folder = screenshots_dir / clean_app_name
+        app_folder = get_app_folder(application_name)
         app_folder.mkdir(exist_ok=True)
-        
-        # Remove any existing JSON file for this application to ensure only one JSON
-        existing_json = app_folder / f"{clean_app_name}.json"
-        if existing_json.exists():
-            existing_json.unlink()
-            print(f"Removed existing JSON file: {existing_json}")
-        
-        # Create JSON structure
-        json_structure = {
-            "application_name": application_name,
-            "application_path": application_path,
-            "session_timestamp": datetime.now().isoformat(),
-            "screenshots": []
-        }
-        
-        # Process screenshots and move them to app folder
-        processed_count = 0
+        journal = session_journals.get(app_folder, application_name)
+        folder = app_folder.absolute()
+        
+        records = [{'op': 'session', 'fields': {
+            'application_name': application_name,
+            'application_path': application_path,
+            'session_timestamp': datetime.now().isoformat()
+        }}]
+        kept = set()
         for screenshot_info in screenshots_data:
             original_path = Path(screenshot_info['path'])
             
@@ -646,41 +1135,55 @@ def create_session_json(application_name, application_path, screenshots_data):
                     print(f"File not found: {original_path}")
                     continue
             
-            if original_path.exists():
+            image_path = str(original_path.absolute())
+            fields = {'image_name': screenshot_info['name'], 'description': screenshot_info.get('description', '')}
+            existing = journal.entry(image_path)
+            if existing is not None:
+                # Already part of the session: record only what changed
+                changed = {key: value for key, value in fields.items() if existing.get(key) != value}
+                if changed:
+                    records.append({'op': 'edit', 'image_path': image_path, 'fields': changed})
+                kept.add(image_path)
+                continue
+            
+            if original_path.parent.absolute() == folder:
+                # Saved into the application folder before journaling: record it where it is
+                new_path = original_path
+            else:
                 # Create clean filename based on screenshot name
                 clean_name = re.sub(r'[<>:"/\\|?*]', '_', screenshot_info['name'])
-                new_filename = f"{clean_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                new_path = app_folder / new_filename
-                
-                # Move file to app folder
-                import shutil
-                shutil.move(str(original_path), str(new_path))
-                
-                # Add to JSON structure
-                json_structure["screenshots"].append({
-                    "image_name": screenshot_info['name'],
-                    "image_path": str(new_path.absolute()),
-                    "description": screenshot_info.get('description', ''),
-                    "timestamp": screenshot_info.get('timestamp', datetime.now().isoformat())
+                new_path = unique_path(app_folder, clean_name, original_path.suffix)
+            
+            # Move file to app folder; identical images share one blob
+            digest = blob_store.place(original_path, new_path)
+            if new_path != original_path:
+                screenshot_moved(original_path, new_path, {
+                    'name': screenshot_info['name'],
+                    'description': screenshot_info.get('description', ''),
+                    'application': application_name,
+                    'created_at': screenshot_info.get('timestamp')
                 })
-                processed_count += 1
-                print(f"Moved screenshot to app folder: {new_path}")
-            else:
-                print(f"Skipping file that doesn't exist: {original_path}")
+            entry = session_entry(screenshot_info['name'], new_path, digest, screenshot_info.get('description', ''),
+                                  screenshot_info.get('timestamp'))
+            records.append({'op': 'capture', 'entry': entry})
+            kept.add(entry['image_path'])
+            print(f"Moved screenshot to app folder: {new_path}")
         
-        # Save JSON file with application name
-        json_file = app_folder / f"{clean_app_name}.json"
-        with open(json_file, 'w') as f:
-            json.dump(json_structure, f, indent=2)
+        # The client's list is the session: drop recorded screenshots it no longer holds
+        records.extend({'op': 'remove', 'image_path': entry['image_path']}
+                       for entry in journal.entries() if entry['image_path'] not in kept)
+        journal.append(*records)
+        screenshots_count = len(journal.entries())
         
-        print(f"Created JSON file: {json_file} with {processed_count} screenshots")
+        print(f"Journaled {len(records)} changes for {journal.json_file} ({screenshots_count} screenshots)")
         
         return jsonify({
             'success': True,
-            'message': f'Session JSON created successfully with {processed_count} screenshots',
-            'json_file': str(json_file.absolute()),
+            'message': f'Session JSON created successfully with {screenshots_count} screenshots',
+            'json_file': str(journal.json_file.absolute()),
             'app_folder': str(app_folder.absolute()),
-            'screenshots_count': len(json_structure["screenshots"])
+            'screenshots_count': screenshots_count,
+            'journal_records': len(records)
         })
         
     except Exception as e:
@@ -689,229 +1192,208 @@ def create_session_json(application_name, application_path, screenshots_data):
 def organize_screenshots_by_app(application_name):
     """Organize existing screenshots by application name"""
     try:
-        # Clean application name for folder creation - remove invalid characters
-        import re
-        clean_app_name = re.sub(r'[<>:"/\\|?*]', '_', application_name)
-        clean_app_name = clean_app_name.replace('.exe', '').replace(' ', '_').strip('_')
-        
         # Create application-specific folder
-        app_folder = screenshots_dir / clean_app_name
+        app_folder = get_app_folder(application_name)
         app_folder.mkdir(exist_ok=True)
         
-        # Find and move screenshots for this application
-        moved_count = 0
-        for file in screenshots_dir.glob("*.png"):
-            # Check if file is related to this application
-            if application_name.lower() in file.name.lower():
-                new_path = app_folder / file.name
-                import shutil
-                shutil.move(str(file), str(new_path))
-                moved_count += 1
+        # Screenshots in the main folder whose name mentions the application
+        needle = application_name.lower()
+        pairs = [(path, str(app_folder / os.path.basename(path)))
+                 for path in scan_folder(screenshots_dir, IMAGE_EXTENSIONS)
+                 if needle in os.path.basename(path).lower()]
+        
+        # Same volume, so these are renames - no image bytes are copied
+        job = file_ops.move(pairs, 'organize_screenshots_by_app')
+        screenshot_catalog.move_many(job.completed)
         
         return jsonify({
-            'success': True,
-            'message': f'Organized {moved_count} screenshots for {application_name}',
+            'success': job.failed == 0,
+            'message': f'Organized {job.done} screenshots for {application_name}',
             'app_folder': str(app_folder.absolute()),
-            'moved_count': moved_count
+            'moved_count': job.done,
+            'job': job.to_dict()
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-def remove_screenshot(filepath):
-    """Remove a screenshot file and its metadata"""
+def remove_screenshot(filepath=None, filepaths=None):
+    """Remove one screenshot (filepath) or many (filepaths) with their metadata files"""
     try:
-        file_path = Path(filepath)
-        
-        if not file_path.exists():
+        paths = [Path(p) for p in (filepaths or [])]
+        if filepath:
+            paths.append(Path(filepath))
+        if not paths:
+            return jsonify({'success': False, 'error': 'No screenshot given'})
+        
+        existing = [p for p in paths if p.exists()]
+        missing = [str(p) for p in paths if not p.exists()]
+        if not existing and filepath and not filepaths:
             return jsonify({'success': False, 'error': 'Screenshot file not found'})
         
-        # Remove the screenshot file
-        file_path.unlink()
+        # Sidecar metadata files go with their screenshots
+        targets = [str(p) for p in existing]
+        targets.extend(str(p.with_suffix('.json')) for p in existing
+                       if p.suffix.lower() != '.json' and p.with_suffix('.json').exists())
+        job = file_ops.remove(targets, 'remove_screenshot')
+        removed = set(job.completed)
+        screenshot_catalog.remove_many(removed)
         
-        # Also remove metadata file if it exists
-        metadata_file = file_path.with_suffix('.json')
-        if metadata_file.exists():
-            metadata_file.unlink()
+        # Screenshots in an application folder also leave that application's session
+        journal_removed_screenshots(p for p in existing if str(p) in removed)
         
-        return jsonify({
-            'success': True,
-            'message': f'Screenshot removed successfully: {file_path.name}'
-        })
+        removed_screenshots = [str(p) for p in existing if str(p) in removed]
+        result = {
+            'success': job.failed == 0 and bool(removed_screenshots),
+            'removed': removed_screenshots,
+            'missing': missing,
+            'job': job.to_dict()
+        }
+        if len(paths) == 1 and removed_screenshots:
+            result['message'] = f'Screenshot removed successfully: {paths[0].name}'
+        elif len(paths) == 1:
+            result['message'] = f'Screenshot not removed: {paths[0].name}'
+            result['error'] = 'Screenshot file not found' if missing else \
+                '; '.join(error['error'] for error in job.errors) or 'Screenshot could not be removed'
+        else:
+            result['message'] = f'Removed {len(removed_screenshots)} of {len(paths)} screenshots'
+        return jsonify(result)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-def start_visual_region_selection(application):
-    """Start visual region selection with proper overlay and dashed selection rectangle"""
+def start_visual_region_selection(application, freeze=True):
+    """Start region selection on the persistent overlay with a dashed rectangle and size readout"""
+    return show_region_overlay(application, 'visual_region_selection', 'visual', freeze)
+
+def show_region_overlay(application, source, style, freeze=True):
+    """Focus the application and raise the overlay; the outcome arrives as an event
+
+    With freeze the primary monitor is grabbed once here, after focusing and before
+    the overlay appears, and the selection is cut from that frame.
+    """
     try:
-        import tkinter as tk
-        from tkinter import Canvas
-        import threading
-        
         if application:
             # Focus the application first
-            focus_result = focus_window([application])
-            if not focus_result.json.get('window_focused', False):
-                # Try alternative approaches
-                exe_name = os.path.basename(application).replace('.exe', '')
-                focus_result = focus_window([exe_name])
-        
-        # Create a system-wide overlay window with visual feedback
-        def create_visual_overlay():
-            root = tk.Tk()
-            root.attributes('-fullscreen', True)
-            root.attributes('-alpha', 0.2)  # More transparent
-            root.attributes('-topmost', True)
-            root.configure(bg='black')
-            
-            canvas = Canvas(root, bg='black', highlightthickness=0)
-            canvas.pack(fill='both', expand=True)
-            
-            start_x, start_y = 0, 0
-            selection_rect = None
-            selection_text = None
-            
-            def on_mouse_down(event):
-                nonlocal start_x, start_y, selection_rect, selection_text
-                start_x, start_y = event.x, event.y
-                if selection_rect:
-                    canvas.delete(selection_rect)
-                if selection_text:
-                    canvas.delete(selection_text)
-                selection_rect = canvas.create_rectangle(start_x, start_y, start_x, start_y, 
-                                                      outline='#ff5722', width=3, dash=(10,5))
-                selection_text = canvas.create_text(start_x + 10, start_y - 10, 
-                                                 text="Drag to select region", 
-                                                 fill='#ff5722', font=('Arial', 12, 'bold'))
-            
-            def on_mouse_move(event):
-                nonlocal selection_rect, selection_text
-                if selection_rect:
-                    x1, y1, x2, y2 = canvas.coords(selection_rect)
-                    width = abs(event.x - start_x)
-                    height = abs(event.y - start_y)
-                    
-                    # Update rectangle
-                    canvas.coords(selection_rect, start_x, start_y, event.x, event.y)
-                    
-                    # Update text with dimensions
-                    if selection_text:
-                        canvas.delete(selection_text)
-                        selection_text = canvas.create_text(start_x + 10, start_y - 10, 
-                                                         text=f"Region: {width} x {height} pixels", 
-                                                         fill='#ff5722', font=('Arial', 12, 'bold'))
-            
-            def on_mouse_up(event):
-                nonlocal selection_rect, selection_text
-                if selection_rect:
-                    x1, y1, x2, y2 = canvas.coords(selection_rect)
-                    x = min(x1, x2)
-                    y = min(y1, y2)
-                    width = abs(x2 - x1)
-                    height = abs(y2 - y1)
-                    
-                    if width > 10 and height > 10:
-                        # Show capture feedback
-                        canvas.delete(selection_rect)
-                        canvas.delete(selection_text)
-                        
-                        # Show "Capturing..." message
-                        capture_text = canvas.create_text(root.winfo_screenwidth()//2, root.winfo_screenheight()//2, 
-                                                       text="Capturing region...", 
-                                                       fill='#4caf50', font=('Arial', 24, 'bold'))
-                        root.update()
-                        
-                        try:
-                            # Capture the region using simple approach
-                            region = {'x': int(x), 'y': int(y), 'width': int(width), 'height': int(height)}
-                            
-                            # Simple capture without Flask context
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            filename = f"region_screenshot_{timestamp}.png"
-                            filepath = screenshots_dir / filename
-                            
-                            with mss.mss() as sct:
-                                monitor = {
-                                    "top": region["y"],
-                                    "left": region["x"],
-                                    "width": region["width"],
-                                    "height": region["height"]
-                                }
-                                screenshot = sct.grab(monitor)
-                                mss.tools.to_png(screenshot.rgb, screenshot.size, output=str(filepath))
-                            
-                            # Store the result for the frontend to retrieve
-                            global last_capture_result
-                            last_capture_result = {
-                                'success': True,
-                                'filepath': str(filepath.absolute()),
-                                'filename': filename,
-                                'region': region
-                            }
-                            
-                            print(f"Region captured successfully: {last_capture_result}")
-                            
-                            # Show success message briefly
-                            canvas.delete(capture_text)
-                            success_text = canvas.create_text(root.winfo_screenwidth()//2, root.winfo_screenheight()//2, 
-                                                           text="✓ Region captured successfully!", 
-                                                           fill='#4caf50', font=('Arial', 20, 'bold'))
-                            root.after(1000, root.destroy)  # Close after 1 second
-                        except Exception as e:
-                            print(f"Error capturing region: {e}")
-                            canvas.delete(capture_text)
-                            error_text = canvas.create_text(root.winfo_screenwidth()//2, root.winfo_screenheight()//2, 
-                                                         text=f"Error capturing region: {str(e)}", 
-                                                         fill='#f44336', font=('Arial', 16, 'bold'))
-                            root.after(2000, root.destroy)
-                    else:
-                        # Selection too small
-                        canvas.delete(selection_rect)
-                        canvas.delete(selection_text)
-                        error_text = canvas.create_text(root.winfo_screenwidth()//2, root.winfo_screenheight()//2, 
-                                                     text="Selection too small. Try again.", 
-                                                     fill='#f44336', font=('Arial', 16, 'bold'))
-                        root.after(2000, root.destroy)
-            
-            def on_escape(event):
-                root.destroy()
-            
-            canvas.bind('<Button-1>', on_mouse_down)
-            canvas.bind('<B1-Motion>', on_mouse_move)
-            canvas.bind('<ButtonRelease-1>', on_mouse_up)
-            root.bind('<Escape>', on_escape)
-            
-            # Instructions
-            instruction = canvas.create_text(root.winfo_screenwidth()//2, 50, 
-                                          text="Click and drag to select a region. Press ESC to cancel.", 
-                                          fill='white', font=('Arial', 16, 'bold'))
-            
-            root.mainloop()
+            focus_window([application])
         
-        # Run the overlay in a separate thread
-        overlay_thread = threading.Thread(target=create_visual_overlay)
-        overlay_thread.daemon = True
-        overlay_thread.start()
+        # Events after this sequence number belong to this selection
+        event_seq = event_bus.sequence
+        start_region_overlay()
+        frozen = None
+        if freeze:
+            frozen = FrozenFrame(capture_engine.grab(monitor=1), capture_engine.monitors[1])
+        request_id = region_overlay.show(source, style, {'application': application}, frozen)
         
         return jsonify({
             'success': True,
-            'message': 'Visual region selection started',
-            'application': application
+            'message': f"{'Visual' if style == 'visual' else 'System'} region selection started",
+            'application': application,
+            'request_id': request_id,
+            'frozen': frozen is not None,
+            'event_seq': event_seq
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-def start_recording(application):
+def start_region_overlay():
+    """Start the overlay thread and the consumer of its selections (idempotent)"""
+    global region_selection_thread
+    with region_selection_lock:
+        if region_selection_thread is None:
+            region_selection_thread = threading.Thread(target=handle_region_selections,
+                                                       name='region-selections', daemon=True)
+            region_selection_thread.start()
+    region_overlay.start()
+
+def handle_region_selections():
+    """Consume finished overlay selections: capture the region and publish the outcome"""
+    while True:
+        selection = region_overlay.selections.get()
+        source = selection['source']
+        if 'cancelled' in selection:
+            event_bus.publish('capture_cancelled', {'source': source, 'reason': selection['cancelled'],
+                                                    'request_id': selection['id']})
+            continue
+        try:
+            frozen = selection['frozen']
+            # A frozen selection is a view into the grab taken when the overlay opened
+            frame = frozen.crop(selection['region']) if frozen is not None else None
+            result = save_region_capture(selection['region'], frame=frame)
+            event_bus.publish('capture_complete', {'source': source, 'request_id': selection['id'], **result})
+            print(f"Region captured successfully: {result}")
+        except Exception as e:
+            print(f"Error capturing region: {e}")
+            event_bus.publish('error', {'source': source, 'request_id': selection['id'],
+                                        'error': f"Error capturing region: {str(e)}"})
+
+def get_region_overlay_stats():
+    """State of the persistent selection overlay and how fast it appears"""
+    return jsonify({'success': True, 'overlay': region_overlay.get_stats()})
+
+def start_recording(application, options=None):
     """Start recording for specific application"""
-    global recording, current_app
+    global recording, current_app, recording_thread, recording_options, recording_metadata, recording_stop
+    global recording_window_tracker
     
     try:
         if recording:
             return jsonify({'success': False, 'error': 'Already recording'})
         
+        options = {**DEFAULT_RECORDING_OPTIONS, **(options or {})}
+        if options['mode'] not in ('continuous', 'change_detection'):
+            return jsonify({'success': False, 'error': f"Unknown recording mode: {options['mode']}"})
+        if options['overflow_policy'] not in OVERFLOW_POLICIES:
+            return jsonify({'success': False, 'error': f"Unknown overflow policy: {options['overflow_policy']}"})
+        if options['output'] not in ('png', 'video'):
+            return jsonify({'success': False, 'error': f"Unknown recording output: {options['output']}"})
+        get_encoder(options['encoder'])  # Raises on invalid encoder settings
+        if not options['fps'] or float(options['fps']) <= 0:
+            return jsonify({'success': False, 'error': f"Frame rate must be positive: {options['fps']}"})
+        if options['monitor_layout'] not in MONITOR_LAYOUTS:
+            return jsonify({'success': False, 'error': f"Unknown monitor layout: {options['monitor_layout']}"})
+        if options['monitors']:
+            multi_monitor.resolve(options['monitors'])  # Raises on unknown monitors
+            if options['monitor_layout'] == 'separate' and options['output'] == 'video':
+                return jsonify({'success': False, 'error': "Video output needs the 'stitched' monitor layout"})
+        if options['target'] not in ('screen', 'window'):
+            return jsonify({'success': False, 'error': f"Unknown recording target: {options['target']}"})
+        
+        tracker = None
+        if options['target'] == 'window':
+            if options['monitors']:
+                return jsonify({'success': False, 'error': "The 'window' target cannot be combined with monitors"})
+            tracker = WindowTracker(window_index, options['window_keywords'] or [application],
+                                    bounds=capture_engine.monitors[0])
+            if not tracker.locate():
+                return jsonify({'success': False, 'error': f'No window found for application: {application}'})
+        
         current_app = application
+        recording_options = options
+        recording_window_tracker = tracker
+        started_at = datetime.now()
+        base_name = f"recording_{application}_{started_at.strftime('%Y%m%d_%H%M%S')}"
+        recording_metadata = {
+            'application': application,
+            'mode': options['mode'],
+            'output': options['output'],
+            'options': options,
+            'base_name': base_name,
+            'started_at': started_at.isoformat(),
+            'stopped_at': None,
+            'metadata_file': str((screenshots_dir / f"{base_name}.json").absolute()),
+            'segments': [],
+            'frames_grabbed': 0,
+            'frames_written': 0,
+            'frames_skipped': 0,
+            'frames_dropped': 0,
+            'pipeline': None,
+            'scheduler': None,
+            'window': tracker.get_stats() if tracker else None,
+            'frames': []
+        }
+        recording_stop = threading.Event()
         recording = True
         
         # Start recording thread
@@ -919,7 +1401,13 @@ def start_recording(application):
         recording_thread.daemon = True
         recording_thread.start()
         
-        return jsonify({'success': True, 'message': 'Recording started'})
+        return jsonify({
+            'success': True,
+            'message': 'Recording started',
+            'mode': options['mode'],
+            'window': recording_metadata['window'],
+            'metadata_file': recording_metadata['metadata_file']
+        })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -930,76 +1418,395 @@ def stop_recording():
     
     try:
         recording = False
-        return jsonify({'success': True, 'message': 'Recording stopped'})
+        recording_stop.set()
+        
+        # Let the loop finish its current frame and write the recording metadata
+        if recording_thread and recording_thread is not threading.current_thread():
+            recording_thread.join(timeout=10)
+        
+        result = {'success': True, 'message': 'Recording stopped'}
+        if recording_metadata:
+            result.update({
+                'metadata_file': recording_metadata['metadata_file'],
+                'frames_grabbed': recording_metadata['frames_grabbed'],
+                'frames_written': recording_metadata['frames_written'],
+                'frames_skipped': recording_metadata['frames_skipped'],
+                'frames_dropped': recording_metadata['frames_dropped'],
+                'pipeline': recording_metadata['pipeline'],
+                'scheduler': recording_metadata['scheduler'],
+                'window': recording_metadata['window']
+            })
+        return jsonify(result)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+def get_recording_stats():
+    """Get live counters and per-stage timings of the current (or last) recording"""
+    try:
+        if not recording_metadata:
+            return jsonify({'success': False, 'error': 'No recording available'})
+        
+        pipeline_stats = recording_pipeline.get_stats() if recording_pipeline else recording_metadata['pipeline']
+        return jsonify({
+            'success': True,
+            'recording': recording,
+            'application': recording_metadata['application'],
+            'mode': recording_metadata['mode'],
+            'frames_grabbed': recording_metadata['frames_grabbed'],
+            'frames_written': recording_metadata['frames_written'],
+            'frames_skipped': recording_metadata['frames_skipped'],
+            'frames_dropped': recording_metadata['frames_dropped'],
+            'pipeline': pipeline_stats,
+            'window': recording_window_tracker.get_stats() if recording_window_tracker else recording_metadata['window']
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def get_scheduler_stats():
+    """Get frame-rate, missed-deadline and jitter statistics of the current (or last) recording"""
+    try:
+        if recording_scheduler:
+            stats = recording_scheduler.get_stats()
+        elif recording_metadata and recording_metadata['scheduler']:
+            stats = recording_metadata['scheduler']
+        else:
+            return jsonify({'success': False, 'error': 'No recording available'})
+        
+        return jsonify({'success': True, 'recording': recording, 'scheduler': stats})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def save_recording_metadata():
+    """Write the metadata of the current recording next to its frames"""
+    if not recording_metadata:
+        return
+    
+    try:
+        with open(recording_metadata['metadata_file'], 'w') as f:
+            json.dump(recording_metadata, f, indent=2)
+    except Exception as e:
+        print(f"Error saving recording metadata: {e}")
+
+def write_recorded_frame(frame, pipeline):
+    """Encoder/writer stage: encode one recorded frame and write it to disk"""
+    encoded = frame['encoder'].encode(frame['screenshot'])
+    pipeline.timing('encode').record(encoded.encode_seconds)
+    
+    started = time.perf_counter()
+    encoded.save(frame['filepath'])
+    pipeline.timing('write').record(time.perf_counter() - started)
+    screenshot_saved(frame['filepath'], thumbnail=False)
+    
+    with recording_lock:
+        recording_metadata['frames_written'] += 1
+        frames_written = recording_metadata['frames_written']
+        recording_metadata['frames'].append({
+            'filename': frame['filename'],
+            'timestamp': frame['timestamp'],
+            'change_ratio': frame['change_ratio'],
+            'skipped_before': frame['skipped_before'],
+            'monitor': frame['monitor'],
+            'rect': frame['rect'],
+            **encoded.to_dict()
+        })
+    
+    event_bus.publish('recording_frame', {
+        'application': recording_metadata['application'],
+        'filepath': str(Path(frame['filepath']).absolute()),
+        'filename': frame['filename'],
+        'timestamp': frame['timestamp'],
+        'frames_written': frames_written
+    })
+
+def write_recorded_video_frame(frame, pipeline):
+    """Encoder/writer stage for video output: append one frame to the current segment"""
+    started = time.perf_counter()
+    segment, frame_index = recording_video_writer.write(frame_to_array(frame['screenshot']), frame['timestamp'])
+    pipeline.timing('encode').record(time.perf_counter() - started)
+    
+    with recording_lock:
+        recording_metadata['frames_written'] += 1
+        frames_written = recording_metadata['frames_written']
+        recording_metadata['frames'].append({
+            'segment': segment,
+            'frame_index': frame_index,
+            'timestamp': frame['timestamp'],
+            'change_ratio': frame['change_ratio'],
+            'skipped_before': frame['skipped_before'],
+            'rect': frame['rect']
+        })
+    
+    event_bus.publish('recording_frame', {
+        'application': recording_metadata['application'],
+        'segment': segment,
+        'frame_index': frame_index,
+        'timestamp': frame['timestamp'],
+        'frames_written': frames_written
+    })
+
 def recording_loop():
-    """Recording loop that runs in background"""
-    global recording, current_app
+    """Recording loop that runs in background - the grab stage of the recording pipeline"""
+    global recording, current_app, recording_pipeline, recording_video_writer, recording_scheduler
+    global recording_window_tracker
+    
+    options = recording_options
+    tracker = recording_window_tracker
+    # Change detectors and skip counters per output stream (None: the single or stitched frame)
+    detectors = {}
+    skipped_in_row = {}
+    separate_monitors = bool(options['monitors']) and options['monitor_layout'] == 'separate'
     
-    while recording:
+    image_encoder = get_encoder(options['encoder'])
+    handler = write_recorded_frame
+    workers = options['encoder_workers']
+    if options['output'] == 'video':
+        # Segments live in their own folder; a single writer keeps frames in order
+        base_name = recording_metadata['base_name']
+        recording_video_writer = VideoSegmentWriter(str(screenshots_dir / base_name), base_name,
+                                                    fps=options['video_fps'] or options['fps'],
+                                                    codec=options['video_codec'],
+                                                    segment_seconds=options['segment_seconds'])
+        handler = write_recorded_video_frame
+        workers = 1
+    
+    pipeline = FramePipeline(handler,
+                             workers=workers,
+                             queue_size=options['queue_size'],
+                             overflow=options['overflow_policy'])
+    pipeline.start()
+    recording_pipeline = pipeline
+    
+    # Deadlines come from a monotonic clock, so grab and encode time do not add drift
+    scheduler = FrameScheduler(float(options['fps']), recording_stop)
+    recording_scheduler = scheduler
+    
+    while recording and scheduler.wait_next():
         try:
-            # Take screenshot every 2 seconds
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-            filename = f"recording_{current_app}_{timestamp}.png"
-            filepath = screenshots_dir / filename
+            now = datetime.now()
+            timestamp = now.strftime("%Y%m%d_%H%M%S_%f")[:-3]
             
-            with mss.mss() as sct:
-                monitor = sct.monitors[1]  # Primary monitor
-                screenshot = sct.grab(monitor)
-                mss.tools.to_png(screenshot.rgb, screenshot.size, output=str(filepath))
+            rect = None
+            if tracker:
+                # One rectangle lookup per frame follows moves and resizes
+                rect = tracker.update()
+                pipeline.timing('window_track').record(tracker.update_time.last)
+                if rect is None:
+                    # Minimized, closed or moved off screen - nothing of the app to grab
+                    recording_metadata['frames_skipped'] += 1
+                    skipped_in_row[None] = skipped_in_row.get(None, 0) + 1
+                    continue
             
-            time.sleep(2)  # Wait 2 seconds
+            started = time.perf_counter()
+            if rect:
+                shots = [(None, capture_engine.grab(region=rect))]
+            elif not options['monitors']:
+                shots = [(None, capture_engine.grab(monitor=1))]  # Primary monitor
+            else:
+                # All selected monitors are grabbed concurrently
+                if separate_monitors:
+                    monitor_frames = multi_monitor.grab(options['monitors'])
+                    shots = [(frame.index, frame.array) for frame in monitor_frames]
+                else:
+                    array, _, monitor_frames = multi_monitor.grab_stitched(options['monitors'])
+                    shots = [(None, array)]
+                for frame in monitor_frames:
+                    pipeline.timing(f'grab_monitor_{frame.index}').record(frame.grab_seconds)
+            pipeline.timing('grab').record(time.perf_counter() - started)
+            recording_metadata['frames_grabbed'] += 1
+            
+            for monitor, screenshot in shots:
+                change_ratio = None
+                if options['mode'] == 'change_detection':
+                    detector = detectors.get(monitor)
+                    if detector is None:
+                        detector = detectors[monitor] = ChangeDetector(options['change_threshold'],
+                                                                       options['pixel_threshold'],
+                                                                       options['sample_step'])
+                    started = time.perf_counter()
+                    changed, change_ratio = detector.check(screenshot)
+                    pipeline.timing('change_detection').record(time.perf_counter() - started)
+                    if not changed:
+                        # Nothing moved on screen - skip encoding and writing this frame
+                        recording_metadata['frames_skipped'] += 1
+                        skipped_in_row[monitor] = skipped_in_row.get(monitor, 0) + 1
+                        continue
+                
+                suffix = f"_m{monitor}" if monitor is not None else ""
+                filename = f"recording_{current_app}_{timestamp}{suffix}{image_encoder.extension}"
+                filepath = screenshots_dir / filename
+                
+                # Encoding and writing happen on the worker pool
+                pipeline.put({
+                    'screenshot': screenshot,
+                    'encoder': image_encoder,
+                    'filename': filename,
+                    'filepath': str(filepath),
+                    'timestamp': now.isoformat(),
+                    'monitor': monitor,
+                    'rect': rect,
+                    'change_ratio': round(change_ratio, 5) if change_ratio is not None else None,
+                    'skipped_before': skipped_in_row.get(monitor, 0)
+                })
+                skipped_in_row[monitor] = 0
             
         except Exception as e:
             print(f"Error in recording loop: {e}")
+            event_bus.publish('error', {'source': 'recording', 'application': current_app, 'error': str(e)})
             recording = False
             break
+    
+    # Flush frames still waiting for an encoder before writing the metadata
+    pipeline.close()
+    recording_pipeline = None
+    recording_scheduler = None
+    recording_window_tracker = None
+    
+    if recording_video_writer:
+        try:
+            recording_metadata['segments'] = recording_video_writer.close()
+        except Exception as e:
+            print(f"Error closing video segment: {e}")
+        recording_video_writer = None
+    
+    with recording_lock:
+        recording_metadata['frames_dropped'] = pipeline.dropped
+        recording_metadata['pipeline'] = pipeline.get_stats()
+        recording_metadata['scheduler'] = scheduler.get_stats()
+        if tracker:
+            recording_metadata['window'] = tracker.get_stats()
+        recording_metadata['frames'].sort(key=lambda x: x['timestamp'])
+        recording_metadata['stopped_at'] = datetime.now().isoformat()
+    save_recording_metadata()
 
-def get_screenshots():
-    """Get list of all screenshots with metadata"""
+def start_replay_buffer(options=None):
+    """(Re)start the always-on replay buffer with the given options"""
+    global replay_buffer
     try:
-        screenshots = []
-        
-        if screenshots_dir.exists():
-            for file in screenshots_dir.glob("*.png"):
-                # Check for metadata file
-                metadata_file = file.with_suffix('.json')
-                metadata = {}
-                
-                if metadata_file.exists():
-                    try:
-                        with open(metadata_file, 'r') as f:
-                            metadata = json.load(f)
-                    except:
-                        metadata = {}
-                
-                # Extract application name from filename or metadata
-                parts = file.name.split('_')
-                app_name = metadata.get('name', parts[1] if len(parts) > 1 else 'Unknown')
-                
-                # Get file modification time
-                mtime = file.stat().st_mtime
-                timestamp = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
-                
-                screenshots.append({
-                    'id': file.name,
-                    'application': app_name,
-                    'timestamp': timestamp,
-                    'path': str(file.absolute()),
-                    'name': metadata.get('name', ''),
-                    'description': metadata.get('description', ''),
-                    'created_at': metadata.get('created_at', timestamp)
-                })
+        options = {**DEFAULT_REPLAY_OPTIONS, **(options or {})}
+        if float(options['fps']) <= 0 or float(options['seconds']) <= 0:
+            return jsonify({'success': False, 'error': 'Replay fps and seconds must be positive'})
+        monitor = int(options['monitor'])
+        buffer = ReplayBuffer(lambda: replay_engine.grab(monitor=monitor),
+                              fps=options['fps'], seconds=options['seconds'],
+                              max_bytes=int(float(options['max_mb']) * 1024 * 1024), tile=options['tile'],
+                              keyframe_seconds=options['keyframe_seconds'])
+        with replay_lock:
+            if replay_buffer:
+                replay_buffer.stop()
+            replay_buffer = buffer
+            buffer.start()
+        return jsonify({'success': True, 'message': 'Replay buffer started', 'options': options})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def stop_replay_buffer():
+    """Stop the replay buffer; its history stays available for dump_replay"""
+    try:
+        with replay_lock:
+            if replay_buffer:
+                replay_buffer.stop()
+        return jsonify({'success': True, 'message': 'Replay buffer stopped'})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def get_replay_stats():
+    """Memory use, coverage and grab timings of the replay buffer"""
+    if not replay_buffer:
+        return jsonify({'success': False, 'error': 'Replay buffer not started'})
+    return jsonify({'success': True, 'replay': replay_buffer.get_stats()})
+
+def dump_replay(seconds=None, output='video', encoder=None):
+    """Write the last seconds of the replay buffer to a folder under screenshots"""
+    try:
+        if not replay_buffer:
+            return jsonify({'success': False, 'error': 'Replay buffer not started'})
+        if output not in ('png', 'video'):
+            return jsonify({'success': False, 'error': f"Unknown replay output: {output}"})
+        
+        base_name = f"replay_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]}"
+        folder = screenshots_dir / base_name
+        folder.mkdir(exist_ok=True)
+        started = time.perf_counter()
+        
+        frames, segments = [], []
+        if output == 'video':
+            writer = VideoSegmentWriter(str(folder), base_name, fps=replay_buffer.fps,
+                                        segment_seconds=replay_buffer.seconds + 1)
+            try:
+                for wall_time, frame in replay_buffer.frames(seconds):
+                    timestamp = datetime.fromtimestamp(wall_time).isoformat()
+                    segment, frame_index = writer.write(frame, timestamp)
+                    frames.append({'timestamp': timestamp, 'segment': segment, 'frame_index': frame_index})
+            finally:
+                segments = writer.close()
+        else:
+            image_encoder = get_encoder(encoder)
+            for wall_time, frame in replay_buffer.frames(seconds):
+                timestamp = datetime.fromtimestamp(wall_time)
+                filepath = folder / f"{base_name}_{len(frames):05d}{image_encoder.extension}"
+                encoded = image_encoder.encode(frame)
+                encoded.save(filepath)
+                frames.append({'timestamp': timestamp.isoformat(), 'filename': filepath.name, **encoded.to_dict()})
+        
+        if not frames:
+            folder.rmdir()
+            return jsonify({'success': False, 'error': 'Replay buffer holds no frames for that period'})
+        
+        metadata = {
+            'base_name': base_name,
+            'output': output,
+            'fps': replay_buffer.fps,
+            'started_at': frames[0]['timestamp'],
+            'ended_at': frames[-1]['timestamp'],
+            'segments': segments,
+            'frames': frames
+        }
+        metadata_file = folder / f"{base_name}.json"
+        with open(metadata_file, 'w') as f:
+            json.dump(metadata, f, indent=2)
         
-        # Sort by timestamp (newest first)
-        screenshots.sort(key=lambda x: x['created_at'], reverse=True)
+        return jsonify({
+            'success': True,
+            'folder': str(folder.absolute()),
+            'metadata_file': str(metadata_file.absolute()),
+            'frames': len(frames),
+            'segments': segments,
+            'dump_ms': round((time.perf_counter() - started) * 1000, 3)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def get_screenshots(application=None, since=None, until=None, sort='created_at', order='desc',
+                    limit=None, cursor=None, folder='', refresh=False):
+    """Get screenshots with metadata from the catalog, with filters and cursor pagination"""
+    global catalog_reconciled_at
+    try:
+        # Pick up files changed outside the app, at most once per interval
+        if refresh or time.monotonic() - catalog_reconciled_at > CATALOG_RECONCILE_INTERVAL:
+            screenshot_catalog.reconcile()
+            catalog_reconciled_at = time.monotonic()
+        
+        rows, next_cursor = screenshot_catalog.query(folder=folder, application=application,
+                                                     since=since, until=until, sort=sort, order=order,
+                                                     limit=limit, cursor=cursor)
+        
+        screenshots = [{
+            'id': row['filename'],
+            'application': row['application'],
+            'timestamp': datetime.fromtimestamp(row['mtime']).strftime("%Y-%m-%d %H:%M:%S"),
+            'path': row['path'],
+            'name': row['name'],
+            'description': row['description'],
+            'created_at': row['created_at'],
+            'size': row['size']
+        } for row in rows]
         
         return jsonify({
             'success': True,
-            'screenshots': screenshots
+            'screenshots': screenshots,
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
@@ -1009,38 +1816,26 @@ def clear_all_screenshots():
     """Clear all screenshots and metadata files"""
     try:
         cleared_count = 0
+        job = None
         
         if screenshots_dir.exists():
-            # Remove all PNG files
-            for file in screenshots_dir.glob("*.png"):
-                try:
-                    file.unlink()
-                    cleared_count += 1
-                except Exception as e:
-                    print(f"Error removing {file}: {e}")
-            
-            # Remove all JSON metadata files
-            for file in screenshots_dir.glob("*.json"):
-                try:
-                    file.unlink()
-                    cleared_count += 1
-                except Exception as e:
-                    print(f"Error removing {file}: {e}")
+            # Images and JSON metadata in the main folder, plus every application folder
+            # (hidden folders - blobs, previews, presets - are managed separately)
+            targets = scan_folder(screenshots_dir, IMAGE_EXTENSIONS + ('.json',))
+            folders = scan_folder(screenshots_dir, files=False, dirs=True)
+            job = file_ops.remove(targets + folders, 'clear_all_screenshots')
+            cleared_count = len(targets) + len(set(folders) & set(job.removed_directories))
             
-            # Remove all subdirectories
-            for subdir in screenshots_dir.iterdir():
-                if subdir.is_dir():
-                    try:
-                        import shutil
-                        shutil.rmtree(subdir)
-                        cleared_count += 1
-                    except Exception as e:
-                        print(f"Error removing directory {subdir}: {e}")
+            screenshot_catalog.clear()
+            session_journals.clear()
+            thumbnail_service.clear()
+            blob_store.collect_garbage()
         
         return jsonify({
-            'success': True,
+            'success': job is None or job.failed == 0,
             'message': f'Cleared {cleared_count} files/directories',
-            'cleared_count': cleared_count
+            'cleared_count': cleared_count,
+            'job': job.to_dict() if job else None
         })
         
     except Exception as e:
@@ -1051,6 +1846,11 @@ def read_json_file(filepath):
     try:
         file_path = Path(filepath)
         
+        # A session JSON first takes in the changes still waiting in its journal
+        journal = session_journals.for_json_file(file_path.absolute())
+        if journal is not None:
+            journal.compact()
+        
         if not file_path.exists():
             return jsonify({'success': False, 'error': 'JSON file not found'})
         
@@ -1088,40 +1888,100 @@ def check_file_exists(filepath):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-def cleanup_duplicate_screenshots(application_name):
-    """Clean up duplicate screenshots in the application folder"""
+def cleanup_duplicate_screenshots(application_name, max_distance=None):
+    """Remove byte-identical copies of the same named screenshot, keeping the oldest
+
+    Visually similar screenshots (within max_distance) are only reported: flat
+    field crops look alike without being the same step.
+    """
     try:
-        # Clean application name for folder creation
-        clean_app_name = re.sub(r'[<>:"/\\|?*]', '_', application_name)
-        clean_app_name = clean_app_name.replace('.exe', '').replace(' ', '_').strip('_')
-        
         # Get application folder
-        app_folder = screenshots_dir / clean_app_name
+        app_folder = get_app_folder(application_name)
         if not app_folder.exists():
             return jsonify({'success': True, 'message': 'No application folder found to clean'})
         
-        # Find and remove duplicates
-        removed_count = 0
-        seen_files = {}
+        if max_distance is None:
+            max_distance = DUPLICATE_MAX_DISTANCE
         
-        for file_path in app_folder.glob("*.png"):
-            # Extract base name without timestamp
-            filename = file_path.stem
-            # Remove timestamp pattern from filename
-            base_name = re.sub(r'_\d{8}_\d{6}$', '', filename)
-            
-            if base_name in seen_files:
-                # This is a duplicate, remove it
-                file_path.unlink()
-                removed_count += 1
-                print(f"Removed duplicate: {file_path.name}")
-            else:
-                seen_files[base_name] = file_path
+        # Same clean name and same size first, so only real candidates get hashed
+        candidates = {}
+        for path in scan_folder(app_folder, IMAGE_EXTENSIONS):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            candidates.setdefault((capture_name(path), stat.st_size), []).append((stat.st_mtime, path))
+        
+        duplicates = []
+        for group in candidates.values():
+            if len(group) < 2:
+                continue
+            originals = {}
+            for _, path in sorted(group):
+                digest = blob_store.hash_file(path)
+                if digest in originals:
+                    duplicates.append((path, originals[digest]))
+                else:
+                    originals[digest] = path
+        
+        job = file_ops.remove([duplicate for duplicate, _ in duplicates], 'cleanup_duplicate_screenshots')
+        removed_paths = set(job.completed)
+        removed = [{'filepath': duplicate, 'duplicate_of': original}
+                   for duplicate, original in duplicates if duplicate in removed_paths]
+        screenshot_catalog.remove_many(removed_paths)
+        journal_removed_screenshots(removed_paths)
+        
+        _, similar = perceptual_index.group_duplicates(app_folder, int(max_distance))
+        near_duplicates = [{'filepath': path, 'similar_to': original, 'distance': distance}
+                           for path, original, distance in similar]
+        
+        if removed:
+            blob_store.collect_garbage()
+        
+        return jsonify({
+            'success': job.failed == 0,
+            'message': f'Cleaned up {len(removed)} duplicate screenshots',
+            'removed_count': len(removed),
+            'removed': removed,
+            'near_duplicates': near_duplicates
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def collect_blob_garbage():
+    """Remove stored images that no application or session folder references any more"""
+    try:
+        removed, freed = blob_store.collect_garbage()
+        return jsonify({
+            'success': True,
+            'message': f'Removed {removed} unreferenced blobs',
+            'removed_count': removed,
+            'freed_bytes': freed,
+            'stats': blob_store.get_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def find_similar_screenshots(filepath, application_name=None, max_distance=None):
+    """Find screenshots that look the same as (or close to) the given image"""
+    try:
+        file_path = Path(filepath)
+        if not file_path.exists():
+            return jsonify({'success': False, 'error': 'Screenshot file not found'})
+        
+        folder = get_app_folder(application_name) if application_name else file_path.parent
+        if max_distance is None:
+            max_distance = DUPLICATE_MAX_DISTANCE
+        
+        fingerprint = perceptual_index.fingerprint(file_path)
+        matches = perceptual_index.find(folder, fingerprint, int(max_distance), exclude=file_path)
         
         return jsonify({
             'success': True,
-            'message': f'Cleaned up {removed_count} duplicate screenshots',
-            'removed_count': removed_count
+            'filepath': str(file_path.absolute()),
+            'fingerprint': format(fingerprint, '032x'),
+            'matches': [{'filepath': path, 'distance': distance} for distance, path in matches]
         })
         
     except Exception as e:
@@ -1130,34 +1990,95 @@ def cleanup_duplicate_screenshots(application_name):
 def cleanup_old_json_files(application_name):
     """Remove old JSON files for the application and create fresh ones"""
     try:
-        # Clean application name for folder creation
-        clean_app_name = re.sub(r'[<>:"/\\|?*]', '_', application_name)
-        clean_app_name = clean_app_name.replace('.exe', '').replace(' ', '_').strip('_')
-        
         # Create application-specific folder
-        app_folder = screenshots_dir / clean_app_name
+        app_folder = get_app_folder(application_name)
         app_folder.mkdir(exist_ok=True)
         
+        # The journal would rebuild the removed session JSON, so it goes too
+        session_journals.forget(app_folder)
+        
         # Remove all existing JSON files in the app folder
-        removed_count = 0
-        for json_file in app_folder.glob("*.json"):
-            try:
-                json_file.unlink()
-                removed_count += 1
-                print(f"Removed old JSON file: {json_file}")
-            except Exception as e:
-                print(f"Error removing {json_file}: {e}")
+        job = file_ops.remove(scan_folder(app_folder, ('.json',)), 'cleanup_old_json_files')
+        removed_count = job.done
         
         return jsonify({
             'success': True,
             'message': f'Cleaned up {removed_count} old JSON files for {application_name}',
             'removed_count': removed_count,
-            'app_folder': str(app_folder.absolute())
+            'app_folder': str(app_folder.absolute()),
+            'job': job.to_dict()
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-if __name__ == '__main__':
+def signal_ready(host, port, ready_file=None, replay_options=None):
+    """Announce that the server is accepting requests: a stdout line and optionally a ready file"""
+    startup_timer.mark('server_bind')
+    report = startup_timer.report()
+    for phase in report['phases']:
+        print(f"  startup {phase['phase']:<12} {phase['ms']:>9.1f} ms")
+    
+    info = {'host': host, 'port': port, 'pid': os.getpid(), 'startup': report}
+    if ready_file:
+        # Write then rename so a watcher never reads a half-written file
+        temp = f'{ready_file}.tmp'
+        with open(temp, 'w') as f:
+            json.dump(info, f)
+        os.replace(temp, ready_file)
+    print(f"BACKEND_READY {json.dumps(info)}", flush=True)
+    
+    # Import the imaging libraries in the background so the first capture does not pay for them
+    threading.Thread(target=preload, args=('numpy', 'cv2', 'PIL.Image', 'mss'), name='preload', daemon=True).start()
+    # Build the selection overlay now so it only has to be shown later
+    start_region_overlay()
+    session_journals.start()
+    if replay_options is not None:
+        with app.app_context():
+            result = start_replay_buffer(replay_options).json
+        if not result['success']:
+            print(f"Replay buffer not started: {result['error']}")
+
+def main(argv=None):
+    """Start the backend: pooled HTTP/1.1 server by default, Flask's server with --dev"""
+    import argparse
+    parser = argparse.ArgumentParser(description='Connector Recording Python backend')
+    parser.add_argument('--host', default=os.environ.get('BACKEND_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('BACKEND_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('BACKEND_WORKERS', 16)),
+                        help='request worker threads (each open keep-alive connection uses one)')
+    parser.add_argument('--keep-alive-timeout', type=float, default=float(os.environ.get('BACKEND_KEEP_ALIVE', 15)),
+                        help='seconds an idle connection is kept open')
+    parser.add_argument('--dev', action='store_true', default=os.environ.get('BACKEND_DEV') == '1',
+                        help="use Flask's development server with the debugger")
+    parser.add_argument('--ready-file', default=os.environ.get('BACKEND_READY_FILE'),
+                        help='write host/port/startup timings to this file once requests are accepted')
+    parser.add_argument('--replay-seconds', type=float,
+                        default=float(os.environ.get('BACKEND_REPLAY_SECONDS', DEFAULT_REPLAY_OPTIONS['seconds'])),
+                        help='length of the always-on replay buffer (0 turns it off)')
+    parser.add_argument('--replay-fps', type=float,
+                        default=float(os.environ.get('BACKEND_REPLAY_FPS', DEFAULT_REPLAY_OPTIONS['fps'])))
+    parser.add_argument('--replay-max-mb', type=float,
+                        default=float(os.environ.get('BACKEND_REPLAY_MAX_MB', DEFAULT_REPLAY_OPTIONS['max_mb'])))
+    args = parser.parse_args(argv)
+    replay_options = None
+    if args.replay_seconds > 0:
+        replay_options = {'seconds': args.replay_seconds, 'fps': args.replay_fps, 'max_mb': args.replay_max_mb}
+    
+    if args.ready_file and os.path.exists(args.ready_file):
+        os.remove(args.ready_file)
+    
     print("Starting Python backend server...")
-    app.run(host='127.0.0.1', port=5000, debug=True, use_reloader=False) 
\ No newline at end of file
+    if args.dev:
+        # The development server gives no hook after binding, so this is signalled just before
+        signal_ready(args.host, args.port, args.ready_file, replay_options)
+        app.run(host=args.host, port=args.port, debug=True, use_reloader=False, threaded=True)
+    else:
+        if args.workers < MIN_SERVER_WORKERS:
+            print(f"--workers {args.workers} is below the thread budget, using {MIN_SERVER_WORKERS}")
+            args.workers = MIN_SERVER_WORKERS
+        serve(app, args.host, args.port, workers=args.workers, keep_alive_timeout=args.keep_alive_timeout,
+              on_ready=lambda host, port: signal_ready(host, port, args.ready_file, replay_options))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Image encoders for captured frames
+
+Every capture path encodes through an ImageEncoder, which picks the output
+format from its settings:
+
+- 'png':  lossless, zlib `compression` level 0-9
+- 'webp': lossless, or lossy with `quality` 1-100 when `lossless` is off
+- 'jpeg': lossy with `quality` 1-100
+
+With `auto_palette` enabled, PNG frames that use at most `palette_colors`
+distinct colours (typical for dialogs and other flat UI) are written as
+8-bit palette PNGs, which are both smaller and faster to compress.
+Additional formats can be plugged in with register_encoder().
+"""
+
+import io
+import time
+
+from frame_diff import frame_to_array
+from lazy_modules import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+
+DEFAULT_ENCODER_SETTINGS = {
+    'format': 'png',
+    'compression': 6,       # PNG zlib level
+    'quality': 90,          # JPEG / lossy WebP quality
+    'lossless': True,       # WebP lossless mode
+    'auto_palette': True,   # Palette PNG for low-colour frames
+    'palette_colors': 256
+}
+
+# Format name -> (file extension, encode function)
+ENCODERS = {}
+
+
+class EncodedImage:
+    """Encoded bytes plus the numbers needed to tune throughput against storage"""
+
+    def __init__(self, data, format, extension, encode_seconds, palette_colors=None):
+        self.data = data
+        self.format = format
+        self.extension = extension
+        self.encode_seconds = encode_seconds
+        self.palette_colors = palette_colors
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def save(self, filepath):
+        with open(filepath, 'wb') as f:
+            f.write(self.data)
+
+    def to_dict(self):
+        return {
+            'format': self.format,
+            'encode_ms': round(self.encode_seconds * 1000, 3),
+            'size_bytes': self.size,
+            'palette_colors': self.palette_colors
+        }
+
+
+def register_encoder(name, extension, encode_function):
+    """Register an encoder: encode_function(bgr_array, settings) -> bytes"""
+    ENCODERS[name] = (extension, encode_function)
+
+
+def to_bgr(frame):
+    """BGR array for an mss ScreenShot or a BGRA/BGR array"""
+    if not isinstance(frame, np.ndarray):
+        frame = frame_to_array(frame)
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
+
+
+def pack_colors(bgr):
+    """Pack a BGR array into one uint32 per pixel so colours can be counted with NumPy"""
+    return (bgr[..., 0].astype(np.uint32)
+            | (bgr[..., 1].astype(np.uint32) << 8)
+            | (bgr[..., 2].astype(np.uint32) << 16))
+
+
+def palette_indices(bgr, max_colors, sample_step=4):
+    """Return (palette, indices) if the frame has at most max_colors colours, else None
+
+    A strided sample is checked first, so colourful frames are rejected without
+    sorting every pixel.
+    """
+    if len(np.unique(pack_colors(bgr[::sample_step, ::sample_step]))) > max_colors:
+        return None
+    colors, indices = np.unique(pack_colors(bgr), return_inverse=True)
+    if len(colors) > max_colors:
+        return None
+    return colors, indices.reshape(bgr.shape[:2]).astype(np.uint8)
+
+
+def encode_png(bgr, settings):
+    ok, data = cv2.imencode('.png', bgr, [cv2.IMWRITE_PNG_COMPRESSION, int(settings['compression'])])
+    if not ok:
+        raise RuntimeError('PNG encoding failed')
+    return data.tobytes()
+
+
+def encode_palette_png(colors, indices, settings):
+    image = Image.fromarray(indices)
+    palette = np.stack([(colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF], axis=1)
+    image.putpalette(palette.astype(np.uint8).tobytes())
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', compress_level=int(settings['compression']))
+    return buffer.getvalue()
+
+
+def encode_webp(bgr, settings):
+    # OpenCV switches WebP to lossless mode for quality values above 100
+    quality = 101 if settings['lossless'] else int(settings['quality'])
+    ok, data = cv2.imencode('.webp', bgr, [cv2.IMWRITE_WEBP_QUALITY, quality])
+    if not ok:
+        raise RuntimeError('WebP encoding failed')
+    return data.tobytes()
+
+
+def encode_jpeg(bgr, settings):
+    ok, data = cv2.imencode('.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, int(settings['quality'])])
+    if not ok:
+        raise RuntimeError('JPEG encoding failed')
+    return data.tobytes()
+
+
+register_encoder('png', '.png', encode_png)
+register_encoder('webp', '.webp', encode_webp)
+register_encoder('jpeg', '.jpg', encode_jpeg)
+
+# Every extension a capture can be written with
+IMAGE_EXTENSIONS = ('.png', '.webp', '.jpg')
+
+
+class ImageEncoder:
+    """Encode frames with one set of format/compression settings"""
+
+    def __init__(self, settings=None):
+        self.settings = {**DEFAULT_ENCODER_SETTINGS, **(settings or {})}
+        if self.settings['format'] not in ENCODERS:
+            raise ValueError(f"Unknown image format: {self.settings['format']}")
+        # Palette indices are stored as uint8, so more than 256 colours would wrap around
+        colors = self.settings['palette_colors']
+        if isinstance(colors, bool) or not isinstance(colors, int) or not 2 <= colors <= 256:
+            raise ValueError(f'palette_colors must be an integer from 2 to 256, got {colors!r}')
+
+    @property
+    def extension(self):
+        return ENCODERS[self.settings['format']][0]
+
+    def encode(self, frame):
+        """Encode an mss ScreenShot or BGRA/BGR array into an EncodedImage"""
+        started = time.perf_counter()
+        settings = self.settings
+        bgr = to_bgr(frame)
+
+        if settings['format'] == 'png' and settings['auto_palette']:
+            palette = palette_indices(bgr, int(settings['palette_colors']))
+            if palette is not None:
+                colors, indices = palette
+                data = encode_palette_png(colors, indices, settings)
+                return EncodedImage(data, 'png', '.png', time.perf_counter() - started, len(colors))
+
+        extension, encode_function = ENCODERS[settings['format']]
+        data = encode_function(bgr, settings)
+        return EncodedImage(data, settings['format'], extension, time.perf_counter() - started)
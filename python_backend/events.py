@@ -0,0 +1,91 @@
+"""
+Backend event bus for push delivery to the frontend
+
+Capture results, recorded frames and errors are published as events with a
+strictly increasing sequence number and kept in a bounded history. Clients
+either hold a Server-Sent Events stream open or long-poll with the last
+sequence number they saw, so nothing is lost between requests and a result
+is delivered as soon as it is published instead of on the next poll.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+
+class EventBus:
+    """Sequenced publish/subscribe with a bounded replay history"""
+
+    def __init__(self, history=1024):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=history)
+        self.sequence = 0
+
+    def publish(self, event_type, data=None):
+        """Record an event and wake every waiting subscriber; returns its sequence number"""
+        with self._condition:
+            self.sequence += 1
+            self._events.append({
+                'seq': self.sequence,
+                'type': event_type,
+                'time': time.time(),
+                'data': data or {}
+            })
+            self._condition.notify_all()
+            return self.sequence
+
+    def since(self, sequence, types=None):
+        """Events after a sequence number, optionally limited to some event types"""
+        with self._condition:
+            return self._since(sequence, types)
+
+    def _since(self, sequence, types):
+        # Events are ordered by sequence, so walk back from the newest one
+        events = []
+        for event in reversed(self._events):
+            if event['seq'] <= sequence:
+                break
+            if not types or event['type'] in types:
+                events.append(event)
+        events.reverse()
+        return events
+
+    def wait(self, sequence, timeout=25.0, types=None):
+        """Block until an event after sequence is available or the timeout expires"""
+        deadline = time.monotonic() + max(float(timeout), 0)
+        with self._condition:
+            while True:
+                events = self._since(sequence, types)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self._condition.wait(remaining)
+
+    def oldest_sequence(self):
+        """Sequence of the oldest event still held, so clients can tell when they missed some"""
+        with self._condition:
+            return self._events[0]['seq'] if self._events else self.sequence + 1
+
+    def stream(self, sequence, types=None, heartbeat=15.0, duration=None):
+        """Generator of Server-Sent Events frames, with comment lines as keep-alives
+
+        With a duration the stream ends after that many seconds; EventSource clients
+        reconnect on their own and resume from the Last-Event-ID they saw.
+        """
+        deadline = time.monotonic() + duration if duration else None
+        # Send something right away: some servers hold the headers until the first chunk
+        yield 'retry: 1000\n\n'
+        while True:
+            wait = heartbeat
+            if deadline is not None:
+                wait = min(heartbeat, deadline - time.monotonic())
+                if wait <= 0:
+                    return
+            events = self.wait(sequence, wait, types)
+            if not events:
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                sequence = event['seq']
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
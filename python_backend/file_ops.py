@@ -0,0 +1,223 @@
+"""
+Bulk file operations
+
+Clearing, reorganising and cleaning screenshot folders used to walk them with
+glob and handle one file at a time. BulkFileOps takes whole lists of paths,
+lists directories with os.scandir (no per-file stat calls), moves files with
+os.replace - a rename, falling back to a copy only when source and target are
+on different file systems - and spreads the work over a small thread pool in
+chunks, since unlink and rename spend their time in the kernel with the GIL
+released.
+
+Each run is a FileOpsJob. Progress is reported through on_progress at most
+every `progress_interval` seconds and once more when the job finishes, so a
+client following the event stream sees large operations advance.
+"""
+
+import errno
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 256      # Paths handled per pool task
+MAX_ERRORS = 50       # Errors kept per job (the failed count is always exact)
+
+
+def scan(folder, suffixes=None, files=True, dirs=False, include_hidden=False):
+    """Paths of the entries directly inside folder, optionally filtered by suffix"""
+    suffixes = tuple(s.lower() for s in suffixes) if suffixes else None
+    found = []
+    try:
+        entries = os.scandir(str(folder))
+    except FileNotFoundError:
+        return found
+    with entries:
+        for entry in entries:
+            if not include_hidden and entry.name.startswith('.'):
+                continue
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if (is_dir and not dirs) or (not is_dir and not files):
+                continue
+            if suffixes and not is_dir and not entry.name.lower().endswith(suffixes):
+                continue
+            found.append(entry.path)
+    return found
+
+
+def walk(folder):
+    """(files, directories) below folder, folder itself included"""
+    files, directories = [], []
+    pending = [str(folder)]
+    while pending:
+        directory = pending.pop()
+        directories.append(directory)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    else:
+                        files.append(entry.path)
+        except FileNotFoundError:
+            continue
+    return files, directories
+
+
+def move_file(source, destination):
+    """Rename source to destination; copy-based move only across file systems"""
+    try:
+        os.replace(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(source, destination)
+
+
+def remove_file(path):
+    """Delete a file; an already missing file counts as removed"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class FileOpsJob:
+    """Counters and results of one bulk operation"""
+
+    def __init__(self, operation, total):
+        self.job_id = uuid.uuid4().hex
+        self.operation = operation
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.errors = []
+        self.completed = []
+        self.removed_directories = []
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self._lock = threading.Lock()
+
+    def record(self, completed, errors, uncollected=0):
+        """Count finished items (uncollected ones count as done but are not listed in completed)"""
+        with self._lock:
+            self.done += len(completed) + uncollected
+            self.completed.extend(completed)
+            self.failed += len(errors)
+            self.errors.extend(errors[:max(MAX_ERRORS - len(self.errors), 0)])
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'operation': self.operation,
+                'total': self.total,
+                'done': self.done,
+                'failed': self.failed,
+                'finished': self.elapsed is not None,
+                'elapsed_ms': round(((self.elapsed if self.elapsed is not None
+                                      else time.perf_counter() - self.started) * 1000), 3),
+                'errors': list(self.errors)
+            }
+
+
+class BulkFileOps:
+    """Runs file operations over lists of paths on a small thread pool"""
+
+    def __init__(self, workers=4, chunk_size=CHUNK_SIZE, on_progress=None, progress_interval=0.25):
+        self.workers = int(workers)
+        self.chunk_size = int(chunk_size)
+        self.on_progress = on_progress
+        self.progress_interval = float(progress_interval)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._last_progress = {}
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='file-ops')
+            return self._executor
+
+    def run(self, operation, items, action, job=None):
+        """Apply action(item) to every item, chunked over the pool; returns the finished job"""
+        items = list(items)
+        finish = job is None
+        job = job or FileOpsJob(operation, len(items))
+        if items:
+            chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+            if len(chunks) == 1:
+                # Not worth a hand-off to the pool
+                self._run_chunk(job, chunks[0], action)
+            else:
+                for future in [self._pool().submit(self._run_chunk, job, chunk, action) for chunk in chunks]:
+                    future.result()
+        if finish:
+            job.finish()
+            self._report(job, final=True)
+        return job
+
+    def _run_chunk(self, job, chunk, action):
+        completed, errors = [], []
+        for item in chunk:
+            try:
+                action(item)
+                completed.append(item)
+            except OSError as e:
+                errors.append({'path': str(item[0] if isinstance(item, tuple) else item), 'error': str(e)})
+        job.record(completed, errors)
+        self._report(job)
+
+    def _report(self, job, final=False):
+        if not self.on_progress:
+            return
+        now = time.monotonic()
+        if not final:
+            last = self._last_progress.get(job.job_id, 0)
+            if now - last < self.progress_interval:
+                return
+        self._last_progress[job.job_id] = now
+        if final:
+            self._last_progress.pop(job.job_id, None)
+        try:
+            self.on_progress(job.to_dict())
+        except Exception as e:
+            print(f"Error reporting file operation progress: {e}")
+
+    def remove(self, paths, operation='remove'):
+        """Delete files and whole directory trees; job.completed lists the removed files"""
+        files, directories = [], []
+        for path in paths:
+            path = str(path)
+            if os.path.isdir(path) and not os.path.islink(path):
+                tree_files, tree_dirs = walk(path)
+                files.extend(tree_files)
+                directories.extend(tree_dirs)
+            else:
+                files.append(path)
+        job = FileOpsJob(operation, len(files) + len(directories))
+        self.run(operation, files, remove_file, job)
+        # Directories are empty now; deepest first so parents go last
+        directories.sort(key=lambda path: path.count(os.sep), reverse=True)
+        removed_dirs, errors = [], []
+        for directory in directories:
+            try:
+                os.rmdir(directory)
+                removed_dirs.append(directory)
+            except OSError as e:
+                errors.append({'path': directory, 'error': str(e)})
+        job.removed_directories = removed_dirs
+        job.record([], errors, uncollected=len(removed_dirs))
+        job.finish()
+        self._report(job, final=True)
+        return job
+
+    def move(self, pairs, operation='move'):
+        """Move (source, destination) pairs; job.completed lists the moved pairs"""
+        return self.run(operation, [(str(source), str(destination)) for source, destination in pairs],
+                        lambda pair: move_file(*pair))
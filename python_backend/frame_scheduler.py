@@ -0,0 +1,80 @@
+"""
+Fixed-rate frame scheduler
+
+Deadlines are computed from the start time on the monotonic clock
+(start + n * period) instead of sleeping a fixed interval after each frame, so
+the time spent grabbing and encoding is absorbed and the rate does not drift.
+Every deadline that passes while a frame is still being worked on counts as
+missed, including a short overrun into the next slot (that frame then starts
+late). When whole periods are overrun, the schedule skips those ticks instead
+of firing a burst of catch-up frames.
+"""
+
+import threading
+import time
+
+from metrics import LatencyCounter
+
+
+class FrameScheduler:
+    """Paces a loop at a target frame rate and records missed deadlines and jitter"""
+
+    def __init__(self, fps, stop_event=None):
+        if fps <= 0:
+            raise ValueError(f'Frame rate must be positive, got: {fps}')
+        self.fps = float(fps)
+        self.period = 1.0 / self.fps
+        self.stop_event = stop_event or threading.Event()
+        self.jitter = LatencyCounter()
+        self.work_time = LatencyCounter()
+        self.started_at = None
+        self.frames = 0
+        self.missed_deadlines = 0
+        self.skipped_ticks = 0
+        self._tick = 0
+        self._tick_started = None
+
+    def wait_next(self):
+        """Block until the next deadline; returns False once the stop event is set"""
+        now = time.monotonic()
+        if self.started_at is None:
+            self.started_at = now
+            self._tick_started = now
+            if self.stop_event.is_set():
+                return False
+            self.frames += 1
+            return True
+
+        self.work_time.record(now - self._tick_started)
+        self._tick += 1
+        deadline = self.started_at + self._tick * self.period
+        if now > deadline:
+            # Work overran the slot: this deadline is missed, and the ticks we can
+            # no longer make at all are dropped (and missed as well)
+            skipped = int((now - deadline) // self.period)
+            self.missed_deadlines += skipped + 1
+            if skipped:
+                self.skipped_ticks += skipped
+                self._tick += skipped
+                deadline = self.started_at + self._tick * self.period
+
+        if self.stop_event.wait(max(deadline - time.monotonic(), 0)):
+            return False
+
+        woke = time.monotonic()
+        self.jitter.record(max(woke - deadline, 0))
+        self._tick_started = woke
+        self.frames += 1
+        return True
+
+    def get_stats(self):
+        elapsed = time.monotonic() - self.started_at if self.started_at is not None else 0
+        return {
+            'target_fps': self.fps,
+            'actual_fps': round(self.frames / elapsed, 3) if elapsed > 0 else None,
+            'frames': self.frames,
+            'missed_deadlines': self.missed_deadlines,
+            'skipped_ticks': self.skipped_ticks,
+            'jitter': self.jitter.snapshot(),
+            'work_time': self.work_time.snapshot()
+        }
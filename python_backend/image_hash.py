@@ -0,0 +1,226 @@
+"""
+Perceptual hashing and near-duplicate lookup for screenshots
+
+Each image gets a 128-bit fingerprint made of a 64-bit dHash (gradient
+signs on a 9x8 grid) and a 64-bit pHash (signs of the low-frequency DCT
+coefficients of a 32x32 thumbnail), both computed with NumPy. The Hamming
+distance between fingerprints measures visual difference: 0 for identical
+captures, small values for re-captures of the same dialog.
+
+Fingerprints are persisted per file (path, mtime, size) in a hash store (the
+screenshot catalog), and each folder is indexed in a BK-tree so a lookup
+only visits the branches that can still be within the requested distance.
+"""
+
+import os
+import threading
+
+from lazy_modules import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, so dct(x) == M @ x @ M.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2.0 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_dct_cache = {}
+
+
+def _dct(n):
+    # Built on first use so importing this module does not load numpy
+    if n not in _dct_cache:
+        _dct_cache[n] = _dct_matrix(n)
+    return _dct_cache[n]
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(gray):
+    """64-bit difference hash of a grayscale image"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray):
+    """64-bit DCT hash of a grayscale image"""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float64)
+    dct = _dct(32)
+    low = (dct @ small @ dct.T)[:8, :8].ravel()
+    # The DC term only reflects overall brightness, so leave it out of the median
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+def image_fingerprint(image):
+    """128-bit fingerprint (dHash in the high bits, pHash in the low bits)"""
+    if image.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        image = cv2.cvtColor(image, code)
+    return (dhash(image) << 64) | phash(image)
+
+
+def file_fingerprint(path):
+    image = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f'Could not decode image: {path}')
+    return image_fingerprint(image)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance"""
+
+    def __init__(self):
+        self._root = None
+        self.size = 0
+
+    def add(self, fingerprint, item):
+        node = (fingerprint, item, {})
+        self.size += 1
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming(fingerprint, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, fingerprint, max_distance):
+        """All (distance, item) pairs within max_distance, closest first"""
+        if self._root is None:
+            return []
+        results = []
+        pending = [self._root]
+        while pending:
+            current = pending.pop()
+            distance = hamming(fingerprint, current[0])
+            if distance <= max_distance:
+                results.append((distance, current[1]))
+            # Triangle inequality: only children in [d - max, d + max] can match
+            for child_distance, child in current[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    pending.append(child)
+        results.sort(key=lambda x: x[0])
+        return results
+
+
+class PerceptualIndex:
+    """Per-folder BK-trees over persisted image fingerprints"""
+
+    def __init__(self, store, extensions=('.png',)):
+        self.store = store
+        self.extensions = tuple(extensions)
+        self._lock = threading.Lock()
+        self._folders = {}  # folder -> (BKTree, {path: (mtime, size, fingerprint)})
+
+    def fingerprint(self, path):
+        """Fingerprint of a file, reusing the stored value when the file is unchanged"""
+        path = os.path.abspath(str(path))
+        stat = os.stat(path)
+        stored = self.store.get_hash(path)
+        if stored and stored[0] == stat.st_mtime and stored[1] == stat.st_size:
+            return stored[2]
+        fingerprint = file_fingerprint(path)
+        self.store.set_hash(path, stat.st_mtime, stat.st_size, fingerprint)
+        return fingerprint
+
+    def _scan(self, folder):
+        files = {}
+        try:
+            for entry in os.scandir(folder):
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.extensions:
+                    stat = entry.stat()
+                    files[os.path.abspath(entry.path)] = (stat.st_mtime, stat.st_size)
+        except OSError:
+            pass
+        return files
+
+    def _refresh(self, folder):
+        """Bring a folder's tree up to date with the files on disk"""
+        folder = os.path.abspath(str(folder))
+        files = self._scan(folder)
+        tree, entries = self._folders.get(folder, (None, {}))
+
+        stale = [path for path, entry in entries.items() if files.get(path) != entry[:2]]
+        if tree is None or stale:
+            # BK-trees do not support removal, so rebuild from the stored fingerprints
+            tree, entries = BKTree(), {}
+
+        new_paths = [path for path in files if path not in entries]
+        if new_paths:
+            stored = self.store.get_hashes(folder)
+            computed = []
+            for path in new_paths:
+                mtime, size = files[path]
+                known = stored.get(path)
+                if known and known[0] == mtime and known[1] == size:
+                    fingerprint = known[2]
+                else:
+                    try:
+                        fingerprint = file_fingerprint(path)
+                    except Exception as e:
+                        print(f"Error hashing {path}: {e}")
+                        continue
+                    computed.append((path, mtime, size, fingerprint))
+                entries[path] = (mtime, size, fingerprint)
+                tree.add(fingerprint, path)
+            if computed:
+                self.store.set_hashes(computed)
+
+        self._folders[folder] = (tree, entries)
+        return tree, entries
+
+    def find(self, folder, fingerprint, max_distance=0, exclude=None):
+        """Files in folder whose fingerprint is within max_distance, closest first"""
+        exclude = os.path.abspath(str(exclude)) if exclude else None
+        with self._lock:
+            tree, _ = self._refresh(folder)
+            matches = tree.search(fingerprint, max_distance)
+        return [(distance, path) for distance, path in matches if path != exclude]
+
+    def group_duplicates(self, folder, max_distance=0):
+        """Split a folder into files to keep and (duplicate, original, distance) triples
+
+        Files are visited oldest first, so the earliest capture of each image is kept.
+        """
+        with self._lock:
+            _, entries = self._refresh(folder)
+            ordered = sorted(entries.items(), key=lambda item: (item[1][0], item[0]))
+
+        kept = BKTree()
+        keep, duplicates = [], []
+        for path, (_, _, fingerprint) in ordered:
+            matches = kept.search(fingerprint, max_distance)
+            if matches:
+                distance, original = matches[0]
+                duplicates.append((path, original, distance))
+            else:
+                kept.add(fingerprint, path)
+                keep.append(path)
+        return keep, duplicates
+
+    def forget(self, folder=None):
+        """Drop cached trees (all of them, or one folder's)"""
+        with self._lock:
+            if folder is None:
+                self._folders.clear()
+            else:
+                self._folders.pop(os.path.abspath(str(folder)), None)
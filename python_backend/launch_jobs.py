@@ -0,0 +1,162 @@
+"""
+Application launch jobs with readiness detection
+
+launch() starts the process and returns a job right away. A monitor thread
+then polls the top-level windows until one owned by the process (or a child
+it spawned, or a same-named process started after the launch - launchers
+such as SSMS hand off to another process and exit) appears. The job is then
+ready; if every candidate process exits first, or the deadline passes, it
+fails.
+
+The monitor never walks the whole process list or forces a window
+enumeration itself: children and newcomers come from find_processes (the
+shared process table) and windows from list_windows (the TTL-cached window
+index). Polling is quick for the first second, when most applications show
+their window, and then backs off.
+
+On platforms without a window list the process merely being alive counts as
+ready, since there is nothing better to wait for.
+"""
+
+import os
+import threading
+import time
+import uuid
+
+import psutil
+
+# Job states
+STARTING = 'starting'
+READY = 'ready'
+EXITED = 'exited'
+TIMED_OUT = 'timed_out'
+FAILED = 'failed'
+
+
+class LaunchJob:
+    """One launched application and its readiness state"""
+
+    def __init__(self, exe_path, pid):
+        self.job_id = uuid.uuid4().hex
+        self.exe_path = exe_path
+        self.pid = pid
+        self.state = STARTING
+        self.error = None
+        self.window = None
+        self.pids = {pid}
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self.ready_after = None
+        self.done = threading.Event()
+
+    def finish(self, state, window=None, error=None):
+        self.state = state
+        self.window = window
+        self.error = error
+        self.ready_after = round(time.monotonic() - self._started, 3)
+        self.done.set()
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'exe_path': self.exe_path,
+            'pid': self.pid,
+            'state': self.state,
+            'ready': self.state == READY,
+            'window': self.window,
+            'process_ids': sorted(self.pids),
+            'error': self.error,
+            'started_at': self.started_at,
+            'elapsed_seconds': self.ready_after if self.done.is_set()
+                               else round(time.monotonic() - self._started, 3)
+        }
+
+
+class LaunchTracker:
+    """Starts applications and reports when their first window is up"""
+
+    def __init__(self, list_windows, find_processes=None, on_finished=None, poll_interval=0.1,
+                 max_poll_interval=1.0, fast_seconds=1.0, timeout=120.0, history=64):
+        self.list_windows = list_windows
+        # find_processes(pids, exe_name, since) -> PIDs descended from pids or named exe_name
+        self.find_processes = find_processes
+        self.on_finished = on_finished
+        self.poll_interval = float(poll_interval)
+        self.max_poll_interval = float(max_poll_interval)
+        self.fast_seconds = float(fast_seconds)
+        self.timeout = float(timeout)
+        self.history = int(history)
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def launch(self, exe_path, popen):
+        """Start a process with popen() and return its job without waiting for it"""
+        process = popen()
+        job = LaunchJob(exe_path, process.pid)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            # Forget the oldest finished jobs beyond the history limit
+            finished = [j for j in self._jobs.values() if j.done.is_set()]
+            for old in sorted(finished, key=lambda j: j.started_at)[:max(len(self._jobs) - self.history, 0)]:
+                self._jobs.pop(old.job_id, None)
+        threading.Thread(target=self._monitor, args=(job, process), name=f'launch-{job.pid}', daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout):
+        """Block until the job is ready or failed, or timeout seconds pass"""
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(max(float(timeout), 0))
+        return job
+
+    def _candidates(self, job, exe_name):
+        """PIDs that may own the app's window: the launched process tree and same-named newcomers"""
+        alive = set()
+        for pid in list(job.pids):
+            try:
+                if psutil.Process(pid).status() != psutil.STATUS_ZOMBIE:
+                    alive.add(pid)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        if self.find_processes:
+            alive |= self.find_processes(alive, exe_name, job.started_at - 1)
+        job.pids |= alive
+        return alive
+
+    def _monitor(self, job, process):
+        exe_name = os.path.basename(job.exe_path).lower()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        interval = self.poll_interval
+        try:
+            while True:
+                alive = self._candidates(job, exe_name)
+                windows = self.list_windows()
+                if windows is None:
+                    # No window list on this platform: a running process is as ready as it gets
+                    if alive:
+                        job.finish(READY)
+                        break
+                else:
+                    matches = [w for w in windows if w['pid'] in alive and w['title']]
+                    if matches:
+                        job.finish(READY, window=matches[0])
+                        break
+                if not alive and process.poll() is not None:
+                    job.finish(EXITED, error=f'Process exited with code {process.returncode} before showing a window')
+                    break
+                if time.monotonic() >= deadline:
+                    job.finish(TIMED_OUT, error=f'No window appeared within {self.timeout:.0f} seconds')
+                    break
+                if time.monotonic() - started >= self.fast_seconds:
+                    interval = min(interval * 2, self.max_poll_interval)
+                time.sleep(interval)
+        except Exception as e:
+            job.finish(FAILED, error=str(e))
+
+        if self.on_finished:
+            self.on_finished(job)
@@ -0,0 +1,72 @@
+"""
+Deferred imports for heavy modules
+
+numpy, OpenCV, Pillow and mss together take several hundred milliseconds to
+import, and most of the backend's commands never touch them. lazy_import()
+returns a stand-in that imports the real module on first attribute access,
+so `cv2 = lazy_import('cv2')` at the top of a module costs nothing until a
+frame is actually encoded. How long each first import took is recorded for
+the startup report.
+
+There is one proxy per module name, shared by every lazy_import() and by
+preload(), so warming a module in the background warms the proxies the rest
+of the backend uses.
+"""
+
+import importlib
+import sys
+import threading
+import time
+
+import_times = {}
+_lock = threading.Lock()
+_proxies = {}
+
+
+class LazyModule:
+    """Module proxy that imports on first use"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    name = self.__dict__['_name']
+                    # Only a real import is timed; one already done elsewhere costs nothing here
+                    imported = name not in sys.modules
+                    started = time.perf_counter()
+                    module = importlib.import_module(name)
+                    if imported:
+                        import_times[name] = round((time.perf_counter() - started) * 1000, 3)
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """The shared proxy for a module"""
+    with _lock:
+        proxy = _proxies.get(name)
+        if proxy is None:
+            proxy = _proxies[name] = LazyModule(name)
+        return proxy
+
+
+def preload(*names):
+    """Import modules now (e.g. on a background thread once the server is up)"""
+    for name in names:
+        lazy_import(name)._load()
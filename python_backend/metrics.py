@@ -0,0 +1,87 @@
+"""
+Lightweight timing counters shared by the capture and recording code
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class LatencyCounter:
+    """Thread-safe latency counter that keeps totals plus a window of recent samples"""
+
+    def __init__(self, window=512):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.total = 0.0
+            self.min = None
+            self.max = None
+            self.last = None
+            self._recent.clear()
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.last = seconds
+            self.min = seconds if self.min is None else min(self.min, seconds)
+            self.max = seconds if self.max is None else max(self.max, seconds)
+            self._recent.append(seconds)
+
+    def percentile(self, pct):
+        """Percentile (0-100) over the recent sample window, in seconds"""
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self):
+        """Return the counter as a JSON-friendly dict with millisecond values"""
+        with self._lock:
+            count, total = self.count, self.total
+            low, high, last = self.min, self.max, self.last
+
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            'count': count,
+            'avg_ms': ms(total / count) if count else None,
+            'min_ms': ms(low),
+            'max_ms': ms(high),
+            'last_ms': ms(last),
+            'p50_ms': ms(self.percentile(50)),
+            'p95_ms': ms(self.percentile(95)),
+            'p99_ms': ms(self.percentile(99)),
+        }
+
+
+class StartupTimer:
+    """Wall-clock durations of the backend's startup phases"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        """End the current phase, naming it"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self):
+        def ms(value):
+            return round(value * 1000, 3)
+
+        return {
+            'phases': [{'phase': phase, 'ms': ms(seconds)} for phase, seconds in self.phases],
+            'total_ms': ms(self._last - self.started)
+        }
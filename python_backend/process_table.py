@@ -0,0 +1,197 @@
+"""
+Incrementally maintained process table
+
+A background thread diffs the PID list every few seconds instead of walking
+every process on each request. Name, executable and start time are looked
+up once, when a PID first appears; window titles come from the shared
+window index. Every change bumps a version number and is appended to a
+change log, so a client that remembers the last version it saw gets only
+the processes added, updated or removed since then. Version tokens carry a
+per-table prefix, so a token from before a backend restart is never applied
+to the new table.
+"""
+
+import bisect
+import threading
+import time
+import uuid
+
+import psutil
+
+IGNORED_NAMES = {'', 'System Idle Process'}
+
+
+class ProcessTable:
+    """PID -> process entry, refreshed from PID diffs, with versioned change tracking"""
+
+    def __init__(self, list_windows=None, interval=2.0, log_size=4096):
+        self.list_windows = list_windows
+        self.interval = float(interval)
+        self.log_size = int(log_size)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._log = []  # (version, pid), oldest first
+        self._log_floor = 0  # changes up to this version may have been trimmed from the log
+        self._thread = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._instance = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.last_refresh_seconds = None
+
+    def start(self):
+        """Fill the table once and keep it current in the background"""
+        with self._lock:
+            starting = self._thread is None
+            if starting:
+                self._thread = threading.Thread(target=self._run, name='process-table', daemon=True)
+        if starting:
+            try:
+                self.refresh()
+            finally:
+                self._ready.set()
+            self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing process table: {e}")
+
+    @staticmethod
+    def _describe(pid):
+        """Static details of a new PID, or None if it is gone or not worth listing"""
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                name = process.name()
+                if name in IGNORED_NAMES:
+                    return None
+                try:
+                    exe = process.exe()
+                except (psutil.AccessDenied, psutil.ZombieProcess, OSError):
+                    exe = ''
+                return {'pid': pid, 'name': name, 'path': exe, 'create_time': process.create_time(),
+                        'ppid': process.ppid()}
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    def _window_titles(self):
+        """Main window title per PID (the longest title of the windows it owns)"""
+        titles = {}
+        if self.list_windows is None:
+            return titles
+        for window in self.list_windows() or []:
+            pid, title = window.get('pid'), window.get('title') or ''
+            if pid and len(title) > len(titles.get(pid, '')):
+                titles[pid] = title
+        return titles
+
+    def refresh(self):
+        """Apply the PID diff and window-title changes since the last refresh"""
+        started = time.perf_counter()
+        pids = set(psutil.pids())
+        with self._lock:
+            known = set(self._entries)
+        added = {}
+        for pid in pids - known:
+            entry = self._describe(pid)
+            if entry:
+                added[pid] = entry
+        titles = self._window_titles()
+
+        with self._lock:
+            changed = []
+            for pid in known - pids:
+                if self._entries.pop(pid, None) is not None:
+                    changed.append(pid)
+            for pid, entry in added.items():
+                entry['window_title'] = titles.get(pid, '')
+                self._entries[pid] = entry
+                changed.append(pid)
+            for pid, entry in self._entries.items():
+                title = titles.get(pid, '')
+                if pid not in added and entry['window_title'] != title:
+                    entry['window_title'] = title
+                    changed.append(pid)
+            if changed:
+                self.version += 1
+                self._log.extend((self.version, pid) for pid in changed)
+                if len(self._log) > self.log_size:
+                    excess = len(self._log) - self.log_size
+                    self._log_floor = self._log[excess - 1][0]
+                    del self._log[:excess]
+            self.last_refresh_seconds = time.perf_counter() - started
+            return len(changed)
+
+    def related(self, pids, name=None, since=0):
+        """PIDs started at or after since that descend from pids or are called name"""
+        name = (name or '').lower()
+        with self._lock:
+            recent = [e for e in self._entries.values() if e['create_time'] >= since]
+        children = {}
+        for entry in recent:
+            children.setdefault(entry['ppid'], []).append(entry['pid'])
+        found = {e['pid'] for e in recent if name and e['name'].lower() == name}
+        pending = list(pids)
+        while pending:
+            for child in children.get(pending.pop(), ()):
+                if child not in found:
+                    found.add(child)
+                    pending.append(child)
+        return found
+
+    @staticmethod
+    def _public(entry):
+        return {
+            'name': entry['name'],
+            'pid': entry['pid'],
+            'windowTitle': entry['window_title'] or entry['name'],
+            'hasWindow': bool(entry['window_title']),
+            'path': entry['path']
+        }
+
+    def token(self, version=None):
+        return f'{self._instance}-{self.version if version is None else version}'
+
+    def snapshot(self, windowed_only=False):
+        """(version token, every listed process)"""
+        with self._lock:
+            apps = [self._public(e) for e in self._entries.values() if e['window_title'] or not windowed_only]
+            return self.token(), apps
+
+    def changes_since(self, token, windowed_only=False):
+        """(version token, updated entries, removed PIDs), or None when the token cannot be served"""
+        instance, _, version = str(token).rpartition('-')
+        if instance != self._instance or not version.isdigit():
+            return None
+        version = int(version)
+        with self._lock:
+            if version > self.version or version < self._log_floor:
+                return None
+            # The log is ordered by version, so jump to the first newer record
+            start = bisect.bisect_right(self._log, (version, float('inf')))
+            touched = {pid for _, pid in self._log[start:]}
+            updated, removed = [], []
+            for pid in touched:
+                entry = self._entries.get(pid)
+                if entry is None or (windowed_only and not entry['window_title']):
+                    removed.append(pid)
+                else:
+                    updated.append(self._public(entry))
+            return self.token(), updated, removed
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'processes': len(self._entries),
+                'version': self.token(),
+                'log_entries': len(self._log),
+                'last_refresh_ms': round(self.last_refresh_seconds * 1000, 3) if self.last_refresh_seconds is not None else None,
+                'interval_seconds': self.interval
+            }
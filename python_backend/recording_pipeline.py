@@ -0,0 +1,127 @@
+"""
+Grab/encode pipeline for recordings
+
+The grab stage hands frames to a pool of encoder/writer workers through a
+bounded queue, so a slow PNG encode or disk write no longer holds up the next
+grab. When the workers fall behind, the overflow policy decides what happens:
+
+- 'block':       the grab stage waits for a free slot (no frames are lost)
+- 'drop_oldest': the oldest queued frame is discarded to make room
+- 'drop_newest': the incoming frame is discarded
+"""
+
+import queue
+import threading
+import time
+
+from metrics import LatencyCounter
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+
+class FramePipeline:
+    """Bounded queue feeding a pool of worker threads that process recorded frames"""
+
+    def __init__(self, handler, workers=2, queue_size=8, overflow='block', name='recording'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f'Unknown overflow policy: {overflow}')
+        self.handler = handler
+        self.worker_count = max(int(workers), 1)
+        self.overflow = overflow
+        self.name = name
+        self._queue = queue.Queue(maxsize=max(int(queue_size), 1))
+        self._workers = []
+        self._lock = threading.Lock()
+        self._timings = {}
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        for index in range(self.worker_count):
+            worker = threading.Thread(target=self._run, name=f'{self.name}-worker-{index}')
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def close(self, timeout=30):
+        """Let the workers drain the queue, then stop them"""
+        for _ in self._workers:
+            self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+        self._workers = []
+
+    def timing(self, stage):
+        """Latency counter for a named stage, created on first use"""
+        with self._lock:
+            counter = self._timings.get(stage)
+            if counter is None:
+                counter = self._timings[stage] = LatencyCounter()
+            return counter
+
+    def put(self, frame):
+        """Hand a frame to the workers; returns False if the frame was dropped"""
+        item = (frame, time.perf_counter())
+        with self._lock:
+            self.submitted += 1
+
+        if self.overflow == 'block':
+            self._queue.put(item)
+            return True
+
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                if self.overflow == 'drop_newest':
+                    self._count_drop()
+                    return False
+            try:
+                self._queue.get_nowait()
+                self._count_drop()
+            except queue.Empty:
+                pass
+
+    def get_stats(self):
+        with self._lock:
+            timings = {stage: counter.snapshot() for stage, counter in self._timings.items()}
+            return {
+                'workers': self.worker_count,
+                'overflow_policy': self.overflow,
+                'queue_size': self._queue.maxsize,
+                'queue_depth': self._queue.qsize(),
+                'submitted': self.submitted,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'timings': timings
+            }
+
+    def _count_drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def _run(self):
+        wait_counter = self.timing('queue_wait')
+        process_counter = self.timing('process')
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            frame, queued_at = item
+            started = time.perf_counter()
+            wait_counter.record(started - queued_at)
+            try:
+                self.handler(frame, self)
+                with self._lock:
+                    self.processed += 1
+            except Exception as e:
+                print(f"Error processing recorded frame: {e}")
+                with self._lock:
+                    self.errors += 1
+            process_counter.record(time.perf_counter() - started)
@@ -0,0 +1,264 @@
+"""
+Long-lived region-selection overlay
+
+Building a fullscreen tk.Tk() for every selection costs a noticeable delay,
+and Tk interpreters must not be created over and over from worker threads.
+RegionOverlay owns one Tk root on one dedicated thread for the life of the
+backend. The window stays withdrawn between selections; show() only puts a
+request on a queue, which the Tk thread picks up within one poll interval
+(about one frame) and answers by raising the already-built overlay.
+
+Tk is only ever touched from its own thread. Finished selections - a region
+or a cancellation reason - go back over the `selections` queue, so capturing
+and encoding happen on the consumer's thread while the overlay is hidden
+again immediately.
+
+With a FrozenFrame the screen is grabbed once, before the overlay appears,
+and the overlay shows that still image instead of a translucent veil. The
+selected region is then a NumPy slice of the held grab: no second grab, no
+overlay residue, and nothing that changed on screen while the user dragged.
+"""
+
+import queue
+import threading
+import time
+import uuid
+
+from frame_diff import frame_to_array
+from lazy_modules import lazy_import
+from metrics import LatencyCounter
+
+Image = lazy_import('PIL.Image')
+
+# Look and feel of the two selection commands
+STYLES = {
+    'system': {'alpha': 0.3, 'outline_width': 2, 'dash': (5, 5), 'show_size': False},
+    'visual': {'alpha': 0.2, 'outline_width': 3, 'dash': (10, 5), 'show_size': True},
+}
+
+MIN_SELECTION = 10   # Pixels; smaller drags count as a mis-click
+POLL_MS = 15         # How often the Tk thread checks for show/hide requests
+ACCENT = '#ff5722'
+
+
+class FrozenFrame:
+    """One full-screen grab held for the duration of a selection"""
+
+    def __init__(self, screenshot, monitor):
+        self.array = frame_to_array(screenshot)
+        self.left = monitor['left']
+        self.top = monitor['top']
+        height, width = self.array.shape[:2]
+        # Pillow decodes BGRA straight into RGB for the Tk backdrop
+        self.image = Image.frombuffer('RGB', (width, height), self.array, 'raw', 'BGRX', 0, 1)
+
+    def crop(self, region):
+        """Zero-copy view of a screen-coordinate region, clipped to the frame"""
+        height, width = self.array.shape[:2]
+        x0 = min(max(region['x'] - self.left, 0), width)
+        y0 = min(max(region['y'] - self.top, 0), height)
+        x1 = min(x0 + region['width'], width)
+        y1 = min(y0 + region['height'], height)
+        return self.array[y0:y1, x0:x1]
+
+
+class RegionOverlay:
+    """One persistent fullscreen overlay, shown and hidden on demand"""
+
+    def __init__(self, poll_ms=POLL_MS, min_selection=MIN_SELECTION):
+        self.poll_ms = int(poll_ms)
+        self.min_selection = int(min_selection)
+        self.requests = queue.Queue()
+        self.selections = queue.Queue()
+        self.show_latency = LatencyCounter()
+        self.shows = 0
+        self.error = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+        # Tk-thread state
+        self._root = None
+        self._canvas = None
+        self._backdrop = None
+        self._photo = None
+        self._instruction = None
+        self._active = None
+        self._style = STYLES['system']
+        self._start = (0, 0)
+        self._rect = None
+        self._label = None
+
+    def start(self):
+        """Create the Tk thread if it is not running yet (does not wait for it)"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='region-overlay', daemon=True)
+                self._thread.start()
+
+    def wait_ready(self, timeout=10):
+        """Block until the overlay window exists; raises if Tk could not start"""
+        self.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError('Region overlay did not start in time')
+        if self.error:
+            raise RuntimeError(f'Region overlay unavailable: {self.error}')
+
+    def show(self, source, style='system', context=None, frozen=None):
+        """Ask for a selection over the live screen or a FrozenFrame; returns the request id
+
+        The outcome arrives on `selections`.
+        """
+        if style not in STYLES:
+            raise ValueError(f'Unknown overlay style: {style}')
+        self.wait_ready()
+        request = {
+            'id': uuid.uuid4().hex,
+            'source': source,
+            'style': style,
+            'context': context or {},
+            'frozen': frozen,
+            'requested_at': time.perf_counter()
+        }
+        self.requests.put(request)
+        return request['id']
+
+    def hide(self):
+        """Cancel the selection in progress, if any"""
+        self.requests.put(None)
+
+    @property
+    def active(self):
+        return self._active is not None
+
+    def get_stats(self):
+        return {
+            'ready': self._ready.is_set() and self.error is None,
+            'error': str(self.error) if self.error else None,
+            'active': self.active,
+            'shows': self.shows,
+            'show_latency': self.show_latency.snapshot()
+        }
+
+    # Everything below runs on the overlay thread
+
+    def _run(self):
+        try:
+            import tkinter as tk
+            root = tk.Tk()
+            root.withdraw()
+            root.configure(bg='black')
+            canvas = tk.Canvas(root, bg='black', highlightthickness=0, cursor='crosshair')
+            canvas.pack(fill='both', expand=True)
+            # Created first so the selection rectangle and text are drawn over it
+            self._backdrop = canvas.create_image(0, 0, anchor='nw', state='hidden')
+            self._instruction = canvas.create_text(root.winfo_screenwidth() // 2, 50,
+                                                   text="Click and drag to select a region. Press ESC to cancel.",
+                                                   fill='white', font=('Arial', 16, 'bold'))
+            canvas.bind('<Button-1>', self._on_mouse_down)
+            canvas.bind('<B1-Motion>', self._on_mouse_move)
+            canvas.bind('<ButtonRelease-1>', self._on_mouse_up)
+            root.bind('<Escape>', lambda event: self._finish({'cancelled': 'escape'}))
+            self._root, self._canvas = root, canvas
+        except Exception as e:
+            self.error = e
+            self._ready.set()
+            return
+
+        self._ready.set()
+        root.after(self.poll_ms, self._poll)
+        root.mainloop()
+
+    def _poll(self):
+        try:
+            while True:
+                request = self.requests.get_nowait()
+                if self._active:
+                    self._finish({'cancelled': 'superseded' if request else 'hidden'})
+                if request:
+                    self._show(request)
+        except queue.Empty:
+            pass
+        self._root.after(self.poll_ms, self._poll)
+
+    def _show(self, request):
+        root, canvas = self._root, self._canvas
+        self._active = request
+        self._style = STYLES[request['style']]
+        self._clear_selection()
+        frozen = request['frozen']
+        if frozen is not None:
+            from PIL import ImageTk
+            # The overlay is opaque and shows the screen as it was when the selection began
+            self._photo = ImageTk.PhotoImage(frozen.image, master=root)
+            canvas.itemconfigure(self._backdrop, image=self._photo, state='normal')
+            root.attributes('-alpha', 1.0)
+        else:
+            canvas.itemconfigure(self._backdrop, state='hidden')
+            root.attributes('-alpha', self._style['alpha'])
+        root.deiconify()
+        root.attributes('-fullscreen', True)
+        root.attributes('-topmost', True)
+        root.lift()
+        root.focus_force()
+        canvas.focus_set()
+        root.update_idletasks()
+        self.shows += 1
+        self.show_latency.record(time.perf_counter() - request['requested_at'])
+
+    def _clear_selection(self):
+        for item in (self._rect, self._label):
+            if item:
+                self._canvas.delete(item)
+        self._rect = self._label = None
+
+    def _on_mouse_down(self, event):
+        if not self._active:
+            return
+        self._clear_selection()
+        self._start = (event.x, event.y)
+        self._rect = self._canvas.create_rectangle(event.x, event.y, event.x, event.y, outline=ACCENT,
+                                                   width=self._style['outline_width'], dash=self._style['dash'])
+        if self._style['show_size']:
+            self._label = self._canvas.create_text(event.x + 10, event.y - 10, anchor='w',
+                                                   text="Drag to select region",
+                                                   fill=ACCENT, font=('Arial', 12, 'bold'))
+
+    def _on_mouse_move(self, event):
+        if not self._rect:
+            return
+        x0, y0 = self._start
+        self._canvas.coords(self._rect, x0, y0, event.x, event.y)
+        if self._label:
+            self._canvas.itemconfigure(self._label,
+                                       text=f"Region: {abs(event.x - x0)} x {abs(event.y - y0)} pixels")
+
+    def _on_mouse_up(self, event):
+        if not self._active:
+            return
+        if not self._rect:
+            self._finish({'cancelled': 'no_selection'})
+            return
+        x1, y1, x2, y2 = self._canvas.coords(self._rect)
+        width, height = abs(x2 - x1), abs(y2 - y1)
+        if width <= self.min_selection or height <= self.min_selection:
+            self._finish({'cancelled': 'selection_too_small'})
+            return
+        # Canvas coordinates are relative to the overlay; regions are in screen coordinates
+        region = {'x': int(min(x1, x2)) + self._root.winfo_rootx(),
+                  'y': int(min(y1, y2)) + self._root.winfo_rooty(),
+                  'width': int(width), 'height': int(height)}
+        self._finish({'region': region})
+
+    def _finish(self, outcome):
+        request = self._active
+        if request is None:
+            return
+        self._active = None
+        self._clear_selection()
+        self._root.withdraw()
+        if self._photo is not None:
+            self._canvas.itemconfigure(self._backdrop, image='', state='hidden')
+            self._photo = None
+        # Make sure the overlay is off screen before anyone grabs the region
+        self._root.update_idletasks()
+        self.selections.put({**request, **outcome})
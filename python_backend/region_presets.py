@@ -0,0 +1,104 @@
+"""
+Named capture regions per application
+
+A preset remembers where a field of a connector screen sits - say the
+`Servername` box of the SSMS connect dialog - relative to the top-left corner
+of the application's window, so it still matches after the window moves.
+Presets saved without a window are anchored to the screen instead.
+
+Each application's presets live in one small JSON file under
+`<screenshots>/.presets/`, outside the application folders that cleanup
+commands empty, and are written atomically.
+"""
+
+import json
+import os
+import threading
+
+from catalog import clean_app_name
+
+ANCHORS = ('window', 'screen')
+
+
+def preset_file_name(application):
+    return clean_app_name(application) + '.json'
+
+
+class RegionPresetStore:
+    """Load and save named regions, one JSON file per application"""
+
+    def __init__(self, root):
+        self.root = str(root)
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def _path(self, application):
+        return os.path.join(self.root, preset_file_name(application))
+
+    def _load(self, application):
+        path = self._path(application)
+        presets = self._cache.get(path)
+        if presets is None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    presets = json.load(f).get('regions', {})
+            except FileNotFoundError:
+                presets = {}
+            self._cache[path] = presets
+        return presets
+
+    def _write(self, application, presets):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(application)
+        temp = f'{path}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({'application': application, 'regions': presets}, f, indent=2)
+        os.replace(temp, path)
+        self._cache[path] = presets
+
+    def get(self, application):
+        """name -> preset dict for the application"""
+        with self._lock:
+            return {name: dict(preset) for name, preset in self._load(application).items()}
+
+    def save(self, application, name, region, origin=None, **details):
+        """Store a screen-coordinate region, relative to origin (the window's top-left) when given"""
+        if not name:
+            raise ValueError('Region presets need a name')
+        width, height = int(region['width']), int(region['height'])
+        if width <= 0 or height <= 0:
+            raise ValueError(f'Region must have a positive size: {region}')
+        preset = {
+            'x': int(region['x']) - (origin['x'] if origin else 0),
+            'y': int(region['y']) - (origin['y'] if origin else 0),
+            'width': width,
+            'height': height,
+            'anchor': 'window' if origin else 'screen',
+            **{key: value for key, value in details.items() if value is not None}
+        }
+        with self._lock:
+            presets = dict(self._load(application))
+            presets[name] = preset
+            self._write(application, presets)
+        return preset
+
+    def delete(self, application, name):
+        """Remove a preset; returns True if it existed"""
+        with self._lock:
+            presets = dict(self._load(application))
+            if presets.pop(name, None) is None:
+                return False
+            self._write(application, presets)
+            return True
+
+    @staticmethod
+    def resolve(preset, origin=None):
+        """Screen-coordinate region of a preset, given the window's current top-left"""
+        if preset.get('anchor', 'window') == 'window':
+            if origin is None:
+                raise ValueError('Preset is relative to the application window, but no window was found')
+            dx, dy = origin['x'], origin['y']
+        else:
+            dx = dy = 0
+        return {'x': preset['x'] + dx, 'y': preset['y'] + dy,
+                'width': preset['width'], 'height': preset['height']}
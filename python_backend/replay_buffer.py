@@ -0,0 +1,181 @@
+"""
+Always-on replay buffer of the last few seconds of screen
+
+A background thread grabs the screen at a low rate and keeps a rolling,
+memory-bounded history, so "what just happened" can be written to disk after
+the fact without a recording having been started.
+
+Frames are stored as compressed tiles: every `keyframe_seconds` a full frame
+is zlib-compressed, and in between only the tiles that changed since the
+previous frame are. An idle screen therefore costs a few bytes per frame. A
+keyframe and the deltas that follow it form a group; whole groups are dropped
+from the front once the history is older than `seconds` or larger than
+`max_bytes`, so the oldest retained frame can always be rebuilt.
+"""
+
+import collections
+import threading
+import time
+import zlib
+
+from frame_diff import frame_to_array
+from frame_scheduler import FrameScheduler
+from lazy_modules import lazy_import
+from metrics import LatencyCounter
+
+np = lazy_import('numpy')
+
+
+class ReplayEntry:
+    """One buffered frame: a compressed keyframe or the compressed tiles that changed"""
+
+    __slots__ = ('monotonic', 'wall_time', 'shape', 'keyframe', 'payload', 'size')
+
+    def __init__(self, monotonic, wall_time, shape, keyframe, payload):
+        self.monotonic = monotonic
+        self.wall_time = wall_time
+        self.shape = shape
+        self.keyframe = keyframe
+        # Keyframe: compressed bytes; delta: [(y, x, height, width, compressed bytes)]
+        self.payload = payload
+        self.size = len(payload) if keyframe else sum(len(patch[4]) for patch in payload)
+
+
+class ReplayBuffer:
+    """Rolling, compressed screen history filled by a background grab thread"""
+
+    def __init__(self, grab, fps=1.0, seconds=60, max_bytes=64 * 1024 * 1024, tile=64,
+                 keyframe_seconds=10, compression=1):
+        self.grab = grab  # Callable returning an mss ScreenShot or BGRA array
+        self.fps = float(fps)
+        self.seconds = float(seconds)
+        self.max_bytes = int(max_bytes)
+        self.tile = int(tile)
+        self.keyframe_seconds = float(keyframe_seconds)
+        self.compression = int(compression)
+        self.add_time = LatencyCounter()
+        self.frames_added = 0
+        self.error = None
+        self._lock = threading.Lock()
+        self._groups = collections.deque()
+        self._bytes = 0
+        self._previous = None
+        self._keyframe_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._scheduler = None
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self):
+        if self.running:
+            return
+        self._stop = threading.Event()
+        self._scheduler = FrameScheduler(self.fps, self._stop)
+        self._thread = threading.Thread(target=self._run, name='replay-buffer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _run(self):
+        while self._scheduler.wait_next():
+            try:
+                self.add(self.grab())
+                self.error = None
+            except Exception as e:
+                # Keep trying: the display may come back (session unlock, monitor replug)
+                if self.error is None:
+                    print(f"Replay buffer grab failed: {e}")
+                self.error = str(e)
+
+    def add(self, frame, timestamp=None):
+        """Append a frame, storing only the tiles that changed since the previous one"""
+        started = time.perf_counter()
+        array = frame_to_array(frame)
+        now = time.monotonic()
+        wall_time = timestamp or time.time()
+        height, width = array.shape[:2]
+        previous = self._previous
+
+        if (previous is None or previous.shape != array.shape
+                or now - self._keyframe_at >= self.keyframe_seconds
+                or self._bytes > self.max_bytes):
+            payload = zlib.compress(np.ascontiguousarray(array).tobytes(), self.compression)
+            entry = ReplayEntry(now, wall_time, array.shape, True, payload)
+            self._previous = array.copy()
+            self._keyframe_at = now
+        else:
+            tile = self.tile
+            changed = np.any(array[..., :3] != previous[..., :3], axis=2)
+            # OR-reduce the per-pixel mask into one flag per tile (edge tiles may be smaller)
+            tiles = np.logical_or.reduceat(np.logical_or.reduceat(changed, np.arange(0, height, tile), axis=0),
+                                           np.arange(0, width, tile), axis=1)
+            patches = []
+            for row, column in zip(*np.nonzero(tiles)):
+                y, x = int(row) * tile, int(column) * tile
+                block = array[y:y + tile, x:x + tile]
+                patches.append((y, x, block.shape[0], block.shape[1],
+                                zlib.compress(np.ascontiguousarray(block).tobytes(), self.compression)))
+                previous[y:y + tile, x:x + tile] = block
+            entry = ReplayEntry(now, wall_time, array.shape, False, patches)
+
+        with self._lock:
+            if entry.keyframe or not self._groups:
+                self._groups.append([entry])
+            else:
+                self._groups[-1].append(entry)
+            self._bytes += entry.size
+            # Drop whole groups so every retained delta still has its keyframe
+            while len(self._groups) > 1 and (self._bytes > self.max_bytes
+                                             or self._groups[1][0].monotonic <= now - self.seconds):
+                group = self._groups.popleft()
+                self._bytes -= sum(e.size for e in group)
+            self.frames_added += 1
+        self.add_time.record(time.perf_counter() - started)
+        return entry
+
+    def frames(self, seconds=None):
+        """Yield (wall_time, BGRA array) for the last `seconds`, oldest first
+
+        The array is reused for the next frame; encode or copy it before advancing.
+        """
+        with self._lock:
+            groups = [list(group) for group in self._groups]
+        cutoff = time.monotonic() - (self.seconds if seconds is None else float(seconds))
+        for group in groups:
+            if group[-1].monotonic < cutoff:
+                continue
+            canvas = None
+            for entry in group:
+                if entry.keyframe:
+                    canvas = np.frombuffer(zlib.decompress(entry.payload), dtype=np.uint8).reshape(entry.shape).copy()
+                else:
+                    for y, x, height, width, data in entry.payload:
+                        canvas[y:y + height, x:x + width] = np.frombuffer(zlib.decompress(data),
+                                                                          dtype=np.uint8).reshape(height, width, 4)
+                if entry.monotonic >= cutoff:
+                    yield entry.wall_time, canvas
+
+    def get_stats(self):
+        with self._lock:
+            entries = [entry for group in self._groups for entry in group]
+            stored = self._bytes
+        return {
+            'running': self.running,
+            'error': self.error,
+            'fps': self.fps,
+            'seconds': self.seconds,
+            'max_bytes': self.max_bytes,
+            'stored_bytes': stored,
+            'frames': len(entries),
+            'keyframes': sum(1 for entry in entries if entry.keyframe),
+            'covered_seconds': round(entries[-1].monotonic - entries[0].monotonic, 3) if entries else 0,
+            'frames_added': self.frames_added,
+            'add_time': self.add_time.snapshot(),
+            'scheduler': self._scheduler.get_stats() if self._scheduler else None
+        }
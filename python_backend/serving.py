@@ -0,0 +1,78 @@
+"""
+Threaded WSGI serving for the backend
+
+Flask's development server starts a new thread for every connection and
+closes the connection after each response. The production mode serves the
+app with waitress instead: a fixed pool of worker threads, HTTP/1.1
+keep-alive so the Electron main process can reuse one connection for many
+commands, and an idle timeout so open connections do not pile up.
+
+When waitress is not installed, PooledWSGIServer gives the same bounded
+worker pool on top of werkzeug (which closes the connection after every
+response). Its pool threads are daemons, so a held-open event stream does
+not block shutdown.
+"""
+
+import queue
+import threading
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """werkzeug WSGI server that processes connections on a bounded thread pool"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, workers=16, **kwargs):
+        # HTTP/1.1 gives chunked responses for the event stream
+        handler = type('RequestHandler', (WSGIRequestHandler,), {'protocol_version': 'HTTP/1.1'})
+        super().__init__(host, port, app, handler=handler, **kwargs)
+        self.workers = int(workers)
+        self._connections = queue.Queue()
+        for index in range(self.workers):
+            threading.Thread(target=self._worker, name=f'http-{index}', daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self._connections.put((request, client_address))
+
+    def _worker(self):
+        while True:
+            request, client_address = self._connections.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+
+def serve(app, host='127.0.0.1', port=5000, workers=16, keep_alive_timeout=15, on_ready=None):
+    """Serve a WSGI app until interrupted; on_ready(host, port) runs once the socket is listening"""
+    if waitress is not None:
+        server = waitress.create_server(app, host=host, port=port, threads=workers,
+                                        channel_timeout=keep_alive_timeout, ident='connector-recording')
+        print(f"Serving on http://{host}:{server.effective_port} with waitress, {workers} worker threads "
+              f"(keep-alive timeout {keep_alive_timeout}s)")
+        if on_ready:
+            on_ready(host, int(server.effective_port))
+        try:
+            server.run()
+        finally:
+            server.close()
+        return
+
+    server = PooledWSGIServer(host, port, app, workers=workers)
+    print(f"Serving on http://{host}:{server.port} with {workers} worker threads "
+          f"(install waitress for keep-alive connections)")
+    if on_ready:
+        on_ready(host, server.port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
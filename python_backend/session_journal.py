@@ -0,0 +1,234 @@
+"""
+Append-only session journals
+
+Every change to an application's session - a screenshot captured, its name
+or description edited, a screenshot removed - is appended as one JSON line
+to `<app folder>/<app>.journal.jsonl` instead of rewriting the whole
+`<app>.json`. Saving a session therefore costs in proportion to what changed,
+not to how many screenshots it holds.
+
+The journal is compacted into the usual `<app>.json` layout (written to a
+temporary file and swapped in with os.replace) every `compact_every` records,
+from a background pass every `compact_interval` seconds, and whenever the
+JSON is about to be read. Records are keyed by image path and replaying them
+is idempotent, so a crash between writing the JSON and truncating the journal
+loses nothing; a torn last line from a crash mid-append is skipped.
+
+Record types: `session` (application name/path/timestamp), `capture` (add or
+replace an entry), `edit` (update fields of an entry) and `remove`.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+JOURNAL_SUFFIX = '.journal.jsonl'
+
+
+class SessionJournal:
+    """One application folder's session: the compacted JSON plus pending journal records"""
+
+    def __init__(self, folder, application_name=None, compact_every=64):
+        self.folder = Path(folder)
+        self.json_file = self.folder / f'{self.folder.name}.json'
+        self.journal_file = self.folder / f'{self.folder.name}{JOURNAL_SUFFIX}'
+        self.application_name = application_name or self.folder.name
+        self.compact_every = int(compact_every)
+        self.pending = 0
+        self.compactions = 0
+        self._lock = threading.RLock()
+        self._meta = None
+        self._entries = None
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        meta = {
+            'application_name': self.application_name,
+            'application_path': '',
+            'session_timestamp': datetime.now().isoformat()
+        }
+        entries = {}
+        try:
+            with open(self.json_file, 'r', encoding='utf-8') as f:
+                base = json.load(f)
+            meta.update({key: value for key, value in base.items() if key != 'screenshots'})
+            for entry in base.get('screenshots', []):
+                entries[entry.get('image_path')] = entry
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        self._meta, self._entries = meta, entries
+
+        pending = 0
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn write from a crash
+                    self._apply(record)
+                    pending += 1
+        except FileNotFoundError:
+            pass
+        self.pending = pending
+
+    def _apply(self, record):
+        op = record.get('op')
+        if op == 'session':
+            self._meta.update(record.get('fields', {}))
+        elif op == 'capture':
+            entry = record['entry']
+            self._entries.pop(entry['image_path'], None)
+            self._entries[entry['image_path']] = entry
+        elif op == 'edit':
+            entry = self._entries.get(record['image_path'])
+            if entry is not None:
+                entry.update(record.get('fields', {}))
+        elif op == 'remove':
+            self._entries.pop(record['image_path'], None)
+
+    def append(self, *records):
+        """Write records to the journal and apply them; compacts once enough have piled up"""
+        if not records:
+            return
+        with self._lock:
+            self._load()
+            self.folder.mkdir(parents=True, exist_ok=True)
+            lines = ''.join(json.dumps(record) + '\n' for record in records)
+            with open(self.journal_file, 'a+b') as f:
+                # A torn last line (crash mid-append) has no newline; start on a fresh line
+                # so the first new record is not glued onto it and lost on replay
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        lines = '\n' + lines
+                f.write(lines.encode('utf-8'))
+            for record in records:
+                self._apply(record)
+            self.pending += len(records)
+            if self.pending >= self.compact_every:
+                self.compact()
+
+    def compact(self, force=False):
+        """Fold the journal into the JSON file; returns True if anything was written"""
+        with self._lock:
+            self._load()
+            if not self.pending and not force:
+                return False
+            self.folder.mkdir(parents=True, exist_ok=True)
+            temp = self.json_file.with_name(self.json_file.name + '.tmp')
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(temp, self.json_file)
+            # Only now is it safe to drop the records the JSON already contains
+            open(self.journal_file, 'w').close()
+            self.pending = 0
+            self.compactions += 1
+            return True
+
+    def snapshot(self):
+        """The session in the {app}.json layout"""
+        with self._lock:
+            self._load()
+            return {**self._meta, 'screenshots': [dict(entry) for entry in self._entries.values()]}
+
+    def entries(self):
+        with self._lock:
+            self._load()
+            return [dict(entry) for entry in self._entries.values()]
+
+    def entry(self, image_path):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(image_path)
+            return dict(entry) if entry is not None else None
+
+    def discard(self):
+        """Delete the journal and forget the state (the JSON file itself is left alone)"""
+        with self._lock:
+            try:
+                os.remove(self.journal_file)
+            except FileNotFoundError:
+                pass
+            self._meta = self._entries = None
+            self.pending = 0
+
+
+class SessionJournals:
+    """Journals of every application folder, with periodic background compaction"""
+
+    def __init__(self, compact_every=64, compact_interval=30.0):
+        self.compact_every = int(compact_every)
+        self.compact_interval = float(compact_interval)
+        self._lock = threading.Lock()
+        self._journals = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def get(self, folder, application_name=None):
+        key = os.path.abspath(str(folder))
+        with self._lock:
+            journal = self._journals.get(key)
+            if journal is None:
+                journal = self._journals[key] = SessionJournal(folder, application_name, self.compact_every)
+            elif application_name:
+                journal.application_name = application_name
+            return journal
+
+    def for_json_file(self, json_file):
+        """The journal behind an {app}.json path, or None if the file is not a session JSON"""
+        path = Path(json_file)
+        if path.suffix != '.json' or path.stem != path.parent.name:
+            return None
+        key = os.path.abspath(str(path.parent))
+        with self._lock:
+            journal = self._journals.get(key)
+        if journal is None and (path.parent / f'{path.stem}{JOURNAL_SUFFIX}').exists():
+            journal = self.get(path.parent)
+        return journal
+
+    def forget(self, folder):
+        """Discard a folder's journal (its JSON is being removed or rebuilt)"""
+        key = os.path.abspath(str(folder))
+        with self._lock:
+            journal = self._journals.pop(key, None)
+        journal = journal or SessionJournal(folder)
+        journal.discard()
+
+    def clear(self):
+        """Forget every journal's state (their folders were deleted)"""
+        with self._lock:
+            self._journals.clear()
+
+    def compact_all(self):
+        with self._lock:
+            journals = list(self._journals.values())
+        compacted = 0
+        for journal in journals:
+            try:
+                compacted += journal.compact()
+            except Exception as e:
+                print(f"Error compacting session journal {journal.journal_file}: {e}")
+        return compacted
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='session-journals', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.compact_interval):
+            self.compact_all()
+
+    def get_stats(self):
+        with self._lock:
+            journals = list(self._journals.values())
+        return {
+            'journals': len(journals),
+            'pending_records': sum(journal.pending for journal in journals),
+            'compactions': sum(journal.compactions for journal in journals)
+        }
@@ -0,0 +1,39 @@
+import json
+
+from session_journal import SessionJournal
+
+
+def capture(name, folder):
+    return {'op': 'capture', 'entry': {'image_name': name, 'image_path': str(folder / f'{name}.png')}}
+
+
+def test_append_after_torn_line_keeps_the_new_record(tmp_path):
+    folder = tmp_path / 'SSMS'
+    journal = SessionJournal(folder)
+    journal.append(capture('Servername', folder))
+
+    # A crash mid-append leaves half a record without its newline
+    with open(journal.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"op": "capture", "entry": {"image_na')
+
+    reopened = SessionJournal(folder)
+    reopened.append(capture('UserName', folder))
+
+    replayed = SessionJournal(folder)
+    assert [entry['image_name'] for entry in replayed.entries()] == ['Servername', 'UserName']
+    lines = journal.journal_file.read_text(encoding='utf-8').splitlines()
+    assert json.loads(lines[-1])['entry']['image_name'] == 'UserName'
+
+
+def test_compact_folds_the_journal_into_the_session_json(tmp_path):
+    folder = tmp_path / 'SSMS'
+    journal = SessionJournal(folder, 'SSMS.exe')
+    journal.append(capture('Servername', folder), capture('Password', folder))
+    journal.append({'op': 'edit', 'image_path': str(folder / 'Servername.png'), 'fields': {'description': 'host'}},
+                   {'op': 'remove', 'image_path': str(folder / 'Password.png')})
+
+    assert journal.compact()
+    assert journal.journal_file.read_text() == ''
+    session = json.loads(journal.json_file.read_text(encoding='utf-8'))
+    assert session['application_name'] == 'SSMS.exe'
+    assert [(s['image_name'], s.get('description')) for s in session['screenshots']] == [('Servername', 'host')]
@@ -0,0 +1,66 @@
+from window_index import FakeWindowPlatform, WindowIndex
+
+WINDOWS = [
+    {'hwnd': 1, 'title': 'Untitled - Notepad', 'class_name': 'Notepad', 'pid': None, 'process_name': 'notepad.exe'},
+    {'hwnd': 2, 'title': 'Connect to Server', 'class_name': 'WindowsForms10', 'pid': None, 'process_name': 'Ssms.exe'},
+    {'hwnd': 3, 'title': 'Microsoft SQL Server Management Studio', 'class_name': 'HwndWrapper',
+     'pid': None, 'process_name': 'Ssms.exe'},
+    {'hwnd': 4, 'title': 'Inbox - Outlook', 'class_name': 'rctrl_renwnd32', 'pid': None, 'process_name': 'OUTLOOK.EXE'},
+]
+
+
+def make_index(windows=WINDOWS, ttl=60.0):
+    platform = FakeWindowPlatform(windows)
+    return platform, WindowIndex(platform, ttl=ttl)
+
+
+def test_find_matches_executable_paths_on_the_process_name():
+    _, index = make_index()
+    candidates = index.find([r'C:\Program Files\SSMS\Ssms.exe'])
+    assert [c['hwnd'] for c in candidates[:2]] == [3, 2]
+    assert candidates[0]['matched_on'] == 'process_name'
+    assert candidates[0]['score'] == 1.0
+
+
+def test_find_ties_go_to_the_longer_title():
+    _, index = make_index()
+    best = index.find(['ssms'], limit=1)[0]
+    assert best['hwnd'] == 3
+
+
+def test_find_scores_title_words_and_drops_weak_matches():
+    _, index = make_index()
+    candidates = index.find(['notepad'])
+    assert [c['hwnd'] for c in candidates] == [1]
+    assert index.find(['photoshop']) == []
+    assert index.find([]) == []
+
+
+def test_window_list_is_cached_for_the_ttl():
+    platform, index = make_index()
+    index.find(['notepad'])
+    index.find(['outlook'])
+    assert platform.enumerations == 1
+    index.find(['outlook'], refresh=True)
+    assert platform.enumerations == 2
+    index.invalidate()
+    index.windows()
+    assert platform.enumerations == 3
+
+
+def test_focus_best_focuses_only_the_best_window_once():
+    platform, index = make_index()
+    focused, window, candidates = index.focus_best(['Ssms.exe'])
+    assert focused and window['hwnd'] == 3
+    assert platform.focused == [3]
+    assert len(candidates) == 2
+
+
+def test_focus_best_re_enumerates_when_the_cached_list_misses():
+    platform, index = make_index(windows=[])
+    assert index.focus_best(['notepad']) == (False, None, [])
+    platform.windows = list(WINDOWS)
+    index.windows()  # Cached, still empty
+    focused, window, _ = index.focus_best(['notepad'])
+    assert focused and window['hwnd'] == 1
+    assert platform.focused == [1]
@@ -0,0 +1,167 @@
+"""
+Thumbnail generation with an on-disk LRU cache
+
+Previews are produced with cv2.resize(INTER_AREA) on a small worker pool as soon
+as a capture is saved, and stored as JPEG files named after a hash of the source
+path, mtime and size, so a changed or replaced image never serves a stale
+preview. The cache is kept under a byte budget by evicting the least recently
+used previews; recency survives restarts through the files' mtimes.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from lazy_modules import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+class ThumbnailService:
+    """Create, cache and evict downscaled previews of screenshots"""
+
+    def __init__(self, cache_dir, max_bytes=64 * 1024 * 1024, max_size=320, quality=80, workers=2):
+        self.cache_dir = os.path.abspath(str(cache_dir))
+        self.max_bytes = int(max_bytes)
+        self.max_size = int(max_size)
+        self.quality = int(quality)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail')
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # cache filename -> size in bytes, oldest first
+        self._pending = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self):
+        """Rebuild the LRU order from the cache folder"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.jpg'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            for _, name, size in entries:
+                self._entries[name] = size
+                self.total_bytes += size
+
+    def cache_name(self, path, max_size=None):
+        """Cache filename for an image, keyed by path, mtime, size and preview size"""
+        stat = os.stat(path)
+        key = f'{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{max_size or self.max_size}'
+        return hashlib.sha1(key.encode('utf-8')).hexdigest() + '.jpg'
+
+    def submit(self, path, max_size=None):
+        """Generate a preview in the background; returns a Future resolving to its path"""
+        name = self.cache_name(path, max_size)
+        with self._lock:
+            future = self._pending.get(name)
+            if future is None:
+                future = self._executor.submit(self._generate, str(path), name, max_size or self.max_size)
+                self._pending[name] = future
+        return future
+
+    def get(self, path, max_size=None, timeout=30):
+        """Path of the cached preview, generating it first if needed"""
+        name = self.cache_name(path, max_size)
+        cached = os.path.join(self.cache_dir, name)
+        with self._lock:
+            if name in self._entries and os.path.exists(cached):
+                self._entries.move_to_end(name)
+                self.hits += 1
+                touch = True
+            else:
+                self.misses += 1
+                touch = False
+        if touch:
+            try:
+                os.utime(cached, None)
+            except OSError:
+                pass
+            return cached
+        return self.submit(path, max_size).result(timeout)
+
+    def clear(self):
+        """Remove every cached preview"""
+        with self._lock:
+            names = list(self._entries)
+            self._entries.clear()
+            self.total_bytes = 0
+        for name in names:
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'pending': len(self._pending)
+            }
+
+    def _generate(self, path, name, max_size):
+        try:
+            cached = os.path.join(self.cache_dir, name)
+            if not os.path.exists(cached):
+                # np.fromfile + imdecode also copes with non-ASCII Windows paths
+                image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError(f'Could not decode image: {path}')
+
+                height, width = image.shape[:2]
+                scale = min(max_size / float(max(width, height)), 1.0)
+                if scale < 1.0:
+                    size = (max(int(width * scale), 1), max(int(height * scale), 1))
+                    image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+                ok, data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ok:
+                    raise RuntimeError(f'Could not encode thumbnail for {path}')
+
+                # Write then rename so readers never see a partial file
+                temp = f'{cached}.{threading.get_ident()}.tmp'
+                with open(temp, 'wb') as f:
+                    f.write(data.tobytes())
+                os.replace(temp, cached)
+
+            size = os.path.getsize(cached)
+            with self._lock:
+                if name not in self._entries:
+                    self.total_bytes += size
+                self._entries[name] = size
+                self._entries.move_to_end(name)
+            self._evict()
+            return cached
+        finally:
+            with self._lock:
+                self._pending.pop(name, None)
+
+    def _evict(self):
+        """Drop least recently used previews until the cache fits its budget"""
+        victims = []
+        with self._lock:
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                name, size = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                self.evictions += 1
+                victims.append(name)
+        for name in victims:
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
@@ -0,0 +1,114 @@
+"""
+Rolling video-segment output for recordings
+
+Frames are appended to cv2.VideoWriter segments that roll over after a fixed
+duration (or when the frame size changes). Every segment keeps a timestamp per
+frame so a frame in a segment can be mapped back to wall-clock time even when
+change detection skipped frames in between.
+"""
+
+import json
+import os
+from datetime import datetime
+
+from lazy_modules import lazy_import
+
+cv2 = lazy_import('cv2')
+
+# Container extension used for the common FourCC codes
+CODEC_EXTENSIONS = {
+    'mp4v': '.mp4',
+    'avc1': '.mp4',
+    'H264': '.mp4',
+    'XVID': '.avi',
+    'MJPG': '.avi',
+    'VP80': '.webm',
+    'VP90': '.webm'
+}
+
+
+class VideoSegmentWriter:
+    """Write frames into rolling video segments with a per-segment timestamp index"""
+
+    def __init__(self, output_dir, base_name, fps, codec='mp4v', segment_seconds=60):
+        if len(codec) != 4:
+            raise ValueError(f'Codec must be a FourCC code, got: {codec}')
+        self.output_dir = output_dir
+        self.base_name = base_name
+        self.fps = float(fps)
+        self.codec = codec
+        self.extension = CODEC_EXTENSIONS.get(codec, '.avi')
+        self.segment_frames = max(int(round(self.fps * segment_seconds)), 1)
+        self.index_file = os.path.join(output_dir, f'{base_name}_index.json')
+        self.segments = []
+        self._writer = None
+        self._segment = None
+        self._size = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, frame, timestamp=None):
+        """Append a BGR or BGRA frame; returns (segment_number, frame_index)"""
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+        size = (frame.shape[1], frame.shape[0])
+        if (self._writer is None or size != self._size
+                or self._segment['frame_count'] >= self.segment_frames):
+            self._open_segment(size)
+
+        self._writer.write(frame)
+        segment = self._segment
+        segment['timestamps'].append(timestamp or datetime.now().isoformat())
+        segment['frame_count'] += 1
+        return segment['segment'], segment['frame_count'] - 1
+
+    def close(self):
+        """Finish the current segment and write the final index"""
+        self._close_segment()
+        return self.segments
+
+    def _open_segment(self, size):
+        self._close_segment()
+        number = len(self.segments) + 1
+        filename = f'{self.base_name}_seg{number:03d}{self.extension}'
+        path = os.path.join(self.output_dir, filename)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.codec), self.fps, size)
+        if not writer.isOpened():
+            raise RuntimeError(f'Could not open video writer for {filename} with codec {self.codec}')
+
+        self._writer = writer
+        self._size = size
+        self._segment = {
+            'segment': number,
+            'filename': filename,
+            'path': os.path.abspath(path),
+            'codec': self.codec,
+            'fps': self.fps,
+            'width': size[0],
+            'height': size[1],
+            'frame_count': 0,
+            'timestamps': []
+        }
+        self.segments.append(self._segment)
+
+    def _close_segment(self):
+        if self._writer is None:
+            return
+        self._writer.release()
+        self._writer = None
+
+        segment = self._segment
+        if segment['timestamps']:
+            segment['started_at'] = segment['timestamps'][0]
+            segment['ended_at'] = segment['timestamps'][-1]
+        segment['size_bytes'] = os.path.getsize(segment['path']) if os.path.exists(segment['path']) else 0
+        self._write_index()
+
+    def _write_index(self):
+        with open(self.index_file, 'w') as f:
+            json.dump({
+                'base_name': self.base_name,
+                'codec': self.codec,
+                'fps': self.fps,
+                'segments': self.segments
+            }, f, indent=2)
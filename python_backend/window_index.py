@@ -0,0 +1,293 @@
+"""
+Top-level window index with fuzzy matching
+
+One enumeration pass collects every visible titled window with its class
+and owning process, and the result is cached for a short TTL so the several
+lookups made while preparing a capture share it. Candidates are ranked by a
+fuzzy score over title, class and process name, and only the best match is
+focused - once.
+
+Enumeration, focusing and window rectangles sit behind WindowPlatform: Win32WindowPlatform on
+Windows, UnsupportedWindowPlatform elsewhere, and FakeWindowPlatform holding
+a scripted window list for exercising the matching logic headless on Linux.
+"""
+
+import re
+import threading
+import time
+from difflib import SequenceMatcher
+
+import psutil
+
+# Extra search terms for applications whose window titles differ from their executable
+APP_ALIASES = {
+    'ssms': ['Microsoft SQL Server Management Studio', 'SQL Server Management Studio'],
+    'chrome': ['Google Chrome'],
+    'firefox': ['Mozilla Firefox'],
+    'msedge': ['Microsoft Edge'],
+    'code': ['Visual Studio Code'],
+    'devenv': ['Microsoft Visual Studio'],
+}
+
+# How much a match on each field counts
+FIELD_WEIGHTS = {
+    'process_name': 1.0,
+    'title': 0.95,
+    'class_name': 0.6,
+}
+
+MIN_SCORE = 0.5
+
+
+def normalize(text, path=False):
+    """Lower-case a search term or field, dropping the .exe suffix (and directories for paths)"""
+    text = str(text).strip().strip('"')
+    if path:
+        # Split on both separators: Windows paths may be matched on other platforms too
+        text = re.split(r'[\\/]', text.rstrip('\\/'))[-1] or text
+    text = text.lower()
+    if text.endswith('.exe'):
+        text = text[:-4]
+    return text.strip()
+
+
+def tokens(text):
+    return set(t for t in re.split(r'[^a-z0-9]+', text) if t)
+
+
+def similarity(term, value):
+    """0..1 closeness of a normalized term to a normalized field value"""
+    if not term or not value:
+        return 0.0
+    if term == value:
+        return 1.0
+    value_tokens = tokens(value)
+    term_tokens = tokens(term)
+    if term_tokens and term_tokens <= value_tokens:
+        # Every word of the term appears in the value, e.g. "notepad" in "untitled - notepad"
+        return 0.9
+    if term in value:
+        return 0.8
+    overlap = len(term_tokens & value_tokens) / len(term_tokens) if term_tokens else 0.0
+    return max(0.7 * overlap, 0.7 * SequenceMatcher(None, term, value).ratio())
+
+
+def search_terms(keywords):
+    """Normalized terms for the keywords plus known aliases of any of them"""
+    terms = []
+    for keyword in keywords or []:
+        term = normalize(keyword, path=True)
+        if term and term not in terms:
+            terms.append(term)
+    for term in list(terms):
+        for key, aliases in APP_ALIASES.items():
+            if key in tokens(term) or term == key:
+                terms.extend(normalize(alias) for alias in aliases if normalize(alias) not in terms)
+    return terms
+
+
+class WindowPlatform:
+    """Enumerates and focuses top-level windows"""
+
+    lists_windows = True
+
+    def enumerate(self):
+        """Visible titled top-level windows as dicts with hwnd, title, class_name and pid"""
+        raise NotImplementedError
+
+    def focus(self, hwnd):
+        """Bring a window to the foreground; returns True on success"""
+        raise NotImplementedError
+
+    def rect(self, hwnd):
+        """Screen rectangle {'x', 'y', 'width', 'height'} of a window, 'minimized', or None if it is gone"""
+        raise NotImplementedError
+
+
+class UnsupportedWindowPlatform(WindowPlatform):
+    """Platforms where windows cannot be listed; nothing ever matches"""
+
+    lists_windows = False
+
+    def enumerate(self):
+        return []
+
+    def focus(self, hwnd):
+        return False
+
+    def rect(self, hwnd):
+        return None
+
+
+class FakeWindowPlatform(WindowPlatform):
+    """Scripted window list for headless testing"""
+
+    def __init__(self, windows=None):
+        self.windows = list(windows or [])
+        self.focused = []
+        self.enumerations = 0
+
+    def enumerate(self):
+        self.enumerations += 1
+        return [dict(window) for window in self.windows]
+
+    def focus(self, hwnd):
+        if any(window['hwnd'] == hwnd for window in self.windows):
+            self.focused.append(hwnd)
+            return True
+        return False
+
+    def rect(self, hwnd):
+        for window in self.windows:
+            if window['hwnd'] == hwnd:
+                if window.get('minimized'):
+                    return 'minimized'
+                return dict(window['rect']) if window.get('rect') else None
+        return None
+
+
+class Win32WindowPlatform(WindowPlatform):
+    """EnumWindows-based implementation (requires pywin32)"""
+
+    def __init__(self):
+        import win32api
+        import win32con
+        import win32gui
+        import win32process
+        self.win32api = win32api
+        self.win32con = win32con
+        self.win32gui = win32gui
+        self.win32process = win32process
+
+    def enumerate(self):
+        win32gui = self.win32gui
+        windows = []
+
+        def enum_windows_callback(hwnd, windows):
+            if win32gui.IsWindowVisible(hwnd):
+                title = win32gui.GetWindowText(hwnd)
+                if title:
+                    _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+                    windows.append({
+                        'hwnd': hwnd,
+                        'title': title,
+                        'class_name': win32gui.GetClassName(hwnd),
+                        'pid': pid
+                    })
+            return True  # Continue enumeration
+
+        win32gui.EnumWindows(enum_windows_callback, windows)
+        return windows
+
+    def focus(self, hwnd):
+        win32gui, win32con = self.win32gui, self.win32con
+        try:
+            # Restore only when minimized, so a maximized window keeps its size
+            if win32gui.IsIconic(hwnd):
+                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+            win32gui.SetForegroundWindow(hwnd)
+            win32gui.BringWindowToTop(hwnd)
+            self.win32api.SendMessage(hwnd, win32con.WM_ACTIVATE, win32con.WA_ACTIVE, 0)
+            # Toggle topmost to lift the window above other always-on-top windows
+            flags = win32con.SWP_NOMOVE | win32con.SWP_NOSIZE
+            win32gui.SetWindowPos(hwnd, win32con.HWND_TOPMOST, 0, 0, 0, 0, flags)
+            win32gui.SetWindowPos(hwnd, win32con.HWND_NOTOPMOST, 0, 0, 0, 0, flags)
+            return True
+        except Exception as e:
+            print(f"Focus error: {e}")
+            return False
+
+    def rect(self, hwnd):
+        win32gui = self.win32gui
+        try:
+            if not win32gui.IsWindow(hwnd):
+                return None
+            if win32gui.IsIconic(hwnd):
+                return 'minimized'
+            left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+        except Exception:
+            return None
+        return {'x': left, 'y': top, 'width': right - left, 'height': bottom - top}
+
+
+def default_platform():
+    try:
+        return Win32WindowPlatform()
+    except ImportError:
+        return UnsupportedWindowPlatform()
+
+
+class WindowIndex:
+    """TTL-cached window list with scored lookups"""
+
+    def __init__(self, platform=None, ttl=1.0):
+        self.platform = platform or default_platform()
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._windows = []
+        self._refreshed_at = None
+        self._process_names = {}
+        self.enumerations = 0
+
+    def _process_name(self, pid):
+        name = self._process_names.get(pid)
+        if name is None:
+            try:
+                name = psutil.Process(pid).name()
+            except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError):
+                name = ''
+            self._process_names[pid] = name
+        return name
+
+    def windows(self, refresh=False):
+        """Current window list, re-enumerated when older than the TTL"""
+        with self._lock:
+            now = time.monotonic()
+            if refresh or self._refreshed_at is None or now - self._refreshed_at > self.ttl:
+                windows = self.platform.enumerate()
+                pids = set()
+                for window in windows:
+                    pid = window.get('pid')
+                    pids.add(pid)
+                    window.setdefault('process_name', self._process_name(pid) if pid else '')
+                # Forget names of processes that no longer own a window
+                self._process_names = {pid: name for pid, name in self._process_names.items() if pid in pids}
+                self._windows = windows
+                self._refreshed_at = now
+                self.enumerations += 1
+            return list(self._windows)
+
+    def invalidate(self):
+        with self._lock:
+            self._refreshed_at = None
+
+    def find(self, keywords, limit=5, min_score=MIN_SCORE, refresh=False):
+        """Windows matching any keyword, best first, each with its score and matched field"""
+        terms = search_terms(keywords)
+        if not terms:
+            return []
+        ranked = []
+        for window in self.windows(refresh):
+            best, field = 0.0, None
+            for name, weight in FIELD_WEIGHTS.items():
+                value = normalize(window.get(name) or '')
+                for term in terms:
+                    score = weight * similarity(term, value)
+                    if score > best:
+                        best, field = score, name
+            if best >= min_score:
+                ranked.append({**window, 'score': round(best, 3), 'matched_on': field})
+        # Ties go to the longer title: main windows usually carry more text than tool windows
+        ranked.sort(key=lambda w: (-w['score'], -len(w['title'])))
+        return ranked[:limit] if limit else ranked
+
+    def focus_best(self, keywords, min_score=MIN_SCORE):
+        """Focus the best-ranked window once; returns (focused, window or None, candidates)"""
+        candidates = self.find(keywords, min_score=min_score)
+        if not candidates:
+            # The window may have appeared since the cached pass
+            candidates = self.find(keywords, min_score=min_score, refresh=True)
+        if not candidates:
+            return False, None, []
+        best = candidates[0]
+        return self.platform.focus(best['hwnd']), best, candidates
@@ -0,0 +1,103 @@
+"""
+Follows a target application window between recording frames
+
+The window is looked up once through the shared window index. After that each
+frame only asks the platform for that one window's rectangle (a single
+GetWindowRect call on Windows) instead of enumerating every window again, so
+moves and resizes are picked up on the very next frame at almost no cost. The
+index is searched again only when the window disappears, and at most once per
+`relocate_interval`. Rectangles are clipped to the virtual desktop so a window
+hanging off screen never asks mss for pixels that do not exist.
+"""
+
+import time
+
+from metrics import LatencyCounter
+
+# Window states reported by WindowTracker.update()
+VISIBLE = 'visible'
+MINIMIZED = 'minimized'
+OFFSCREEN = 'offscreen'
+MISSING = 'missing'
+
+
+def clip_rect(rect, bounds):
+    """Intersection of an {'x', 'y', 'width', 'height'} rect with an mss monitor dict, or None"""
+    left = max(rect['x'], bounds['left'])
+    top = max(rect['y'], bounds['top'])
+    right = min(rect['x'] + rect['width'], bounds['left'] + bounds['width'])
+    bottom = min(rect['y'] + rect['height'], bounds['top'] + bounds['height'])
+    if right <= left or bottom <= top:
+        return None
+    return {'x': left, 'y': top, 'width': right - left, 'height': bottom - top}
+
+
+class WindowTracker:
+    """Current screen rectangle of one application's window"""
+
+    def __init__(self, window_index, keywords, bounds, relocate_interval=1.0):
+        self.window_index = window_index
+        self.keywords = [keywords] if isinstance(keywords, str) else list(keywords)
+        self.bounds = bounds  # Virtual desktop (mss monitor 0)
+        self.relocate_interval = float(relocate_interval)
+        self.window = None
+        self.rect = None
+        self.state = None
+        self.moves = 0
+        self.relocations = 0
+        self.hidden_frames = 0
+        self.update_time = LatencyCounter()
+        self._next_relocate = 0.0
+
+    def locate(self, refresh=True):
+        """Find the best-matching window for the keywords; returns it or None"""
+        candidates = self.window_index.find(self.keywords, limit=1, refresh=refresh)
+        window = candidates[0] if candidates else None
+        if window and self.window and window['hwnd'] != self.window['hwnd']:
+            self.relocations += 1
+        if window:
+            self.window = window
+        self._next_relocate = time.monotonic() + self.relocate_interval
+        return window
+
+    def update(self):
+        """Clipped rectangle to grab for the next frame, or None when there is nothing to grab"""
+        started = time.perf_counter()
+        try:
+            rect = self.window_index.platform.rect(self.window['hwnd']) if self.window else None
+            if rect is None and time.monotonic() >= self._next_relocate:
+                # The window was closed or re-created (some apps swap their main window)
+                if self.locate():
+                    rect = self.window_index.platform.rect(self.window['hwnd'])
+
+            if rect is None:
+                self.state, clipped = MISSING, None
+            elif rect == MINIMIZED:
+                self.state, clipped = MINIMIZED, None
+            else:
+                clipped = clip_rect(rect, self.bounds)
+                self.state = VISIBLE if clipped else OFFSCREEN
+
+            if clipped is None:
+                self.hidden_frames += 1
+            elif clipped != self.rect:
+                if self.rect is not None:
+                    self.moves += 1
+                self.rect = clipped
+            return clipped
+        finally:
+            self.update_time.record(time.perf_counter() - started)
+
+    def get_stats(self):
+        window = self.window or {}
+        return {
+            'title': window.get('title'),
+            'hwnd': window.get('hwnd'),
+            'pid': window.get('pid'),
+            'state': self.state,
+            'rect': self.rect,
+            'moves': self.moves,
+            'relocations': self.relocations,
+            'hidden_frames': self.hidden_frames,
+            'update_time': self.update_time.snapshot()
+        }
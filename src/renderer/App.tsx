@@ -103,16 +103,16 @@ const App: React.FC = () => {
         if (visualResponse.success) {
           setStatus('Visual region selection active. Click and drag on the target application to select a region...');
           
-          // Poll for the capture result
-          let pollCount = 0;
-          const maxPolls = 60; // 30 seconds max (60 * 500ms)
+          // Wait for the capture result pushed by the backend (long-poll on the event stream)
+          let lastSeq: number = visualResponse.event_seq ?? 0;
+          const requestId: string | undefined = visualResponse.request_id;
+          const deadline = Date.now() + 30000; // 30 seconds max
           
-          const pollForResult = async () => {
+          const waitForResult = async () => {
             try {
-              pollCount++;
-              
-              if (pollCount > maxPolls) {
-                console.log('Polling timeout reached, restoring window');
+              const remaining = deadline - Date.now();
+              if (remaining <= 0) {
+                console.log('Capture wait timeout reached, restoring window');
                 setStatus('Timeout: No capture detected. Restoring window...');
                 await window.electronAPI.restoreWindow();
                 setIsWindowMinimized(false);
@@ -120,20 +120,41 @@ const App: React.FC = () => {
                 return;
               }
               
-              const resultResponse = await window.electronAPI.sendPythonCommand({
-                type: 'get_last_capture_result',
-                data: {}
+              const eventsResponse = await window.electronAPI.sendPythonCommand({
+                type: 'wait_for_events',
+                data: {
+                  since: lastSeq,
+                  timeout: Math.min(remaining / 1000, 25),
+                  types: ['capture_complete', 'capture_cancelled', 'error']
+                }
               });
               
-              if (resultResponse.success && resultResponse.filepath) {
-                console.log('Capture result received:', resultResponse);
-                console.log('Setting current screenshot to:', resultResponse.filepath);
-                setCurrentScreenshot(resultResponse.filepath);
+              if (!eventsResponse.success) {
+                throw new Error(eventsResponse.error || 'Failed to wait for capture events');
+              }
+              lastSeq = eventsResponse.sequence;
+              if (eventsResponse.busy && eventsResponse.events.length === 0) {
+                // The backend had no waiting slot free; ask again shortly
+                setTimeout(waitForResult, 1000);
+                return;
+              }
+              
+              // Only events of this selection - a recording error is not a failed capture
+              const event = eventsResponse.events.find((e: any) =>
+                e.data?.source === 'visual_region_selection' &&
+                (!requestId || e.data.request_id === requestId)
+              );
+              
+              if (event && event.type === 'capture_complete') {
+                const result = event.data;
+                console.log('Capture result received:', result);
+                console.log('Setting current screenshot to:', result.filepath);
+                setCurrentScreenshot(result.filepath);
                 setCurrentScreenshotSaved(false); // Not saved yet
                 setStatus('Region captured successfully! Restoring window...');
                 
                 // Test if the file exists
-                const fileExists = await checkImageExists(resultResponse.filepath);
+                const fileExists = await checkImageExists(result.filepath);
                 console.log('File exists check:', fileExists);
                 
                 // Restore the Electron window
@@ -143,20 +164,29 @@ const App: React.FC = () => {
                 // Show the save dialog (don't display image until saved)
                 setShowScreenshotDialog(true);
                 loadScreenshots();
+              } else if (event) {
+                // Cancelled or failed selection
+                console.log('Region selection ended without a capture:', event);
+                await window.electronAPI.restoreWindow();
+                setIsWindowMinimized(false);
+                if (event.type === 'error') {
+                  setError(event.data.error || 'Failed to capture region');
+                  setStatus('Region capture failed');
+                } else {
+                  setStatus('Region selection cancelled');
+                }
               } else {
-                // Continue polling
-                console.log(`No capture result yet, continuing to poll... (${pollCount}/${maxPolls})`);
-                setTimeout(pollForResult, 500);
+                // No event yet - wait again
+                waitForResult();
               }
             } catch (error) {
-              console.error('Error polling for capture result:', error);
-              // Continue polling even on error
-              setTimeout(pollForResult, 1000);
+              console.error('Error waiting for capture result:', error);
+              // Retry after a short pause
+              setTimeout(waitForResult, 1000);
             }
           };
           
-          // Start polling after a delay
-          setTimeout(pollForResult, 1000);
+          waitForResult();
         } else {
           setError(visualResponse.error || 'Failed to start visual region selection');
           setStatus('Failed to start visual region selection');
@@ -185,13 +215,34 @@ const App: React.FC = () => {
       data: { exe_path: appPath }
     });
     if (response.success) {
+      setStatus('Waiting for the application window...');
+      // Resolves as soon as the app shows a window (or exits / times out); each wait
+      // is capped by the backend, so keep asking until our own 60 second deadline
+      const launchDeadline = Date.now() + 60000;
+      let readiness = await window.electronAPI.sendPythonCommand({
+        type: 'wait_for_launch',
+        data: { job_id: response.job_id, timeout: 60 }
+      });
+      while (readiness.timed_out && Date.now() < launchDeadline) {
+        readiness = await window.electronAPI.sendPythonCommand({
+          type: 'wait_for_launch',
+          data: { job_id: response.job_id, timeout: (launchDeadline - Date.now()) / 1000 }
+        });
+      }
+      if (readiness.state === 'exited' || readiness.state === 'failed') {
+        setError(readiness.error || 'Application exited before showing a window');
+        setStatus('Failed to launch application');
+        return;
+      }
       setLaunchedApp({
         name: appPath.split('\\').pop() || 'Unknown',
-        pid: response.pid || 0,
-        windowTitle: appPath.split('\\').pop() || 'Unknown',
+        pid: readiness.window?.pid || response.pid || 0,
+        windowTitle: readiness.window?.title || appPath.split('\\').pop() || 'Unknown',
         path: appPath
       });
-      setStatus('Application launched successfully');
+      setStatus(readiness.ready
+        ? `Application ready after ${readiness.elapsed_seconds}s`
+        : 'Application launched (window not detected yet)');
       setError('');
     } else {
       setError(response.error || 'Failed to launch application');
@@ -369,18 +420,6 @@ const App: React.FC = () => {
     setStatus('Cleaning up duplicates and creating JSON file...');
 
     try {
-      // First, clean up any duplicate screenshots
-      const cleanupResponse = await window.electronAPI.sendPythonCommand({
-        type: 'cleanup_duplicate_screenshots',
-        data: {
-          application_name: launchedApp?.name || 'Unknown'
-        }
-      });
-
-      if (!cleanupResponse.success) {
-        console.warn('Warning: Could not cleanup duplicate screenshots:', cleanupResponse.error);
-      }
-
       // Prepare screenshots data for JSON creation
       const screenshotsForJson = sessionScreenshots.map(screenshot => ({
         name: screenshot.name || screenshot.id || 'unnamed',
@@ -389,16 +428,38 @@ const App: React.FC = () => {
         timestamp: screenshot.timestamp || new Date().toISOString()
       }));
 
-      // Create JSON file with screenshots
-      const response = await window.electronAPI.sendPythonCommand({
-        type: 'create_session_json',
+      // Clean up duplicates, then create the JSON file - both in one round-trip
+      const batchResponse = await window.electronAPI.sendPythonCommand({
+        type: 'batch',
         data: {
-          application_name: launchedApp?.name || 'Unknown',
-          application_path: launchedApp?.path || '',
-          screenshots: screenshotsForJson
+          mode: 'sequence',
+          commands: [
+            {
+              type: 'cleanup_duplicate_screenshots',
+              data: { application_name: launchedApp?.name || 'Unknown' }
+            },
+            {
+              type: 'create_session_json',
+              data: {
+                application_name: launchedApp?.name || 'Unknown',
+                application_path: launchedApp?.path || '',
+                screenshots: screenshotsForJson
+              }
+            }
+          ]
         }
       });
 
+      if (!batchResponse.results) {
+        throw new Error(batchResponse.error || 'Batch command failed');
+      }
+
+      const [cleanupResult, createResult] = batchResponse.results;
+      if (!cleanupResult.success) {
+        console.warn('Warning: Could not cleanup duplicate screenshots:', cleanupResult.result.error);
+      }
+
+      const response = createResult.result;
       if (response.success) {
         setStatus(`JSON created successfully! ${response.screenshots_count} screenshots organized.`);
         // Store the JSON file path for later viewing
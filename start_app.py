@@ -10,29 +10,47 @@ import time
 import os
 import signal
 import threading
-import requests
+import json
 from pathlib import Path
 
-def wait_for_backend(url="http://127.0.0.1:5000", max_attempts=30, delay=2):
-    """Wait for the Flask backend to be ready"""
-    print(f"Waiting for backend at {url}...")
+# Line the backend prints once it accepts requests (see signal_ready in desktop_app.py)
+READY_MARKER = "BACKEND_READY"
+
+def forward_output(stream, prefix, ready_event=None, ready_info=None):
+    """Echo a backend output stream line by line; keeps the pipe drained so the backend never blocks"""
+    for line in iter(stream.readline, ''):
+        line = line.rstrip()
+        if ready_event is not None and line.startswith(READY_MARKER) and not ready_event.is_set():
+            try:
+                ready_info.update(json.loads(line[len(READY_MARKER):]))
+            except ValueError:
+                pass
+            ready_event.set()
+        print(f"{prefix} {line}")
+    stream.close()
+
+def wait_for_backend(process, timeout=30):
+    """Wait for the backend's readiness line on stdout"""
+    print("Waiting for backend to report ready...")
+    started = time.time()
     
-    for attempt in range(max_attempts):
-        try:
-            response = requests.get(f"{url}/api/command", 
-                                 json={"type": "health_check", "data": {}},
-                                 timeout=5)
-            if response.status_code == 200:
-                print("✅ Backend is ready!")
-                return True
-        except requests.exceptions.RequestException:
-            pass
-        
-        print(f"Attempt {attempt + 1}/{max_attempts}: Backend not ready yet...")
-        time.sleep(delay)
+    ready = threading.Event()
+    ready_info = {}
+    threading.Thread(target=forward_output, args=(process.stdout, "[backend]", ready, ready_info), daemon=True).start()
+    threading.Thread(target=forward_output, args=(process.stderr, "[backend]"), daemon=True).start()
     
-    print("❌ Backend failed to start within expected time")
-    return False
+    while not ready.wait(0.05):
+        if process.poll() is not None:
+            print(f"❌ Backend exited with code {process.returncode} before becoming ready")
+            return False
+        if time.time() - started > timeout:
+            print("❌ Backend failed to start within expected time")
+            return False
+    
+    startup_ms = ready_info.get('startup', {}).get('total_ms')
+    print(f"✅ Backend is ready! ({(time.time() - started) * 1000:.0f} ms after launch"
+          + (f", {startup_ms:.0f} ms in the backend)" if startup_ms is not None else ")"))
+    return True
 
 def start_python_backend():
     """Start the Python Flask backend"""
@@ -44,10 +62,11 @@ def start_python_backend():
         return None
     
     try:
-        # Start the Flask backend
+        # Start the Flask backend; unbuffered so the readiness line arrives immediately
         process = subprocess.Popen([
             sys.executable, str(backend_path)
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1,
+           env={**os.environ, "PYTHONUNBUFFERED": "1"})
         
         print("✅ Python backend process started")
         return process
@@ -96,15 +115,11 @@ def main():
         return
     
     # Wait for backend to be ready
-    if not wait_for_backend():
+    if not wait_for_backend(python_process):
         print("❌ Backend failed to start. Exiting.")
         python_process.terminate()
         return
     
-    # Wait additional time for backend to fully initialize
-    print("⏳ Waiting for backend to fully initialize...")
-    time.sleep(3)
-    
     # Start Electron app
     electron_process = start_electron_app()
     if not electron_process: